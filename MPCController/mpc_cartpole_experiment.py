@@ -10,6 +10,8 @@ import matplotlib.pyplot as plt
 from matplotlib.gridspec import GridSpec
 import os
 import sys
+import multiprocessing
+from functools import partial
 
 # 设置UTF-8编码和字体
 if sys.platform == 'win32' and not hasattr(sys.stdout, '_wrapped'):
@@ -20,6 +22,9 @@ if sys.platform == 'win32' and not hasattr(sys.stdout, '_wrapped'):
 plt.rcParams['font.family'] = 'serif'
 plt.rcParams['font.serif'] = ['Times New Roman']
 plt.rcParams['font.size'] = 10
+# 长曲线按像素精度简化路径，减少Agg渲染的线段数
+plt.rcParams['path.simplify'] = True
+plt.rcParams['path.simplify_threshold'] = 1.0
 
 import sys
 sys.path.insert(0, '..')
@@ -32,17 +37,273 @@ except ImportError:
 # Import from PIDController package
 try:
     from PIDController.pid_controller import PIDController
-    from PIDController.cartpole_pid import CartPole, CartPolePIDController
+    from PIDController.cartpole_pid import CartPole, BatchedCartPole, CartPolePIDController
 except ImportError:
     import sys
     import os
     sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'PIDController'))
     from pid_controller import PIDController
-    from cartpole_pid import CartPole, CartPolePIDController
+    from cartpole_pid import CartPole, BatchedCartPole, CartPolePIDController
 
 
-def run_mpc_cartpole_experiment():
-    """运行MPC CartPole控制实验"""
+def _run_scenario(scenario, dt, sim_time):
+    """
+    运行单个控制场景（不绘图，可在子进程中执行）
+    
+    参数:
+        scenario: 场景配置字典
+        dt: 采样时间
+        sim_time: 仿真时长
+    
+    返回:
+        结果字典，其中 'log' 为需要按顺序打印的输出行
+    """
+    time_steps = int(sim_time / dt)
+    log = [f"\nRunning: {scenario['name']}",
+           f"  Initial angle: {scenario['initial_theta']:.3f} rad ({np.degrees(scenario['initial_theta']):.1f}°)"]
+    
+    # 创建系统
+    cartpole = CartPole()
+    cartpole.reset(theta=scenario['initial_theta'], n_steps=time_steps)
+    
+    # 创建控制器
+    if scenario['controller_type'] == 'mpc':
+        controller = MPCController(
+            prediction_horizon=scenario['N'],
+            control_horizon=5,
+            dt=dt,
+            Q=np.diag([10, 1, 200, 20]),
+            R=np.array([[0.01]]),
+            u_min=-50,
+            u_max=50
+        )
+        use_mpc = True
+    elif scenario['controller_type'] == 'linear_mpc':
+        controller = LinearMPCController(
+            prediction_horizon=scenario['N'],
+            control_horizon=8,
+            dt=dt,
+            Q=np.diag([10, 1, 200, 20]),
+            R=np.array([[0.01]]),
+            u_min=-50,
+            u_max=50
+        )
+        use_mpc = True
+    elif scenario['controller_type'] == 'adaptive_mpc':
+        controller = AdaptiveMPCController(
+            base_N=scenario['N'],
+            base_M=5,
+            dt=dt
+        )
+        use_mpc = True
+    else:  # PID
+        controller = CartPolePIDController()
+        use_mpc = False
+    
+    # 运行仿真（预分配数组记录弧度，角度换算在仿真结束后一次完成）
+    angles_rad = np.empty(time_steps)
+    positions = np.empty(time_steps)
+    forces = np.empty(time_steps)
+    costs = np.empty(time_steps)
+    n = 0
+    n_costs = 0
+    failed = False
+    fail_time = None
+    
+    # 当前状态缓冲区，每步原地填写
+    current_state = np.empty(4)
+    
+    for i in range(time_steps):
+        # 计算控制（只有MPC需要完整状态，PID只读取 x 和 theta）
+        if use_mpc:
+            current_state[0] = cartpole.x
+            current_state[1] = cartpole.x_dot
+            current_state[2] = cartpole.theta
+            current_state[3] = cartpole.theta_dot
+            
+            if scenario['controller_type'] == 'linear_mpc':
+                force = controller.update(current_state, [1.0, 0.1, 0.5, 9.8])
+            else:
+                force = controller.update(current_state, cartpole_dynamics)
+            
+            if hasattr(controller, 'cost_history') and len(controller.cost_history) > 0:
+                costs[i] = controller.cost_history[-1]
+            else:
+                costs[i] = 0
+        else:  # PID
+            force = controller.control_cascade(cartpole.x, cartpole.theta, dt)
+            costs[i] = cartpole.theta**2 + cartpole.x**2  # 简单代价
+        n_costs = i + 1
+        
+        # 检查失败
+        if cartpole.is_failed():
+            failed = True
+            t = i * dt
+            fail_time = t
+            log.append(f"  ❌ Failed at {t:.2f}s")
+            break
+        
+        # 更新系统
+        cartpole.step(force, dt)
+        
+        # 记录
+        angles_rad[i] = cartpole.theta
+        positions[i] = cartpole.x
+        forces[i] = force
+        n = i + 1
+    
+    angles = np.degrees(angles_rad[:n])
+    positions = positions[:n]
+    
+    if not failed:
+        log.append(f"  ✓ Success! Maintained balance for {sim_time}s")
+        final_angle_error = np.mean(np.abs(angles[-50:]))
+        final_pos_error = np.mean(np.abs(positions[-50:]))
+        log.append(f"  Final angle error: {final_angle_error:.3f}°")
+        log.append(f"  Final position error: {final_pos_error:.3f}m")
+    
+    return {
+        'name': scenario['name'],
+        'angles': angles,
+        'positions': positions,
+        'forces': forces[:n],
+        'costs': costs[:n_costs],
+        'time': np.arange(n) * dt,
+        'theta_dots_deg': np.degrees(cartpole.history['theta_dot'][:n]),
+        'failed': failed,
+        'fail_time': fail_time,
+        'color': scenario['color'],
+        'log': log
+    }
+
+
+def _run_scenario_batch(scenarios, dt, sim_time):
+    """
+    同一控制器类型的多个场景在 BatchedCartPole 上同步仿真
+    
+    仅支持 'mpc' 与 'linear_mpc'（控制器参数取第一个场景），
+    各场景只在初始角度上不同
+    
+    返回:
+        与 _run_scenario 相同格式的结果字典列表
+    """
+    time_steps = int(sim_time / dt)
+    B = len(scenarios)
+    controller_type = scenarios[0]['controller_type']
+    
+    logs = [[f"\nRunning: {sc['name']}",
+             f"  Initial angle: {sc['initial_theta']:.3f} rad ({np.degrees(sc['initial_theta']):.1f}°)"]
+            for sc in scenarios]
+    
+    cartpoles = BatchedCartPole(B)
+    cartpoles.reset(theta=np.array([sc['initial_theta'] for sc in scenarios]),
+                    n_steps=time_steps)
+    
+    if controller_type == 'mpc':
+        controller = MPCController(
+            prediction_horizon=scenarios[0]['N'],
+            control_horizon=5,
+            dt=dt,
+            Q=np.diag([10, 1, 200, 20]),
+            R=np.array([[0.01]]),
+            u_min=-50,
+            u_max=50
+        )
+    else:
+        controller = LinearMPCController(
+            prediction_horizon=scenarios[0]['N'],
+            control_horizon=8,
+            dt=dt,
+            Q=np.diag([10, 1, 200, 20]),
+            R=np.array([[0.01]]),
+            u_min=-50,
+            u_max=50
+        )
+    
+    # 每步数据按 (T, B) 记录，失败的场景停止推进
+    angles = np.zeros((time_steps, B))
+    positions = np.zeros((time_steps, B))
+    forces_log = np.zeros((time_steps, B))
+    costs = np.zeros((time_steps, B))
+    n_steps = np.full(B, time_steps)
+    n_costs = np.full(B, time_steps)
+    fail_time = [None] * B
+    active = np.ones(B, dtype=bool)
+    
+    for i in range(time_steps):
+        t = i * dt
+        # 计算控制
+        if controller_type == 'linear_mpc':
+            forces = controller.batched_update(cartpoles.current_state(), [1.0, 0.1, 0.5, 9.8])
+            costs[i] = 0
+        else:
+            forces = controller.batched_update(cartpoles.current_state(), cartpole_dynamics)
+            costs[i] = controller.batch_costs
+        
+        # 检查失败
+        newly_failed = active & cartpoles.is_failed()
+        for b in np.flatnonzero(newly_failed):
+            fail_time[b] = t
+            n_steps[b] = i
+            n_costs[b] = i + 1
+            logs[b].append(f"  ❌ Failed at {t:.2f}s")
+        active &= ~newly_failed
+        if not active.any():
+            break
+        
+        # 更新系统
+        cartpoles.step(forces, dt, active=active)
+        
+        # 记录
+        angles[i] = cartpoles.theta
+        positions[i] = cartpoles.x
+        forces_log[i] = forces
+    
+    angles = np.degrees(angles)
+    theta_dot_deg = np.degrees(cartpoles.history['theta_dot'])
+    results = []
+    for b, sc in enumerate(scenarios):
+        n = n_steps[b]
+        failed = fail_time[b] is not None
+        if not failed:
+            logs[b].append(f"  ✓ Success! Maintained balance for {sim_time}s")
+            logs[b].append(f"  Final angle error: {np.mean(np.abs(angles[n-50:n, b])):.3f}°")
+            logs[b].append(f"  Final position error: {np.mean(np.abs(positions[n-50:n, b])):.3f}m")
+        results.append({
+            'name': sc['name'],
+            'angles': angles[:n, b],
+            'positions': positions[:n, b],
+            'forces': forces_log[:n, b],
+            'costs': costs[:n_costs[b], b],
+            'time': np.arange(n) * dt,
+            'theta_dots_deg': theta_dot_deg[:n, b],
+            'failed': failed,
+            'fail_time': fail_time[b],
+            'color': sc['color'],
+            'log': logs[b]
+        })
+    
+    return results
+
+
+def _run_job(job, dt, sim_time):
+    """运行一个任务：单个场景或同类型场景组成的批次"""
+    if len(job) == 1:
+        return [_run_scenario(job[0], dt, sim_time)]
+    return _run_scenario_batch(job, dt, sim_time)
+
+
+def run_mpc_cartpole_experiment(processes=None, dpi=300, fig=None):
+    """
+    运行MPC CartPole控制实验
+    
+    参数:
+        processes: 并行运行场景的进程数，默认取 CPU 核数与场景数的较小值；
+                   设为1时在当前进程中顺序运行
+        dpi: 保存图片的分辨率（调试迭代时可用150，发表用300）
+        fig: 可复用的 Figure（参数扫描时反复调用可避免重建后端），
+             传入时先清空且保存后不关闭
+    """
     print("=" * 70)
     print("CartPole Control Comparison: PID vs MPC vs RL")
     print("=" * 70)
@@ -50,11 +311,13 @@ def run_mpc_cartpole_experiment():
     # 仿真参数
     dt = 0.02  # 20ms
     sim_time = 10.0
-    time_steps = int(sim_time / dt)
-    time = np.linspace(0, sim_time, time_steps)
     
     # 创建图表
-    fig = plt.figure(figsize=(18, 12))
+    reuse_fig = fig is not None
+    if reuse_fig:
+        fig.clf()
+    else:
+        fig = plt.figure(figsize=(18, 12))
     gs = GridSpec(4, 3, figure=fig, hspace=0.35, wspace=0.3)
     
     # 测试场景
@@ -97,135 +360,57 @@ def run_mpc_cartpole_experiment():
     ax5 = fig.add_subplot(gs[2, 2])   # 相图
     ax6 = fig.add_subplot(gs[3, :])   # 性能对比
     
-    results = []
-    
+    # 控制器类型和预测时域都相同的MPC场景合并为一个批次同步仿真，其余场景单独运行。
+    # 上面的默认场景类型各不相同，都单独运行；加入同类型、同时域的场景
+    # （如不同初始角度）时才会成批
+    jobs = []
+    batch_index = {}
     for scenario in scenarios:
-        print(f"\nRunning: {scenario['name']}")
-        print(f"  Initial angle: {scenario['initial_theta']:.3f} rad ({np.degrees(scenario['initial_theta']):.1f}°)")
-        
-        # 创建系统
-        cartpole = CartPole()
-        cartpole.reset(theta=scenario['initial_theta'])
-        
-        # 创建控制器
-        if scenario['controller_type'] == 'mpc':
-            controller = MPCController(
-                prediction_horizon=scenario['N'],
-                control_horizon=5,
-                dt=dt,
-                Q=np.diag([10, 1, 200, 20]),
-                R=np.array([[0.01]]),
-                u_min=-50,
-                u_max=50
-            )
-            use_mpc = True
-        elif scenario['controller_type'] == 'linear_mpc':
-            controller = LinearMPCController(
-                prediction_horizon=scenario['N'],
-                control_horizon=8,
-                dt=dt,
-                Q=np.diag([10, 1, 200, 20]),
-                R=np.array([[0.01]]),
-                u_min=-50,
-                u_max=50
-            )
-            use_mpc = True
-        elif scenario['controller_type'] == 'adaptive_mpc':
-            controller = AdaptiveMPCController(
-                base_N=scenario['N'],
-                base_M=5,
-                dt=dt
-            )
-            use_mpc = True
-        else:  # PID
-            controller = CartPolePIDController()
-            use_mpc = False
-        
-        # 运行仿真
-        angles = []
-        positions = []
-        forces = []
-        costs = []
-        failed = False
-        fail_time = None
-        
-        for i, t in enumerate(time):
-            # 当前状态
-            current_state = np.array([
-                cartpole.x,
-                cartpole.x_dot,
-                cartpole.theta,
-                cartpole.theta_dot
-            ])
-            
-            # 计算控制
-            if use_mpc:
-                if scenario['controller_type'] == 'linear_mpc':
-                    force = controller.update(current_state, [1.0, 0.1, 0.5, 9.8])
-                else:
-                    force = controller.update(current_state, cartpole_dynamics)
-                
-                if hasattr(controller, 'cost_history') and len(controller.cost_history) > 0:
-                    costs.append(controller.cost_history[-1])
-                else:
-                    costs.append(0)
-            else:  # PID
-                force = controller.control_cascade(cartpole.x, cartpole.theta, dt)
-                costs.append((cartpole.theta**2 + cartpole.x**2))  # 简单代价
-            
-            # 检查失败
-            if cartpole.is_failed():
-                failed = True
-                fail_time = t
-                print(f"  ❌ Failed at {t:.2f}s")
-                break
-            
-            # 更新系统
-            cartpole.step(force, dt)
-            
-            # 记录
-            angles.append(np.degrees(cartpole.theta))
-            positions.append(cartpole.x)
-            forces.append(force)
-        
-        if not failed:
-            print(f"  ✓ Success! Maintained balance for {sim_time}s")
-            final_angle_error = np.mean(np.abs(angles[-50:]))
-            final_pos_error = np.mean(np.abs(positions[-50:]))
-            print(f"  Final angle error: {final_angle_error:.3f}°")
-            print(f"  Final position error: {final_pos_error:.3f}m")
-        
-        # 保存结果
-        result_time = time[:len(angles)]
-        results.append({
-            'name': scenario['name'],
-            'angles': angles,
-            'positions': positions,
-            'forces': forces,
-            'costs': costs,
-            'time': result_time,
-            'failed': failed,
-            'fail_time': fail_time,
-            'color': scenario['color']
-        })
+        ctype = scenario['controller_type']
+        if ctype in ('mpc', 'linear_mpc'):
+            key = (ctype, scenario['N'])
+            if key in batch_index:
+                jobs[batch_index[key]].append(scenario)
+                continue
+            batch_index[key] = len(jobs)
+        jobs.append([scenario])
+    
+    # 各任务互不依赖，并行运行
+    if processes is None:
+        processes = min(os.cpu_count() or 1, len(jobs))
+    run = partial(_run_job, dt=dt, sim_time=sim_time)
+    if processes > 1:
+        with multiprocessing.Pool(processes=processes) as pool:
+            job_results = pool.map(run, jobs)
+    else:
+        job_results = [run(job) for job in jobs]
+    
+    # 按原场景顺序整理结果
+    by_name = {r['name']: r for rs in job_results for r in rs}
+    results = [by_name[scenario['name']] for scenario in scenarios]
+    
+    for result in results:
+        print("\n".join(result['log']))
+        result_time = result['time']
+        angles = result['angles']
+        costs = result['costs']
         
         # 绘图
-        ax1.plot(result_time, angles, label=scenario['name'], 
-                linewidth=2, color=scenario['color'], alpha=0.8)
-        ax2.plot(result_time, positions, linewidth=2, 
-                color=scenario['color'], alpha=0.8)
-        ax3.plot(result_time, forces, linewidth=1.5, 
-                color=scenario['color'], alpha=0.8)
+        ax1.plot(result_time, angles, label=result['name'], 
+                linewidth=2, color=result['color'], alpha=0.8)
+        ax2.plot(result_time, result['positions'], linewidth=2, 
+                color=result['color'], alpha=0.8)
+        ax3.plot(result_time, result['forces'], linewidth=1.5, 
+                color=result['color'], alpha=0.8)
         
         if len(costs) > 0:
             cost_time = result_time[:len(costs)]
             ax4.plot(cost_time, costs[:len(cost_time)], linewidth=1.5, 
-                    color=scenario['color'], alpha=0.8)
+                    color=result['color'], alpha=0.8)
         
         # 相图
-        ax5.plot(angles, [cartpole.history['theta_dot'][i] * 180/np.pi 
-                         for i in range(len(angles))],
-                linewidth=1.5, color=scenario['color'], alpha=0.6)
+        ax5.plot(angles, result['theta_dots_deg'],
+                linewidth=1.5, color=result['color'], alpha=0.6)
     
     # 设置图表
     ax1.axhline(y=0, color='k', linestyle='--', alpha=0.3)
@@ -293,14 +478,15 @@ def run_mpc_cartpole_experiment():
             ax6.text(i, 1.05, label, ha='center', va='bottom', 
                     fontsize=11, fontweight='bold', color='green')
     
-    plt.suptitle('CartPole Control: PID vs MPC Comparison\nModel Predictive Control with Optimization',
+    fig.suptitle('CartPole Control: PID vs MPC Comparison\nModel Predictive Control with Optimization',
                  fontsize=15, fontweight='bold', y=0.995)
     
     output_path = os.path.join('..', 'output', 'mpc_cartpole_comparison.png')
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
+    fig.savefig(output_path, dpi=dpi, bbox_inches='tight')
     print(f"\nFigure saved: {output_path}")
-    plt.close()
+    if not reuse_fig:
+        plt.close(fig)
     
     print("\n" + "=" * 70)
     print("Experiment Complete!")
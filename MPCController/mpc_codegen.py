@@ -0,0 +1,105 @@
+"""
+线性MPC的C代码生成（部署用）
+
+借助 CVXPY + CVXPYgen 把 LinearMPCController 的盒约束QP
+生成为独立的C求解器，运行时只需更新参数 q 并调用编译好的求解器，
+省去Python层的求解开销，适合高频控制回路。
+
+用法（离线生成一次）:
+    controller = LinearMPCController(...)
+    generate_linear_mpc_code(controller, [1.0, 0.1, 0.5, 9.8], code_dir='code_mpc')
+
+运行时:
+    controller.qp_solver = load_linear_mpc_solver('code_mpc')
+
+cvxpy 与 cvxpygen 为可选依赖，只在调用本模块函数时导入。
+"""
+
+import os
+import pickle
+import importlib
+import sys
+
+import numpy as np
+
+
+def build_linear_mpc_problem(controller, system_params):
+    """
+    将线性MPC的QP写成CVXPY参数化问题
+
+    min 0.5*U^T*P*U + q^T*U,  u_min <= U <= u_max
+
+    P 与约束在生成时固定，q（随当前状态变化的线性项）作为参数
+
+    参数:
+        controller: LinearMPCController 实例
+        system_params: [M, m, l, g]
+
+    返回:
+        (problem, U, q): CVXPY问题、决策变量和参数
+    """
+    import cvxpy as cp
+
+    qp = controller._setup_qp(system_params)
+
+    U = cp.Variable(controller.M, name='U')
+    q = cp.Parameter(controller.M, name='q')
+    P = cp.psd_wrap(qp['P'])
+
+    objective = cp.Minimize(0.5 * cp.quad_form(U, P) + q @ U)
+    constraints = [U >= controller.u_min, U <= controller.u_max]
+    problem = cp.Problem(objective, constraints)
+
+    return problem, U, q
+
+
+def generate_linear_mpc_code(controller, system_params, code_dir='code_mpc', solver='OSQP'):
+    """
+    生成线性MPC的C求解器
+
+    参数:
+        controller: LinearMPCController 实例
+        system_params: [M, m, l, g]
+        code_dir: 输出目录
+        solver: CVXPYgen 使用的底层求解器（'OSQP'、'explicit' 等）
+
+    返回:
+        code_dir
+    """
+    from cvxpygen import cpg
+
+    problem, _, _ = build_linear_mpc_problem(controller, system_params)
+    cpg.generate_code(problem, code_dir=code_dir, solver=solver)
+    return code_dir
+
+
+def load_linear_mpc_solver(code_dir='code_mpc'):
+    """
+    加载生成的C求解器，返回可直接赋给 LinearMPCController.qp_solver 的函数
+
+    参数:
+        code_dir: generate_linear_mpc_code 的输出目录
+
+    返回:
+        solve(q) -> U，求解失败时返回 None
+    """
+    code_dir = os.path.abspath(code_dir)
+    parent, package = os.path.split(code_dir)
+    if parent not in sys.path:
+        sys.path.insert(0, parent)
+    cpg_solve = importlib.import_module(f'{package}.cpg_solver').cpg_solve
+
+    with open(os.path.join(code_dir, 'problem.pickle'), 'rb') as f:
+        problem = pickle.load(f)
+    problem.register_solve('CPG', cpg_solve)
+    q_param = problem.param_dict['q']
+    U_var = problem.var_dict['U']
+
+    def solve(q):
+        q_param.value = np.asarray(q, dtype=np.float64)
+        problem.solve(method='CPG')
+        if U_var.value is None:
+            return None
+        return np.asarray(U_var.value)
+
+    return solve
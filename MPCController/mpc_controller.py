@@ -9,10 +9,25 @@ MPC特点:
 - 适合多变量系统
 """
 
+import math
 import numpy as np
+from functools import lru_cache
+from itertools import chain, repeat
 from scipy.optimize import minimize
+from scipy import sparse
+from scipy.linalg import cho_factor, cho_solve
 import sys
 
+try:
+    import osqp
+except ImportError:  # OSQP为可选依赖，缺失时退回SciPy求解
+    osqp = None
+
+try:
+    from ._jit import njit
+except ImportError:
+    from _jit import njit
+
 # 设置UTF-8编码输出
 if sys.platform == 'win32' and not hasattr(sys.stdout, '_wrapped'):
     import io
@@ -20,6 +35,48 @@ if sys.platform == 'win32' and not hasattr(sys.stdout, '_wrapped'):
     sys.stdout._wrapped = True
 
 
+def _shift_sequence(U, length):
+    """
+    上一时刻最优控制序列左移一步、末尾保持，作为本时刻的热启动初值
+    
+    length 与原序列长度不同时（自适应MPC改变了控制时域）截断或用末值补齐
+    """
+    U = np.asarray(U, dtype=np.float64)
+    shifted = np.empty(length)
+    n = min(len(U) - 1, length)
+    shifted[:n] = U[1:n + 1]
+    shifted[n:] = U[-1]
+    return shifted
+
+
+class _HistoryBuffer:
+    """
+    预分配的一维浮点历史记录，写满时容量翻倍
+    
+    避免 list.append 的逐元素装箱，读取时直接得到 NumPy 视图
+    """
+    
+    __slots__ = ('_data', '_n')
+    
+    def __init__(self, capacity=10000):
+        self._data = np.empty(max(int(capacity), 1), dtype=np.float64)
+        self._n = 0
+    
+    def append(self, value):
+        if self._n == len(self._data):
+            self._data = np.concatenate([self._data, np.empty(len(self._data))])
+        self._data[self._n] = value
+        self._n += 1
+    
+    def clear(self):
+        self._n = 0
+    
+    @property
+    def values(self):
+        """已记录部分的视图"""
+        return self._data[:self._n]
+
+
 class MPCController:
     """
     模型预测控制器
@@ -31,10 +88,20 @@ class MPCController:
         Q: 状态权重矩阵
         R: 控制权重矩阵
         u_min, u_max: 控制输入约束
+        history_capacity: 历史记录预分配长度（超出时自动扩容）
+        method: 优化方法，'L-BFGS-B'（默认，适合纯盒约束）、'SLSQP' 或 'TNC'
     """
     
+    # 各优化方法的迭代选项
+    _SOLVER_OPTIONS = {
+        'L-BFGS-B': {'maxiter': 30, 'ftol': 1e-6, 'gtol': 1e-5},
+        'SLSQP': {'maxiter': 100, 'ftol': 1e-6},
+        'TNC': {'maxfun': 100, 'ftol': 1e-6, 'gtol': 1e-5},
+    }
+    
     def __init__(self, prediction_horizon=10, control_horizon=5, dt=0.01,
-                 Q=None, R=None, u_min=-100, u_max=100):
+                 Q=None, R=None, u_min=-100, u_max=100, history_capacity=10000,
+                 method='L-BFGS-B'):
         self.N = prediction_horizon  # 预测时域
         self.M = min(control_horizon, prediction_horizon)  # 控制时域
         self.dt = dt
@@ -46,13 +113,41 @@ class MPCController:
         # 控制约束
         self.u_min = u_min
         self.u_max = u_max
+        self.method = method
         
         # 目标状态 [x, x_dot, theta, theta_dot]
         self.target_state = np.array([0.0, 0.0, 0.0, 0.0])
         
+        # 上一时刻最优控制序列（热启动）
+        self._U_prev = None
+        self._U_prev_batch = None
+        self.batch_costs = None
+        
         # 历史记录
-        self.control_history = []
-        self.cost_history = []
+        self._control_buf = _HistoryBuffer(history_capacity)
+        self._cost_buf = _HistoryBuffer(history_capacity)
+    
+    @property
+    def Q(self):
+        """状态权重矩阵"""
+        return self._Q
+    
+    @Q.setter
+    def Q(self, Q):
+        # 对角权重（本项目中的常见情形）下二次型退化为逐元素加权平方和
+        self._Q = np.ascontiguousarray(Q, dtype=np.float64)
+        self._Q_diag = np.diagonal(self._Q).copy()
+        self._Q_is_diag = np.count_nonzero(self._Q - np.diag(self._Q_diag)) == 0
+    
+    @property
+    def control_history(self):
+        """已施加控制量的历史（NumPy视图）"""
+        return self._control_buf.values
+    
+    @property
+    def cost_history(self):
+        """每步最优代价的历史（NumPy视图）"""
+        return self._cost_buf.values
     
     def set_target(self, target_state):
         """设置目标状态"""
@@ -70,15 +165,24 @@ class MPCController:
         返回:
             predicted_states: (N+1) x 4 矩阵，包含当前和未来N步的状态
         """
+        if system_model is cartpole_dynamics:
+            # 倒立摆模型走编译好的整段轨迹预测
+            return _cartpole_rollout(np.asarray(current_state, dtype=np.float64),
+                                     np.asarray(control_sequence, dtype=np.float64),
+                                     self.M, self.N, self.dt)
+        
         predicted_states = np.zeros((self.N + 1, 4))
         predicted_states[0] = current_state
+        dt = self.dt
         
-        for i in range(self.N):
-            # 如果超过控制时域，使用最后一个控制输入
-            u = control_sequence[min(i, self.M - 1)]
-            
-            # 预测下一状态
-            predicted_states[i + 1] = system_model(predicted_states[i], u, self.dt)
+        # 控制时域内逐步取控制序列
+        for i in range(self.M):
+            predicted_states[i + 1] = system_model(predicted_states[i], control_sequence[i], dt)
+        
+        # 超过控制时域，保持最后一个控制输入
+        u_last = control_sequence[self.M - 1]
+        for i in range(self.M, self.N):
+            predicted_states[i + 1] = system_model(predicted_states[i], u_last, dt)
         
         return predicted_states
     
@@ -96,26 +200,88 @@ class MPCController:
         返回:
             总代价
         """
-        # 预测状态轨迹
-        predicted_states = self.predict_state(current_state, control_sequence, system_model)
+        return self._rollout_cost(control_sequence, current_state, system_model)
+    
+    def _rollout_cost(self, U, x0, model):
+        """
+        预测与代价累加融合为一次遍历，不生成 (N+1) x 4 的轨迹数组
         
+        倒立摆模型直接调用编译内核；其他模型逐步调用 model 并即时累加误差代价
+        """
+        if model is cartpole_dynamics:
+            cost, _ = _make_rollout_cost(self.N, self.M)
+            return cost(np.asarray(U, dtype=np.float64),
+                        np.asarray(x0, dtype=np.float64),
+                        self._Q, self._Q_is_diag,
+                        float(self.R[0, 0]),
+                        np.asarray(self.target_state, dtype=np.float64),
+                        self.dt)
+        
+        U = np.asarray(U, dtype=np.float64)
+        Q = self._Q
+        Q_diag = self._Q_diag if self._Q_is_diag else None
+        target = self.target_state
+        state = x0
         cost = 0.0
         
-        # 状态误差代价
-        for i in range(1, self.N + 1):
-            state_error = predicted_states[i] - self.target_state
-            cost += state_error.T @ self.Q @ state_error
+        # 状态误差代价（边预测边累加）；控制时域之后保持最后一个控制输入
+        dt = self.dt
+        controls = chain(U[:self.M], repeat(U[self.M - 1], self.N - self.M))
+        for u in controls:
+            state = model(state, u, dt)
+            state_error = state - target
+            if Q_diag is not None:
+                cost += Q_diag @ (state_error * state_error)
+            else:
+                cost += state_error @ Q @ state_error
         
-        # 控制代价
-        for i in range(self.M):
-            cost += control_sequence[i]**2 * self.R[0, 0]
+        # 控制代价与控制变化率代价（平滑性）
+        U_ctrl = U[:self.M]
+        cost += self.R[0, 0] * np.dot(U_ctrl, U_ctrl)
+        delta_u = np.diff(U_ctrl)
+        cost += 0.01 * np.dot(delta_u, delta_u)
+        
+        return float(cost)
+    
+    def cost_and_grad(self, control_sequence, current_state):
+        """
+        倒立摆模型的代价及解析梯度
         
-        # 控制变化率代价（平滑性）
-        for i in range(self.M - 1):
-            delta_u = control_sequence[i + 1] - control_sequence[i]
-            cost += 0.01 * delta_u**2  # 平滑性惩罚
+        通过伴随法沿预测轨迹反向传播，一次前向+一次反向即可得到全部梯度，
+        代替求解器的有限差分（每次梯度需 M 次额外预测）
         
-        return cost
+        返回:
+            (cost, grad)
+        """
+        _, cost_grad = _make_rollout_cost(self.N, self.M)
+        return cost_grad(np.asarray(control_sequence, dtype=np.float64),
+                         np.asarray(current_state, dtype=np.float64),
+                         self._Q, self._Q_is_diag,
+                         float(self.R[0, 0]),
+                         np.asarray(self.target_state, dtype=np.float64),
+                         self.dt)
+    
+    def _optimize(self, current_state, system_model, u0):
+        """求解一次有界优化问题，返回 scipy 的 OptimizeResult"""
+        # 定义约束
+        bounds = [(self.u_min, self.u_max) for _ in range(self.M)]
+        
+        # 优化求解（倒立摆模型提供解析梯度，其余模型由求解器有限差分）
+        if system_model is cartpole_dynamics:
+            fun = lambda u: self.cost_and_grad(u, current_state)
+            jac = True
+        else:
+            fun = lambda u: self.cost_function(u, current_state, system_model)
+            jac = None
+        
+        return minimize(
+            fun=fun,
+            x0=u0,
+            jac=jac,
+            method=self.method,
+            bounds=bounds,
+            options=self._SOLVER_OPTIONS[self.method]
+        )
     
     def update(self, current_state, system_model, initial_guess=None):
         """
@@ -129,38 +295,63 @@ class MPCController:
         返回:
             optimal_control: 最优控制输入（当前时刻）
         """
-        # 初始猜测
-        if initial_guess is None:
-            u0 = np.zeros(self.M)
-        else:
+        # 初始猜测：默认用上一时刻解平移一步热启动
+        if initial_guess is not None:
             u0 = initial_guess
+        elif self._U_prev is not None:
+            u0 = _shift_sequence(self._U_prev, self.M)
+        else:
+            u0 = np.zeros(self.M)
         
-        # 定义约束
-        bounds = [(self.u_min, self.u_max) for _ in range(self.M)]
-        
-        # 优化求解
-        result = minimize(
-            fun=lambda u: self.cost_function(u, current_state, system_model),
-            x0=u0,
-            method='SLSQP',
-            bounds=bounds,
-            options={'maxiter': 100, 'ftol': 1e-6}
-        )
+        result = self._optimize(current_state, system_model, u0)
         
         optimal_control_sequence = result.x
         optimal_cost = result.fun
+        self._U_prev = optimal_control_sequence
         
         # 记录历史
-        self.control_history.append(optimal_control_sequence[0])
-        self.cost_history.append(optimal_cost)
+        self._control_buf.append(optimal_control_sequence[0])
+        self._cost_buf.append(optimal_cost)
         
         # 返回第一个控制输入（滚动优化）
         return optimal_control_sequence[0]
     
+    def batched_update(self, states, system_model):
+        """
+        批量MPC更新：对 B 个相同参数的系统分别求解
+        
+        每行有各自的热启动序列；SciPy优化器无法放进编译循环，因此逐行调用求解器。
+        不写入历史记录，每行的最优代价保存在 self.batch_costs 中
+        
+        参数:
+            states: (B, 4) 状态数组
+            system_model: 系统动力学模型
+        
+        返回:
+            forces: 长度为 B 的最优控制输入
+        """
+        states = np.asarray(states, dtype=np.float64)
+        B = len(states)
+        if self._U_prev_batch is None or self._U_prev_batch.shape[0] != B:
+            self._U_prev_batch = np.zeros((B, self.M))
+        
+        forces = np.empty(B)
+        self.batch_costs = np.empty(B)
+        for b in range(B):
+            u0 = _shift_sequence(self._U_prev_batch[b], self.M)
+            result = self._optimize(states[b], system_model, u0)
+            self._U_prev_batch[b] = result.x
+            forces[b] = result.x[0]
+            self.batch_costs[b] = result.fun
+        
+        return forces
+    
     def reset(self):
         """重置历史记录"""
-        self.control_history = []
-        self.cost_history = []
+        self._U_prev = None
+        self._U_prev_batch = None
+        self._control_buf.clear()
+        self._cost_buf.clear()
 
 
 class LinearMPCController:
@@ -172,11 +363,26 @@ class LinearMPCController:
     """
     
     def __init__(self, prediction_horizon=10, control_horizon=5, dt=0.01,
-                 Q=None, R=None, u_min=-100, u_max=100):
+                 Q=None, R=None, u_min=-100, u_max=100, history_capacity=10000):
         self.N = prediction_horizon
         self.M = min(control_horizon, prediction_horizon)
         self.dt = dt
         
+        # QP问题数据（首次调用update时构建，模型在平衡点线性化，与当前状态无关）
+        self._pred_params = None
+        self._pred_cache = None
+        self._osqp = None
+        self._U_prev = None
+        self._U_prev_batch = None
+        
+        # 可选的外部QP求解器 solve(q) -> U（如 mpc_codegen 生成的C求解器），
+        # 修改权重、上下限或模型参数后自动清除，需按新问题重新生成
+        self.qp_solver = None
+        
+        # 显式MPC的临界区域缓存 {有效约束集: 区域}，求解QP时按需添加
+        self._regions = {}
+        self.max_regions = 200
+        
         self.Q = Q if Q is not None else np.diag([10, 1, 100, 10])  # 状态权重
         self.R = R if R is not None else np.array([[0.1]])  # 控制权重
         
@@ -185,10 +391,69 @@ class LinearMPCController:
         
         self.target_state = np.array([0.0, 0.0, 0.0, 0.0])
         
+        self._A_powers = None
+        
         # 历史记录
-        self.control_history = []
+        self._control_buf = _HistoryBuffer(history_capacity)
         self.state_predictions = []
     
+    @property
+    def control_history(self):
+        """已施加控制量的历史（NumPy视图）"""
+        return self._control_buf.values
+    
+    def _invalidate_qp(self):
+        """
+        权重或约束变化后丢弃缓存的QP数据、OSQP实例和临界区域
+        
+        外部生成的求解器（qp_solver）在生成时固定了 P 和上下限，同样失效
+        """
+        self._pred_params = None
+        self._pred_cache = None
+        self._osqp = None
+        self._regions = {}
+        self.qp_solver = None
+    
+    @property
+    def Q(self):
+        """状态权重矩阵"""
+        return self._Q
+    
+    @Q.setter
+    def Q(self, Q):
+        self._Q = np.asarray(Q, dtype=np.float64)
+        self._invalidate_qp()
+    
+    @property
+    def R(self):
+        """控制权重矩阵"""
+        return self._R
+    
+    @R.setter
+    def R(self, R):
+        self._R = np.asarray(R, dtype=np.float64)
+        self._invalidate_qp()
+    
+    @property
+    def u_min(self):
+        """控制输入下限"""
+        return self._u_min
+    
+    @u_min.setter
+    def u_min(self, u_min):
+        self._u_min = u_min
+        self._invalidate_qp()
+    
+    @property
+    def u_max(self):
+        """控制输入上限"""
+        return self._u_max
+    
+    @u_max.setter
+    def u_max(self, u_max):
+        self._u_max = u_max
+        self._invalidate_qp()
+    
     def linearize_system(self, x_op, u_op, system_params):
         """
         在工作点附近线性化系统
@@ -219,6 +484,182 @@ class LinearMPCController:
         
         return Ad, Bd
     
+    def build_prediction_matrices(self, Ad, Bd, tol=1e-12):
+        """
+        构建预测矩阵 X = Phi*x0 + Gamma*U（稀疏CSC格式）
+        
+        Gamma的第(i, j)块为 Ad^(i-j) @ Bd，用累乘代替逐块matrix_power；
+        Ad 的各次幂保存在 self._A_powers 中。
+        无穷范数不超过 tol 的块（稳定系统预测时域后段）不写入稀疏矩阵
+        """
+        n = Ad.shape[0]
+        
+        # _A_powers[k] = Ad^k
+        self._A_powers = [np.eye(n)]
+        for _ in range(self.N):
+            self._A_powers.append(self._A_powers[-1] @ Ad)
+        AB = [A_k @ Bd for A_k in self._A_powers[:self.N]]
+        
+        Phi = sparse.vstack([sparse.csc_matrix(A_k) for A_k in self._A_powers[1:]], format='csc')
+        
+        Gamma = sparse.lil_matrix((n * self.N, self.M))
+        for i in range(self.N):
+            for j in range(min(i + 1, self.M)):
+                block = AB[i - j]
+                if np.linalg.norm(block, np.inf) > tol:
+                    Gamma[n*i:n*(i+1), j:j+1] = block
+        
+        return Phi, Gamma.tocsc()
+    
+    def _setup_qp(self, system_params):
+        """
+        构建并缓存预测矩阵和QP问题的常量部分
+        
+        线性化在 theta=0 处进行，与当前状态无关，
+        因此 Phi、Gamma、Hessian及其Cholesky分解只需在模型参数变化时重建
+        """
+        params = tuple(system_params)
+        if self._pred_params == params:
+            return self._pred_cache
+        if self._pred_params is not None:
+            # 模型参数变化：按旧参数生成的外部求解器不再适用
+            self.qp_solver = None
+        
+        Ad, Bd = self.linearize_system(None, 0, system_params)
+        Phi, Gamma = self.build_prediction_matrices(Ad, Bd)
+        
+        # 预测时域内的块对角权重 diag(Q, ..., Q)、diag(R, ..., R)，
+        # 用稀疏矩阵表示，不生成稠密的零块
+        Q_bar = sparse.block_diag([self.Q] * self.N, format='csc')
+        R_bar = sparse.block_diag([self.R] * self.M, format='csc')
+        QGamma = Q_bar @ Gamma
+        
+        # QP问题: min 0.5*U^T*P*U + q^T*U,  u_min <= U <= u_max
+        P_csc = (2 * (Gamma.T @ QGamma + R_bar)).tocsc()
+        P = P_csc.toarray()
+        P_factor = cho_factor(P)
+        GammaT_Qbar2 = (2 * (Q_bar.T @ Gamma).T).tocsr()
+        
+        # 约束不起作用时 U = -K x0 + K_ref x_target（有限时域无约束最优解的显式增益），
+        # x_ref 为目标状态重复N次，因此 K_ref 由 GammaT_Qbar2 的N个列块求和得到
+        n = Phi.shape[1]
+        G_x = (GammaT_Qbar2 @ Phi).toarray()
+        G_ref = GammaT_Qbar2.toarray().reshape(self.M, self.N, n).sum(axis=1)
+        K = cho_solve(P_factor, G_x)
+        K_ref = cho_solve(P_factor, G_ref)
+        
+        self._pred_cache = {
+            'Phi': Phi,
+            'P': P,
+            'P_factor': P_factor,
+            'K': K,
+            'K_ref': K_ref,
+            'G_z': np.hstack([G_x, -G_ref]),  # q = G_z @ [x0; x_target]
+            'GammaT_Qbar2': GammaT_Qbar2,
+            'P_csc': P_csc,
+            'A': sparse.eye(self.M, format='csc'),
+            'l': self.u_min * np.ones(self.M),
+            'u': self.u_max * np.ones(self.M),
+        }
+        self._pred_params = params
+        self._osqp = None
+        self._regions = {}
+        return self._pred_cache
+    
+    def _solve_qp(self, qp, q, U_prev=None):
+        """
+        求解盒约束QP
+        
+        依次尝试: 外部生成的求解器（self.qp_solver，见 mpc_codegen）、
+        OSQP（ADMM稀疏求解器，支持热启动）、L-BFGS-B
+        
+        参数:
+            qp: _setup_qp 返回的QP数据
+            q: 线性项
+            U_prev: 可选，上一时刻的最优控制序列，平移后作为热启动初值
+        """
+        if self.qp_solver is not None:
+            U = self.qp_solver(q)
+            if U is not None:
+                return U
+        
+        if osqp is not None:
+            if self._osqp is None:
+                self._osqp = osqp.OSQP()
+                self._osqp.setup(sparse.triu(qp['P_csc'], format='csc'), q,
+                                 qp['A'], qp['l'], qp['u'],
+                                 warm_start=True, verbose=False,
+                                 eps_abs=1e-6, eps_rel=1e-6)
+            else:
+                self._osqp.update(q=q)
+                if U_prev is not None:
+                    self._osqp.warm_start(x=_shift_sequence(U_prev, self.M))
+            
+            result = self._osqp.solve()
+            if result.info.status_val in (1, 2):  # solved / solved inaccurate
+                return result.x
+        
+        # 备用方案：L-BFGS-B（同样处理盒约束）
+        P = qp['P']
+        if U_prev is not None:
+            u0 = _shift_sequence(U_prev, self.M)
+        else:
+            u0 = np.zeros(self.M)
+        result = minimize(
+            fun=lambda U: (0.5 * U @ P @ U + q @ U, P @ U + q),
+            x0=u0,
+            jac=True,
+            method='L-BFGS-B',
+            bounds=list(zip(qp['l'], qp['u']))
+        )
+        return result.x
+    
+    def _add_region(self, qp, U, tol=1e-6):
+        """
+        由QP最优解的有效约束集构造临界区域（显式MPC）
+        
+        有效约束集固定时，自由变量 U_F = -P_FF^{-1}(G_z,F z + P_FA U_A) 是参数
+        z = [x0; x_target] 的仿射函数；区域由自由变量不越界、
+        有效约束的KKT乘子符号正确两组线性不等式 C z <= d 描述
+        """
+        at_lower = U <= self.u_min + tol
+        at_upper = U >= self.u_max - tol
+        key = tuple(at_upper.astype(int) - at_lower.astype(int))
+        if key in self._regions or not (at_lower | at_upper).any():
+            return
+        if len(self._regions) >= self.max_regions:
+            self._regions.pop(next(iter(self._regions)))
+        
+        P, G = qp['P'], qp['G_z']
+        F = ~(at_lower | at_upper)
+        A = ~F
+        U_A = np.where(at_upper, self.u_max, self.u_min)[A]
+        
+        # U = L z + l
+        L = np.zeros((self.M, G.shape[1]))
+        l = np.zeros(self.M)
+        l[A] = U_A
+        if F.any():
+            P_FF = P[np.ix_(F, F)]
+            L[F] = -np.linalg.solve(P_FF, G[F])
+            l[F] = -np.linalg.solve(P_FF, P[np.ix_(F, A)] @ U_A)
+        
+        # 有效约束处的梯度 grad_A = P_A: U + G_A z：下界需 >= 0，上界需 <= 0
+        grad_L = P[A] @ L + G[A]
+        grad_l = P[A] @ l
+        sign = np.where(at_upper[A], 1.0, -1.0)
+        
+        C = np.vstack([L[F], -L[F], sign[:, None] * grad_L])
+        d = np.concatenate([self.u_max - l[F], l[F] - self.u_min, -sign * grad_l])
+        self._regions[key] = (C, d, L, l)
+    
+    def _explicit_lookup(self, z, tol=1e-9):
+        """在已缓存的临界区域中查找包含 z 的区域，返回对应的最优控制序列"""
+        for key, (C, d, L, l) in self._regions.items():
+            if np.all(C @ z <= d + tol):
+                return L @ z + l
+        return None
+    
     def update(self, current_state, system_params):
         """
         线性MPC更新
@@ -227,62 +668,78 @@ class LinearMPCController:
             current_state: [x, x_dot, theta, theta_dot]
             system_params: [M, m, l, g]
         """
-        # 线性化
-        Ad, Bd = self.linearize_system(current_state, 0, system_params)
+        # 预测矩阵和Hessian只依赖模型参数，首次调用时构建
+        qp = self._setup_qp(system_params)
         
-        # 构建预测矩阵
-        # X = Phi*x0 + Gamma*U
-        Phi = np.zeros((4 * self.N, 4))
-        Gamma = np.zeros((4 * self.N, self.M))
+        # 无约束最优解由预计算增益直接得到（M x 4 矩阵向量乘法），
+        # 若已满足约束即为QP最优解
+        U_opt = qp['K_ref'] @ self.target_state - qp['K'] @ current_state
+        if np.any(U_opt < self.u_min) or np.any(U_opt > self.u_max):
+            # 约束起作用：先查已知临界区域（仿射控制律），未命中再求解QP
+            z = np.concatenate([current_state, self.target_state])
+            U_opt = self._explicit_lookup(z)
+            if U_opt is None:
+                q = qp['G_z'] @ z
+                U_opt = np.clip(self._solve_qp(qp, q, self._U_prev), self.u_min, self.u_max)
+                self._add_region(qp, U_opt)
+        self._U_prev = U_opt
         
-        A_power = Ad
-        for i in range(self.N):
-            Phi[4*i:4*(i+1), :] = A_power
-            for j in range(min(i + 1, self.M)):
-                if i - j >= 0:
-                    Gamma[4*i:4*(i+1), j:j+1] = np.linalg.matrix_power(Ad, i - j) @ Bd
-            A_power = A_power @ Ad
+        # 记录
+        self._control_buf.append(U_opt[0])
+        
+        return U_opt[0]
+    
+    def batched_update(self, states, system_params):
+        """
+        批量线性MPC更新：B 个相同参数的系统共用预测矩阵
         
-        # 构建代价函数矩阵
-        Q_bar = np.kron(np.eye(self.N), self.Q)
-        R_bar = np.kron(np.eye(self.M), self.R)
+        无约束解由预计算增益对整批状态一次矩阵运算得到，
+        只有超出约束的行才单独求解QP，各行用自己上一时刻的解热启动。
+        不写入历史记录，也不改变 update 的热启动状态
         
-        # QP问题: min 0.5*U^T*H*U + f^T*U
-        H = 2 * (Gamma.T @ Q_bar @ Gamma + R_bar)
-        x_ref = np.tile(self.target_state, self.N)
-        f = 2 * Gamma.T @ Q_bar @ (Phi @ current_state - x_ref)
+        参数:
+            states: (B, 4) 状态数组
+            system_params: [M, m, l, g]
         
-        # 简单的约束处理：投影到可行域
-        try:
-            U_opt = -np.linalg.solve(H, f)
-        except:
-            U_opt = np.zeros(self.M)
+        返回:
+            forces: 长度为 B 的最优控制输入
+        """
+        qp = self._setup_qp(system_params)
+        states = np.asarray(states, dtype=np.float64)
         
-        # 约束投影
-        U_opt = np.clip(U_opt, self.u_min, self.u_max)
+        U_opt = qp['K_ref'] @ self.target_state - states @ qp['K'].T
         
-        # 记录
-        self.control_history.append(U_opt[0])
+        # 各行上一时刻的最优控制序列（热启动），批大小变化时从0开始
+        B = states.shape[0]
+        if self._U_prev_batch is None or self._U_prev_batch.shape[0] != B:
+            self._U_prev_batch = np.zeros((B, self.M))
         
-        return U_opt[0]
+        violated = np.any((U_opt < self.u_min) | (U_opt > self.u_max), axis=1)
+        if violated.any():
+            x_ref = np.tile(self.target_state, self.N)
+            q = (qp['GammaT_Qbar2'] @ (qp['Phi'] @ states[violated].T - x_ref[:, None])).T
+            for k, b in enumerate(np.flatnonzero(violated)):
+                U_opt[b] = np.clip(self._solve_qp(qp, q[k], self._U_prev_batch[b]),
+                                   self.u_min, self.u_max)
+        self._U_prev_batch = U_opt
+        
+        return U_opt[:, 0]
     
     def reset(self):
         """重置"""
-        self.control_history = []
+        self._U_prev = None
+        self._U_prev_batch = None
+        self._control_buf.clear()
         self.state_predictions = []
 
 
-def cartpole_dynamics(state, u, dt):
+@njit(cache=True, fastmath=True)
+def _cartpole_step(x, x_dot, theta, theta_dot, u, dt):
     """
-    CartPole系统动力学模型（用于MPC预测）
-    
-    参数:
-        state: [x, x_dot, theta, theta_dot]
-        u: 控制力
-        dt: 时间步长
+    单步倒立摆动力学（标量形式，供JIT内核调用）
     
     返回:
-        next_state: 下一时刻状态
+        (x, x_dot, theta, theta_dot) 下一时刻状态
     """
     # 系统参数
     M = 1.0  # 小车质量
@@ -290,11 +747,9 @@ def cartpole_dynamics(state, u, dt):
     l = 0.5  # 杆子长度
     g = 9.8  # 重力加速度
     
-    x, x_dot, theta, theta_dot = state
-    
     # 动力学方程
-    sin_theta = np.sin(theta)
-    cos_theta = np.cos(theta)
+    sin_theta = math.sin(theta)
+    cos_theta = math.cos(theta)
     
     temp = (u + m * l * theta_dot**2 * sin_theta) / (M + m)
     theta_acc = (g * sin_theta - cos_theta * temp) / \
@@ -302,12 +757,252 @@ def cartpole_dynamics(state, u, dt):
     x_acc = temp - m * l * theta_acc * cos_theta / (M + m)
     
     # 欧拉积分
-    x_new = x + x_dot * dt
-    x_dot_new = x_dot + x_acc * dt
-    theta_new = theta + theta_dot * dt
-    theta_dot_new = theta_dot + theta_acc * dt
+    return (x + x_dot * dt,
+            x_dot + x_acc * dt,
+            theta + theta_dot * dt,
+            theta_dot + theta_acc * dt)
+
+
+def cartpole_dynamics(state, u, dt):
+    """
+    倒立摆系统动力学模型（用于MPC预测）
+    
+    参数:
+        state: [x, x_dot, theta, theta_dot]
+        u: 控制力
+        dt: 时间步长
+    
+    返回:
+        next_state: 下一时刻状态
+    """
+    x, x_dot, theta, theta_dot = state
+    return np.array(_cartpole_step(float(x), float(x_dot), float(theta),
+                                   float(theta_dot), float(u), dt))
+
+
+@njit(cache=True, fastmath=True)
+def _cartpole_rollout(state, control_sequence, M, N, dt):
+    """
+    在一个编译循环内完成整条预测轨迹
+    
+    返回:
+        predicted_states: (N+1) x 4 矩阵
+    """
+    predicted_states = np.empty((N + 1, 4))
+    x, x_dot, theta, theta_dot = state[0], state[1], state[2], state[3]
+    predicted_states[0, 0] = x
+    predicted_states[0, 1] = x_dot
+    predicted_states[0, 2] = theta
+    predicted_states[0, 3] = theta_dot
+    
+    for i in range(N):
+        u = control_sequence[min(i, M - 1)]
+        x, x_dot, theta, theta_dot = _cartpole_step(x, x_dot, theta, theta_dot, u, dt)
+        predicted_states[i + 1, 0] = x
+        predicted_states[i + 1, 1] = x_dot
+        predicted_states[i + 1, 2] = theta
+        predicted_states[i + 1, 3] = theta_dot
+    
+    return predicted_states
+
+
+@njit(cache=True, fastmath=True)
+def _quad_form(err, Q, Q_is_diag):
+    """计算 err^T Q err，对角Q只做4次乘加"""
+    if Q_is_diag:
+        return (Q[0, 0] * err[0] * err[0] + Q[1, 1] * err[1] * err[1] +
+                Q[2, 2] * err[2] * err[2] + Q[3, 3] * err[3] * err[3])
+    total = 0.0
+    for r in range(4):
+        for c in range(4):
+            total += err[r] * Q[r, c] * err[c]
+    return total
+
+
+@njit(cache=True, fastmath=True)
+def _add_weighted(out, W, err, W_is_diag):
+    """out += W @ err"""
+    if W_is_diag:
+        for r in range(4):
+            out[r] += W[r, r] * err[r]
+    else:
+        for r in range(4):
+            for c in range(4):
+                out[r] += W[r, c] * err[c]
+
+
+@njit(cache=True, fastmath=True)
+def _cartpole_cost(control_sequence, state, Q, Q_is_diag, R_val, target, N, M, dt):
+    """
+    倒立摆MPC代价（标量形式），与 MPCController.cost_function 一致
+    
+    预测和代价累加在同一循环中完成，不分配中间轨迹数组
+    """
+    x, x_dot, theta, theta_dot = state[0], state[1], state[2], state[3]
+    err = np.empty(4)
+    cost = 0.0
+    
+    # 状态误差代价
+    for i in range(N):
+        u = control_sequence[min(i, M - 1)]
+        x, x_dot, theta, theta_dot = _cartpole_step(x, x_dot, theta, theta_dot, u, dt)
+        err[0] = x - target[0]
+        err[1] = x_dot - target[1]
+        err[2] = theta - target[2]
+        err[3] = theta_dot - target[3]
+        cost += _quad_form(err, Q, Q_is_diag)
+    
+    # 控制代价
+    for i in range(M):
+        cost += control_sequence[i]**2 * R_val
+    
+    # 控制变化率代价（平滑性）
+    for i in range(M - 1):
+        delta_u = control_sequence[i + 1] - control_sequence[i]
+        cost += 0.01 * delta_u**2
+    
+    return cost
+
+
+@njit(cache=True, fastmath=True)
+def _cartpole_jacobian(theta, theta_dot, u, dt):
+    """
+    单步倒立摆动力学对状态和输入的雅可比（解析形式）
+    
+    x, x_dot 不进入加速度方程，因此只有 theta、theta_dot、u 的偏导非零
+    
+    返回:
+        (da_dth, da_dthd, dth_acc_dth, dth_acc_dthd, dxd_du, dthd_du)
+        其中前四项为 A 矩阵第2、4行的非平凡元素（已乘dt），后两项为 B 的非零元素
+    """
+    M = 1.0
+    m = 0.1
+    l = 0.5
+    g = 9.8
+    Mt = M + m
+    ml = m * l
+    
+    s = math.sin(theta)
+    c = math.cos(theta)
+    
+    temp = (u + ml * theta_dot**2 * s) / Mt
+    den = l * (4.0/3.0 - m * c**2 / Mt)
+    num = g * s - c * temp
+    theta_acc = num / den
+    
+    # temp 的偏导
+    dtemp_dth = ml * theta_dot**2 * c / Mt
+    dtemp_dthd = 2.0 * ml * theta_dot * s / Mt
+    dtemp_du = 1.0 / Mt
     
-    return np.array([x_new, x_dot_new, theta_new, theta_dot_new])
+    # theta_acc 的偏导
+    dden_dth = l * 2.0 * m * c * s / Mt
+    dacc_dth = ((g * c + s * temp - c * dtemp_dth) * den - num * dden_dth) / den**2
+    dacc_dthd = -c * dtemp_dthd / den
+    dacc_du = -c * dtemp_du / den
+    
+    # x_acc 的偏导
+    k = ml / Mt
+    dxacc_dth = dtemp_dth - k * (dacc_dth * c - theta_acc * s)
+    dxacc_dthd = dtemp_dthd - k * c * dacc_dthd
+    dxacc_du = dtemp_du - k * c * dacc_du
+    
+    return (dxacc_dth * dt, dxacc_dthd * dt, dacc_dth * dt, dacc_dthd * dt,
+            dxacc_du * dt, dacc_du * dt)
+
+
+@njit(cache=True, fastmath=True)
+def _cartpole_cost_grad(control_sequence, state, Q, Q_is_diag, R_val, target, N, M, dt):
+    """
+    倒立摆MPC代价及其对控制序列的梯度（伴随法反向传播）
+    
+    前向: 预测并保存轨迹；反向: λ_N = (Q+Q^T)e_N,
+    λ_i = A_i^T λ_{i+1} + (Q+Q^T)e_i，grad[min(i, M-1)] += B_i^T λ_{i+1}
+    
+    返回:
+        (cost, grad)
+    """
+    W = Q + Q.T
+    states = _cartpole_rollout(state, control_sequence, M, N, dt)
+    err = np.empty(4)
+    cost = 0.0
+    
+    for i in range(1, N + 1):
+        for r in range(4):
+            err[r] = states[i, r] - target[r]
+        cost += _quad_form(err, Q, Q_is_diag)
+    
+    grad = np.zeros(M)
+    
+    # 反向扫描
+    lam = np.zeros(4)
+    for r in range(4):
+        err[r] = states[N, r] - target[r]
+    _add_weighted(lam, W, err, Q_is_diag)
+    
+    for i in range(N - 1, -1, -1):
+        u = control_sequence[min(i, M - 1)]
+        a_th, a_thd, b_th, b_thd, a_u, b_u = _cartpole_jacobian(
+            states[i, 2], states[i, 3], u, dt)
+        
+        grad[min(i, M - 1)] += a_u * lam[1] + b_u * lam[3]
+        
+        # λ_i = A_i^T λ_{i+1}
+        l0, l1, l2, l3 = lam[0], lam[1], lam[2], lam[3]
+        lam[0] = l0
+        lam[1] = dt * l0 + l1
+        lam[2] = a_th * l1 + l2 + b_th * l3
+        lam[3] = a_thd * l1 + dt * l2 + (1.0 + b_thd) * l3
+        
+        if i > 0:
+            for r in range(4):
+                err[r] = states[i, r] - target[r]
+            _add_weighted(lam, W, err, Q_is_diag)
+    
+    # 控制代价
+    for i in range(M):
+        cost += control_sequence[i]**2 * R_val
+        grad[i] += 2.0 * R_val * control_sequence[i]
+    
+    # 控制变化率代价（平滑性）
+    for i in range(M - 1):
+        delta_u = control_sequence[i + 1] - control_sequence[i]
+        cost += 0.01 * delta_u**2
+        grad[i + 1] += 0.02 * delta_u
+        grad[i] -= 0.02 * delta_u
+    
+    return cost, grad
+
+
+# 供特化内核在Numba IR层内联的版本（N、M作为常量传入后循环次数在编译期已知）
+_cartpole_cost_inline = njit(inline='always', fastmath=True)(
+    getattr(_cartpole_cost, 'py_func', _cartpole_cost))
+_cartpole_cost_grad_inline = njit(inline='always', fastmath=True)(
+    getattr(_cartpole_cost_grad, 'py_func', _cartpole_cost_grad))
+
+
+@lru_cache(maxsize=None)
+def _make_rollout_cost(N, M):
+    """
+    按 (N, M) 生成特化的代价/梯度内核
+    
+    N、M 作为闭包常量固化进编译结果，编译器可以展开预测和代价循环；
+    同一形状只编译一次，之后从缓存直接取用
+    
+    返回:
+        (cost, cost_grad) 两个内核，参数同 _cartpole_cost / _cartpole_cost_grad 去掉 N、M
+    """
+    @njit(fastmath=True)
+    def cost(control_sequence, state, Q, Q_is_diag, R_val, target, dt):
+        return _cartpole_cost_inline(control_sequence, state, Q, Q_is_diag,
+                                     R_val, target, N, M, dt)
+    
+    @njit(fastmath=True)
+    def cost_grad(control_sequence, state, Q, Q_is_diag, R_val, target, dt):
+        return _cartpole_cost_grad_inline(control_sequence, state, Q, Q_is_diag,
+                                          R_val, target, N, M, dt)
+    
+    return cost, cost_grad
 
 
 class AdaptiveMPCController:
@@ -320,7 +1015,7 @@ class AdaptiveMPCController:
     - 更智能的控制策略
     """
     
-    def __init__(self, base_N=10, base_M=5, dt=0.01):
+    def __init__(self, base_N=10, base_M=5, dt=0.01, history_capacity=10000):
         self.base_N = base_N
         self.base_M = base_M
         self.dt = dt
@@ -333,7 +1028,24 @@ class AdaptiveMPCController:
         self.u_max = 100
         
         self.target_state = np.array([0.0, 0.0, 0.0, 0.0])
-        self.control_history = []
+        self._control_buf = _HistoryBuffer(history_capacity)
+        
+        # 持久的内部MPC控制器，每步只修改其权重和时域（保留热启动序列）
+        self._mpc = MPCController(
+            prediction_horizon=base_N,
+            control_horizon=base_M,
+            dt=dt,
+            Q=self.Q_base,
+            R=self.R_base,
+            u_min=self.u_min,
+            u_max=self.u_max,
+            history_capacity=history_capacity
+        )
+    
+    @property
+    def control_history(self):
+        """已施加控制量的历史（NumPy视图）"""
+        return self._control_buf.values
     
     def adapt_parameters(self, current_state):
         """
@@ -363,26 +1075,25 @@ class AdaptiveMPCController:
         # 自适应调整参数
         Q, N, M = self.adapt_parameters(current_state)
         
-        # 创建临时MPC控制器
-        mpc = MPCController(
-            prediction_horizon=N,
-            control_horizon=M,
-            dt=self.dt,
-            Q=Q,
-            R=self.R_base,
-            u_min=self.u_min,
-            u_max=self.u_max
-        )
-        mpc.set_target(self.target_state)
+        # 就地更新内部MPC控制器的参数
+        mpc = self._mpc
+        mpc.Q = Q
+        mpc.N = N
+        mpc.M = min(M, N)
+        mpc.R = self.R_base
+        mpc.u_min = self.u_min
+        mpc.u_max = self.u_max
+        mpc.target_state = self.target_state
         
-        # 求解
+        # 求解（时域变化时热启动序列由MPCController截断或补齐）
         u_opt = mpc.update(current_state, system_model)
         
-        self.control_history.append(u_opt)
+        self._control_buf.append(u_opt)
         return u_opt
     
     def reset(self):
-        self.control_history = []
+        self._mpc.reset()
+        self._control_buf.clear()
 
 
 if __name__ == "__main__":
@@ -423,5 +1134,29 @@ if __name__ == "__main__":
     for i in range(min(5, len(predicted))):
         print(f"  Step {i}: {predicted[i]}")
     
+    # 对比不同优化方法在同一步上的耗时
+    import time
+    print("\n优化方法对比（单步，冷启动）:")
+    for method in ('L-BFGS-B', 'SLSQP', 'TNC'):
+        bench = MPCController(
+            prediction_horizon=10,
+            control_horizon=5,
+            dt=0.02,
+            Q=np.diag([10, 1, 100, 10]),
+            R=np.array([[0.1]]),
+            u_min=-50,
+            u_max=50,
+            method=method
+        )
+        bench.update(current_state, cartpole_dynamics)  # 预热（JIT编译）
+        repeats = 20
+        start = time.perf_counter()
+        for _ in range(repeats):
+            bench.reset()
+            u = bench.update(current_state, cartpole_dynamics)
+        elapsed = (time.perf_counter() - start) / repeats
+        print(f"  {method:<9s} u = {u:8.4f} N, 代价 = {bench.cost_history[-1]:.4f}, "
+              f"耗时 = {elapsed * 1000:.2f} ms")
+    
     print("\n✓ MPC控制器测试完成!")
 
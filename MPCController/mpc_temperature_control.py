@@ -10,12 +10,13 @@ MPC温度控制系统示例
 """
 
 import numpy as np
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-from matplotlib.gridspec import GridSpec
 import os
 import sys
+import multiprocessing
+from functools import lru_cache
+from scipy.linalg import cho_factor, cho_solve
+from scipy.optimize import minimize
+from scipy.signal import lfilter
 
 # 设置UTF-8编码和字体
 if sys.platform == 'win32' and not hasattr(sys.stdout, '_wrapped'):
@@ -23,14 +24,12 @@ if sys.platform == 'win32' and not hasattr(sys.stdout, '_wrapped'):
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     sys.stdout._wrapped = True
 
-plt.rcParams['font.family'] = 'serif'
-plt.rcParams['font.serif'] = ['Times New Roman']
-plt.rcParams['font.size'] = 10
-
 try:
-    from .mpc_controller import MPCController
+    from .mpc_controller import MPCController, _HistoryBuffer
+    from ._jit import njit, HAS_NUMBA
 except ImportError:
-    from mpc_controller import MPCController
+    from mpc_controller import MPCController, _HistoryBuffer
+    from _jit import njit, HAS_NUMBA
 
 try:
     from PIDController.pid_controller import PIDController
@@ -56,11 +55,12 @@ class TemperatureRoom:
         b: 加热效率系数 (°C/W/s)
     """
     
-    def __init__(self, T_ambient=5.0, T_initial=5.0):
+    def __init__(self, T_ambient=5.0, T_initial=5.0, max_steps=1000):
         """
         参数:
             T_ambient: 环境温度 (°C)
             T_initial: 初始房间温度 (°C)
+            max_steps: 历史记录预分配步数（超出时自动扩容）
         """
         self.T_ambient = T_ambient  # 冬天室外温度
         self.T = T_initial  # 当前房间温度
@@ -73,9 +73,20 @@ class TemperatureRoom:
         self.u_min = 0.0     # 最小功率（不能制冷）
         self.u_max = 2000.0  # 最大功率 2000W
         
-        # 历史记录
-        self.temperature_history = [T_initial]
-        self.power_history = []
+        # 历史记录（预分配缓冲区）
+        self._temperature_buf = _HistoryBuffer(max_steps + 1)
+        self._power_buf = _HistoryBuffer(max_steps)
+        self._temperature_buf.append(T_initial)
+    
+    @property
+    def temperature_history(self):
+        """温度历史（含初始温度）"""
+        return self._temperature_buf.values
+    
+    @property
+    def power_history(self):
+        """加热功率历史"""
+        return self._power_buf.values
     
     def dynamics(self, T, u):
         """
@@ -102,8 +113,8 @@ class TemperatureRoom:
         self.T = self.T + dT_dt * dt
         
         # 记录
-        self.temperature_history.append(self.T)
-        self.power_history.append(u)
+        self._temperature_buf.append(self.T)
+        self._power_buf.append(u)
         
         return self.T
     
@@ -114,8 +125,21 @@ class TemperatureRoom:
         else:
             self.T = self.T_ambient
         
-        self.temperature_history = [self.T]
-        self.power_history = []
+        self._temperature_buf.clear()
+        self._power_buf.clear()
+        self._temperature_buf.append(self.T)
+
+
+@njit(cache=True)
+def _dyn_scalar(T, u, dt, T_ambient, a=0.05, b=0.002):
+    """温度模型单步欧拉积分（标量）"""
+    return T + (-a * (T - T_ambient) + b * u) * dt
+
+
+def _dyn_vec(T, u, dt, T_ambient, a=0.05, b=0.002):
+    """温度模型单步欧拉积分（逐元素作用于数组）"""
+    T = np.asarray(T, dtype=np.float64)
+    return T + (-a * (T - T_ambient) + b * np.asarray(u, dtype=np.float64)) * dt
 
 
 def temperature_dynamics_for_mpc(state, u, dt, T_ambient=5.0):
@@ -130,20 +154,160 @@ def temperature_dynamics_for_mpc(state, u, dt, T_ambient=5.0):
     
     返回:
         next_state: [T_next]
+    
+    标量调用请直接使用 _dyn_scalar，数组调用使用 _dyn_vec
+    """
+    if isinstance(state, np.ndarray):
+        return _dyn_vec(state, u, dt, T_ambient)
+    return _dyn_scalar(float(state), float(u), float(dt), float(T_ambient))
+
+
+@njit(cache=True, fastmath=True)
+def _mpc_cost_and_grad(u, T0, S, f, c, target, Q, R, smooth):
     """
-    # 系统参数
-    a = 0.05  # 热损失系数
-    b = 0.002  # 加热效率
+    温度MPC代价及其梯度（一次预测同时得到两者）
     
-    T = state if np.isscalar(state) else state[0]
+    参数:
+        u: 控制序列 (M,)
+        T0: 当前温度
+        S, f, c: 预测矩阵，temps = f*T0 + S@u + c
+        target: 目标温度
+        Q, R, smooth: 误差、控制量、控制变化率权重
     
-    # 温度变化率
-    dT_dt = -a * (T - T_ambient) + b * u
+    返回:
+        (cost, grad)
+    """
+    error = f * T0 + S @ u + c - target
+    delta_u = u[1:] - u[:-1]
+    cost = Q * (error @ error) + R * (u @ u) + smooth * (delta_u @ delta_u)
+    
+    grad = 2.0 * Q * (S.T @ error) + 2.0 * R * u
+    grad[:-1] -= 2.0 * smooth * delta_u
+    grad[1:] += 2.0 * smooth * delta_u
+    return cost, grad
+
+
+def _mpc_cost_and_grad_loops(u, T0, S, f, c, target, Q, R, smooth, N, M):
+    """
+    _mpc_cost_and_grad 的显式循环版本，供按 (N, M) 特化的内核内联
     
-    # 欧拉积分
-    T_next = T + dT_dt * dt
+    循环次数在编译期已知时，编译器可以完全展开并把工作数组放在栈上
+    """
+    grad = np.empty(M)
+    for j in range(M):
+        grad[j] = 2.0 * R * u[j]
+    
+    cost = 0.0
+    for i in range(N):
+        T = f[i] * T0 + c[i]
+        for j in range(M):
+            T += S[i, j] * u[j]
+        error = T - target
+        cost += Q * error * error
+        for j in range(M):
+            grad[j] += 2.0 * Q * S[i, j] * error
+    
+    for j in range(M):
+        cost += R * u[j] * u[j]
+    
+    for j in range(M - 1):
+        delta_u = u[j + 1] - u[j]
+        cost += smooth * delta_u * delta_u
+        grad[j + 1] += 2.0 * smooth * delta_u
+        grad[j] -= 2.0 * smooth * delta_u
+    
+    return cost, grad
+
+
+_mpc_cost_and_grad_inline = njit(inline='always', fastmath=True)(_mpc_cost_and_grad_loops)
+
+
+@lru_cache(maxsize=None)
+def _make_mpc_cost_and_grad(N, M):
+    """
+    按 (N, M) 生成特化的代价/梯度内核
+    
+    N、M 作为闭包常量固化进编译结果；同一形状只编译一次
+    
+    返回:
+        内核，参数同 _mpc_cost_and_grad
+    """
+    @njit(fastmath=True)
+    def cost_and_grad(u, T0, S, f, c, target, Q, R, smooth):
+        return _mpc_cost_and_grad_inline(u, T0, S, f, c, target, Q, R, smooth, N, M)
+    
+    return cost_and_grad
+
+
+def _solve_box_qp(H, g, lo, hi, H_factor=None, free_factors=None,
+                  max_iter=50, tol=1e-9, max_cached=32):
+    """
+    求解盒约束凸QP:  min 0.5*u^T*H*u + g^T*u,  lo <= u <= hi
+    
+    有效集投影牛顿法：每次迭代固定处于边界且梯度指向外侧的变量，
+    对其余自由变量做牛顿步，投影回盒约束后回溯线搜索保证代价下降。
+    变量数只有控制时域 M，通常几次迭代即收敛到精确解
+    
+    参数:
+        H: 正定Hessian (M x M)
+        g: 线性项 (M,)
+        lo, hi: 上下界（标量或 (M,) 数组）
+        H_factor: 可选的 H 的 Cholesky 分解，用于首步无约束解
+        free_factors: 可选的字典，按自由变量集合缓存子矩阵 H_FF 的
+                      Cholesky 分解；跨调用传入同一字典即可复用
+                      （有效约束模式在相邻控制步之间很少变化）
+        max_cached: free_factors 最多缓存的模式数
+    
+    返回:
+        u: 最优解
+    """
+    n = len(g)
+    lo = np.broadcast_to(np.asarray(lo, dtype=np.float64), (n,))
+    hi = np.broadcast_to(np.asarray(hi, dtype=np.float64), (n,))
+    
+    # 从无约束最优解出发
+    if H_factor is None:
+        H_factor = cho_factor(H)
+    u = cho_solve(H_factor, -g)
+    if np.all(u >= lo) and np.all(u <= hi):
+        return u
+    u = np.clip(u, lo, hi)
+    
+    def cost(v):
+        return 0.5 * v @ H @ v + g @ v
+    
+    f = cost(u)
+    for _ in range(max_iter):
+        grad = H @ u + g
+        fixed = ((u <= lo) & (grad > 0)) | ((u >= hi) & (grad < 0))
+        free = ~fixed
+        
+        # 自由变量的牛顿方向
+        d = np.zeros(n)
+        if free.any():
+            key = free.tobytes()
+            factor = None if free_factors is None else free_factors.get(key)
+            if factor is None:
+                factor = cho_factor(H[np.ix_(free, free)])
+                if free_factors is not None and len(free_factors) < max_cached:
+                    free_factors[key] = factor
+            d[free] = -cho_solve(factor, grad[free])
+        
+        # 投影回溯线搜索
+        t = 1.0
+        while True:
+            u_new = np.clip(u + t * d, lo, hi)
+            f_new = cost(u_new)
+            if f_new <= f or t < 1e-8:
+                break
+            t *= 0.5
+        
+        converged = np.max(np.abs(u_new - u)) <= tol * (1.0 + np.max(np.abs(u)))
+        u, f = u_new, f_new
+        if converged:
+            break
     
-    return np.array([T_next]) if isinstance(state, np.ndarray) else T_next
+    return u
 
 
 class TemperatureMPCController:
@@ -156,7 +320,7 @@ class TemperatureMPCController:
     
     def __init__(self, prediction_horizon=20, control_horizon=10, dt=10.0,
                  Q_weight=1.0, R_weight=0.01, u_min=0, u_max=2000,
-                 T_ambient=5.0):
+                 T_ambient=5.0, solver='analytic'):
         """
         参数:
             prediction_horizon: 预测时域（步数）
@@ -166,6 +330,8 @@ class TemperatureMPCController:
             R_weight: 控制输入权重
             u_min, u_max: 功率约束
             T_ambient: 环境温度
+            solver: 'analytic'（模型线性，按盒约束QP精确求解）
+                    或 'numerical'（L-BFGS-B数值优化）
         """
         self.N = prediction_horizon
         self.M = control_horizon
@@ -175,9 +341,27 @@ class TemperatureMPCController:
         self.R_weight = R_weight
         self.u_min = u_min
         self.u_max = u_max
+        self.solver = solver
+        
+        # 模型参数（与 temperature_dynamics_for_mpc 一致）
+        self.a = 0.05
+        self.b = 0.002
         
         self.target_temperature = 22.0  # 默认目标温度
         self.control_history = []
+        
+        # QP矩阵缓存（参数不变时复用）
+        self._qp_key = None
+        self._qp = None
+        
+        # 上一步的最优控制序列（数值求解的热启动）
+        self._u_prev = None
+        # 数值求解的初值缓冲区，只分配一次
+        self._u0 = np.zeros(self.M)
+        
+        # 预先编译数值求解的代价内核，避免首步计入编译时间
+        if solver == 'numerical':
+            self._cost_and_grad(np.zeros(self.M), T_ambient)
     
     def set_target(self, T_target):
         """设置目标温度"""
@@ -194,15 +378,14 @@ class TemperatureMPCController:
         返回:
             predicted_temps: 预测的温度序列
         """
-        temps = [T_current]
-        T = T_current
-        
-        for i in range(self.N):
-            u = control_sequence[min(i, self.M - 1)]
-            T = temperature_dynamics_for_mpc(T, u, self.dt, self.T_ambient)
-            temps.append(T)
+        # 模型线性，N步预测即一次仿射变换 f*T0 + S@u + c
+        qp = self._build_qp()
+        u = np.asarray(control_sequence, dtype=np.float64)
         
-        return np.array(temps)
+        temps = np.empty(self.N + 1)
+        temps[0] = T_current
+        temps[1:] = qp['f'] * T_current + qp['S'] @ u + qp['c']
+        return temps
     
     def cost_function(self, control_sequence, T_current):
         """
@@ -210,26 +393,106 @@ class TemperatureMPCController:
         
         J = Σ[Q*(T - T_target)² + R*u²]
         """
-        # 预测温度轨迹
-        temps = self.predict_temperature(T_current, control_sequence)
+        T_target = self.target_temperature
+        u = np.asarray(control_sequence, dtype=np.float64)
         
-        cost = 0.0
+        # 预测温度轨迹
+        temps = self.predict_temperature(T_current, u)
         
         # 温度误差代价
-        for i in range(1, self.N + 1):
-            error = temps[i] - self.target_temperature
-            cost += self.Q_weight * error**2
+        error = temps[1:] - T_target
+        # 控制变化率（平滑性）
+        delta_u = np.diff(u)
+        
+        return (self.Q_weight * (error @ error)
+                + self.R_weight * (u @ u)
+                + 0.001 * (delta_u @ delta_u))
+    
+    def cost_gradient(self, control_sequence, T_current):
+        """
+        代价函数对控制序列的解析梯度 dJ/du = H @ u + g
+        
+        代价是控制序列的二次函数，提供给优化器后无需有限差分
+        """
+        qp = self._build_qp()
+        u = np.asarray(control_sequence, dtype=np.float64)
+        return qp['H'] @ u + self._linear_term(qp, T_current)
+    
+    def _cost_and_grad(self, control_sequence, T_current):
+        """代价与梯度（编译内核），供 minimize(jac=True) 使用"""
+        qp = self._build_qp()
+        # 有numba时使用按 (N, M) 特化的内核，否则用向量化版本
+        kernel = _make_mpc_cost_and_grad(self.N, self.M) if HAS_NUMBA else _mpc_cost_and_grad
+        return kernel(
+            np.asarray(control_sequence, dtype=np.float64), float(T_current),
+            qp['S'], qp['f'], qp['c'], float(self.target_temperature),
+            float(self.Q_weight), float(self.R_weight), 0.001)
+    
+    def _linear_term(self, qp, T_current):
+        """
+        二次型代价的线性项 g（随当前温度和目标温度变化）
+        
+        g = g_T0*T_current + g_tgt*target + g_const，目标温度分段恒定，
+        其相关部分只在目标改变时重算
+        """
+        target = self.target_temperature
+        if qp['g_target'] != target:
+            qp['g_offset'] = qp['g_const'] + qp['g_tgt'] * target
+            qp['g_target'] = target
+        return qp['g_T0'] * T_current + qp['g_offset']
+    
+    def _build_qp(self):
+        """
+        构建二次型代价的矩阵（模型参数、时域或权重变化时重建）
+        
+        离散模型 T_{k+1} = alpha*T_k + beta*u_k + gamma，预测轨迹可写成
+            temps = f*T0 + S @ u + c
+        代价 J = Q*||temps - T_target||² + R*||u||² + 0.001*||D u||²
+        其中 D 为一阶差分矩阵，于是
+            H = 2*(Q*S^T S + R*I + 0.001*D^T D),  g = 2*Q*S^T (f*T0 + c - T_target)
+        """
+        key = (self.N, self.M, self.dt, self.Q_weight, self.R_weight,
+               self.T_ambient, self.a, self.b)
+        if self._qp_key == key:
+            return self._qp
+        
+        N, M = self.N, self.M
+        alpha = 1.0 - self.a * self.dt
+        beta = self.b * self.dt
+        gamma = self.a * self.dt * self.T_ambient
+        
+        # 状态递推是一阶IIR滤波器 y_k = alpha*y_{k-1} + x_k，
+        # f、c 和 S 的每一列都是它对相应输入的响应，用 lfilter 一次算出
+        f = alpha ** np.arange(1, N + 1)
+        c = lfilter([gamma], [1.0, -alpha], np.ones(N))
         
-        # 控制代价
-        for i in range(self.M):
-            cost += self.R_weight * control_sequence[i]**2
+        # S[i, j]: 第 j 个控制量对 T_{i+1} 的影响，控制时域之后保持最后一个控制量
+        X = np.zeros((N, M))
+        X[np.arange(N), np.minimum(np.arange(N), M - 1)] = 1.0
+        S = lfilter([beta], [1.0, -alpha], X, axis=0)
         
-        # 控制变化率代价（平滑性）
-        for i in range(self.M - 1):
-            delta_u = control_sequence[i + 1] - control_sequence[i]
-            cost += 0.001 * delta_u**2
+        D = np.diff(np.eye(M), axis=0)
+        H = 2.0 * (self.Q_weight * S.T @ S + self.R_weight * np.eye(M) + 0.001 * D.T @ D)
         
-        return cost
+        self._qp = {
+            'S': S,
+            'f': f,
+            'c': c,
+            'H': H,
+            'H_factor': cho_factor(H),
+            'G': 2.0 * self.Q_weight * S.T,
+        }
+        G = self._qp['G']
+        self._qp.update({
+            'g_T0': G @ f,
+            'g_tgt': -G.sum(axis=1),
+            'g_const': G @ c,
+            'g_target': None,
+            'g_offset': None,
+            'free_factors': {},
+        })
+        self._qp_key = key
+        return self._qp
     
     def update(self, T_current):
         """
@@ -241,24 +504,37 @@ class TemperatureMPCController:
         返回:
             u_opt: 最优加热功率
         """
-        from scipy.optimize import minimize
+        if self.solver == 'analytic':
+            qp = self._build_qp()
+            g = self._linear_term(qp, T_current)
+            u_seq = _solve_box_qp(qp['H'], g, self.u_min, self.u_max,
+                                  qp['H_factor'], qp['free_factors'])
+            u_opt = u_seq[0]
+            self.control_history.append(u_opt)
+            return u_opt
         
-        # 初始猜测
-        u0 = np.zeros(self.M)
-        
-        # 定义约束
-        bounds = [(self.u_min, self.u_max) for _ in range(self.M)]
+        # 初始猜测：首次从零开始，之后用上一步解平移一步，
+        # 末尾补目标温度对应的稳态功率
+        u0 = self._u0
+        if self._u_prev is None:
+            u0[:] = 0.0
+        else:
+            u_ss = self.a * (self.target_temperature - self.T_ambient) / self.b
+            u0[:-1] = self._u_prev[1:]
+            u0[-1] = np.clip(u_ss, self.u_min, self.u_max)
         
-        # 优化求解
+        # 优化求解（约束取当前的 u_min、u_max，与解析求解一致）
         result = minimize(
-            fun=lambda u: self.cost_function(u, T_current),
+            fun=lambda u: self._cost_and_grad(u, T_current),
             x0=u0,
-            method='SLSQP',
-            bounds=bounds,
-            options={'maxiter': 100, 'ftol': 1e-6}
+            jac=True,
+            method='L-BFGS-B',
+            bounds=[(self.u_min, self.u_max)] * self.M,
+            options={'maxiter': 30, 'ftol': 1e-7}
         )
         
         optimal_control_sequence = result.x
+        self._u_prev = optimal_control_sequence.copy()
         u_opt = optimal_control_sequence[0]
         
         self.control_history.append(u_opt)
@@ -267,39 +543,27 @@ class TemperatureMPCController:
     def reset(self):
         """重置控制器"""
         self.control_history = []
+        self._u_prev = None
 
 
-def run_temperature_control_experiment():
-    """
-    运行温度控制实验
-    
-    场景：冬天室外5°C，需要将房间从5°C加热到22°C并保持
+def _run_mpc(time, T_target, params):
     """
-    print("=" * 70)
-    print("Temperature Control: MPC vs PID")
-    print("Scenario: Heat room from 5°C to 22°C (Outdoor: 5°C)")
-    print("=" * 70)
+    MPC控制仿真（顶层函数，可在子进程中运行）
     
-    # 仿真参数
-    dt = 10.0  # 10秒采样（温度系统慢）
-    sim_time = 3600.0  # 1小时
-    time_steps = int(sim_time / dt)
-    time = np.linspace(0, sim_time, time_steps)
-    
-    # 目标温度（阶跃 + 跟踪）
-    T_target = np.ones(time_steps) * 22.0
-    # 在30分钟后改变目标温度到20°C
-    T_target[int(1800/dt):] = 20.0
-    
-    T_ambient = 5.0
-    T_initial = 5.0
+    参数:
+        time: 时间序列
+        T_target: 各时刻目标温度
+        params: {'dt', 'T_ambient', 'T_initial'}
     
-    # ==========================
-    # 1. MPC控制
-    # ==========================
-    print("\n🎯 Running MPC Controller...")
+    返回:
+        {'T': 温度, 'u': 加热功率, 'log': 需要按顺序打印的输出行}
+    """
+    dt = params['dt']
+    time_steps = len(time)
+    log = ["\n🎯 Running MPC Controller..."]
     
-    room_mpc = TemperatureRoom(T_ambient=T_ambient, T_initial=T_initial)
+    room_mpc = TemperatureRoom(T_ambient=params['T_ambient'], T_initial=params['T_initial'],
+                               max_steps=time_steps)
     mpc_controller = TemperatureMPCController(
         prediction_horizon=20,  # 预测200秒
         control_horizon=10,     # 控制100秒
@@ -308,13 +572,13 @@ def run_temperature_control_experiment():
         R_weight=0.001,  # 允许较大控制
         u_min=0,
         u_max=2000,
-        T_ambient=T_ambient
+        T_ambient=params['T_ambient']
     )
     
-    T_mpc = []
-    u_mpc = []
+    T_mpc = np.empty(time_steps)
+    u_mpc = np.empty(time_steps)
     
-    for i, t in enumerate(time):
+    for i in range(time_steps):
         # 设置目标
         mpc_controller.set_target(T_target[i])
         
@@ -324,37 +588,26 @@ def run_temperature_control_experiment():
         # 系统响应
         room_mpc.step(u, dt)
         
-        T_mpc.append(room_mpc.T)
-        u_mpc.append(u)
+        T_mpc[i] = room_mpc.T
+        u_mpc[i] = u
         
         if i % 36 == 0:  # 每6分钟打印一次
-            print(f"  t={t/60:5.1f}min: T={room_mpc.T:5.2f}°C, "
-                  f"Target={T_target[i]:.1f}°C, Power={u:6.1f}W")
+            log.append(f"  t={time[i]/60:5.1f}min: T={room_mpc.T:5.2f}°C, "
+                       f"Target={T_target[i]:.1f}°C, Power={u:6.1f}W")
     
-    # 计算性能指标
-    error_mpc = np.array(T_mpc) - T_target
-    ise_mpc = np.sum(error_mpc**2) * dt  # 积分平方误差
-    iae_mpc = np.sum(np.abs(error_mpc)) * dt  # 积分绝对误差
-    settling_time_mpc = None
-    for i in range(len(T_mpc)):
-        if np.abs(error_mpc[i]) < 0.5:  # 进入±0.5°C范围
-            settling_time_mpc = time[i]
-            break
-    
-    print(f"\n  MPC Performance:")
-    print(f"    ISE: {ise_mpc:.2f}")
-    print(f"    IAE: {iae_mpc:.2f}")
-    if settling_time_mpc is not None:
-        print(f"    Settling time: {settling_time_mpc:.1f}s ({settling_time_mpc/60:.1f}min)")
-    else:
-        print(f"    Settling time: Not achieved within simulation time")
-    
-    # ==========================
-    # 2. PID控制
-    # ==========================
-    print("\n🎯 Running PID Controller...")
+    return {'T': T_mpc, 'u': u_mpc, 'log': log}
+
+
+def _run_pid(time, T_target, params):
+    """
+    PID控制仿真（参数与返回同 _run_mpc）
+    """
+    dt = params['dt']
+    time_steps = len(time)
+    log = ["\n🎯 Running PID Controller..."]
     
-    room_pid = TemperatureRoom(T_ambient=T_ambient, T_initial=T_initial)
+    room_pid = TemperatureRoom(T_ambient=params['T_ambient'], T_initial=params['T_initial'],
+                               max_steps=time_steps)
     pid_controller = PIDController(
         Kp=100.0,   # 比例增益
         Ki=1.0,     # 积分增益
@@ -363,10 +616,10 @@ def run_temperature_control_experiment():
     )
     pid_controller.set_output_limits(0, 2000)
     
-    T_pid = []
-    u_pid = []
+    T_pid = np.empty(time_steps)
+    u_pid = np.empty(time_steps)
     
-    for i, t in enumerate(time):
+    for i in range(time_steps):
         # 设置目标
         pid_controller.setpoint = T_target[i]
         
@@ -376,22 +629,107 @@ def run_temperature_control_experiment():
         # 系统响应
         room_pid.step(u, dt)
         
-        T_pid.append(room_pid.T)
-        u_pid.append(u)
+        T_pid[i] = room_pid.T
+        u_pid[i] = u
         
         if i % 36 == 0:
-            print(f"  t={t/60:5.1f}min: T={room_pid.T:5.2f}°C, "
-                  f"Target={T_target[i]:.1f}°C, Power={u:6.1f}W")
+            log.append(f"  t={time[i]/60:5.1f}min: T={room_pid.T:5.2f}°C, "
+                       f"Target={T_target[i]:.1f}°C, Power={u:6.1f}W")
+    
+    return {'T': T_pid, 'u': u_pid, 'log': log}
+
+
+def _run_none(time, T_target, params):
+    """
+    无控制基线（参数与返回同 _run_mpc）
+    
+    u=0 时欧拉离散模型 T_{k+1} = T_amb + (1 - a*dt)*(T_k - T_amb)，
+    整条轨迹有闭式解，无需逐步仿真
+    """
+    T_ambient = params['T_ambient']
+    time_steps = len(time)
+    
+    room_none = TemperatureRoom(T_ambient=T_ambient, T_initial=params['T_initial'])
+    alpha = 1.0 - room_none.a * params['dt']
+    T_none = T_ambient + (params['T_initial'] - T_ambient) * alpha ** np.arange(1, time_steps + 1)
+    u_none = np.zeros(time_steps)
+    
+    return {'T': T_none, 'u': u_none, 'log': ["\n🎯 Running No Control (Baseline)..."]}
+
+
+def run_temperature_control_experiment(processes=None):
+    """
+    运行温度控制实验
+    
+    场景：冬天室外5°C，需要将房间从5°C加热到22°C并保持
+    
+    参数:
+        processes: 并行运行三种控制仿真的进程数，默认取 CPU 核数与3的较小值；
+                   设为1时在当前进程中顺序运行
+    """
+    print("=" * 70)
+    print("Temperature Control: MPC vs PID")
+    print("Scenario: Heat room from 5°C to 22°C (Outdoor: 5°C)")
+    print("=" * 70)
+    
+    # 仿真参数
+    dt = 10.0  # 10秒采样（温度系统慢）
+    sim_time = 3600.0  # 1小时
+    time_steps = int(sim_time / dt)
+    steps = np.arange(time_steps)
+    time = steps * dt  # 第 k 步对应 t = k*dt
+    
+    # 目标温度（阶跃 + 跟踪）：30分钟后改变目标温度到20°C
+    T_target = np.where(time < 1800.0, 22.0, 20.0)
+    
+    T_ambient = 5.0
+    T_initial = 5.0
+    
+    # 三个仿真互不依赖，并行运行
+    params = {'dt': dt, 'T_ambient': T_ambient, 'T_initial': T_initial}
+    runners = [_run_mpc, _run_pid, _run_none]
+    if processes is None:
+        processes = min(os.cpu_count() or 1, len(runners))
+    if processes > 1:
+        with multiprocessing.Pool(processes=processes) as pool:
+            pending = [pool.apply_async(run, (time, T_target, params)) for run in runners]
+            mpc_result, pid_result, none_result = [p.get() for p in pending]
+    else:
+        mpc_result, pid_result, none_result = [run(time, T_target, params) for run in runners]
+    
+    # ==========================
+    # 1. MPC控制
+    # ==========================
+    print("\n".join(mpc_result['log']))
+    T_mpc, u_mpc = mpc_result['T'], mpc_result['u']
     
     # 计算性能指标
-    error_pid = np.array(T_pid) - T_target
+    error_mpc = T_mpc - T_target
+    ise_mpc = np.sum(error_mpc**2) * dt  # 积分平方误差
+    iae_mpc = np.sum(np.abs(error_mpc)) * dt  # 积分绝对误差
+    in_band = np.abs(error_mpc) < 0.5  # 进入±0.5°C范围
+    settling_time_mpc = time[in_band.argmax()] if in_band.any() else None
+    
+    print(f"\n  MPC Performance:")
+    print(f"    ISE: {ise_mpc:.2f}")
+    print(f"    IAE: {iae_mpc:.2f}")
+    if settling_time_mpc is not None:
+        print(f"    Settling time: {settling_time_mpc:.1f}s ({settling_time_mpc/60:.1f}min)")
+    else:
+        print(f"    Settling time: Not achieved within simulation time")
+    
+    # ==========================
+    # 2. PID控制
+    # ==========================
+    print("\n".join(pid_result['log']))
+    T_pid, u_pid = pid_result['T'], pid_result['u']
+    
+    # 计算性能指标
+    error_pid = T_pid - T_target
     ise_pid = np.sum(error_pid**2) * dt
     iae_pid = np.sum(np.abs(error_pid)) * dt
-    settling_time_pid = None
-    for i in range(len(T_pid)):
-        if np.abs(error_pid[i]) < 0.5:
-            settling_time_pid = time[i]
-            break
+    in_band = np.abs(error_pid) < 0.5
+    settling_time_pid = time[in_band.argmax()] if in_band.any() else None
     
     print(f"\n  PID Performance:")
     print(f"    ISE: {ise_pid:.2f}")
@@ -404,37 +742,42 @@ def run_temperature_control_experiment():
     # ==========================
     # 3. 无控制（自由冷却）
     # ==========================
-    print("\n🎯 Running No Control (Baseline)...")
-    
-    room_none = TemperatureRoom(T_ambient=T_ambient, T_initial=T_initial)
-    T_none = []
-    u_none = []
-    
-    for i, t in enumerate(time):
-        u = 0  # 无加热
-        room_none.step(u, dt)
-        T_none.append(room_none.T)
-        u_none.append(u)
+    print("\n".join(none_result['log']))
+    T_none = none_result['T']
     
     # ==========================
     # 4. 可视化
     # ==========================
     print("\n📊 Generating visualization...")
     
+    # matplotlib 只在绘图时导入，演示/教程等不绘图的入口无需承担导入开销
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from matplotlib.gridspec import GridSpec
+    
+    plt.rcParams['font.family'] = 'serif'
+    plt.rcParams['font.serif'] = ['Times New Roman']
+    plt.rcParams['font.size'] = 10
+    
     fig = plt.figure(figsize=(16, 10))
     gs = GridSpec(3, 2, figure=fig, hspace=0.3, wspace=0.3)
     
-    # 转换时间为分钟
-    time_min = time / 60
+    # 转换时间为分钟；长仿真时把稠密曲线抽稀到约1000点再绘制
+    sl = slice(None, None, len(time) // 1000) if len(time) > 2000 else slice(None)
+    time_min = time[sl] / 60
+    T_target_p, T_mpc_p, T_pid_p, T_none_p = T_target[sl], T_mpc[sl], T_pid[sl], T_none[sl]
+    u_mpc_p, u_pid_p = u_mpc[sl], u_pid[sl]
+    error_mpc_p, error_pid_p = error_mpc[sl], error_pid[sl]
     
     # 子图1: 温度响应
     ax1 = fig.add_subplot(gs[0, :])
-    ax1.plot(time_min, T_target, 'k--', linewidth=2, label='Target Temperature', alpha=0.7)
-    ax1.plot(time_min, T_mpc, 'b-', linewidth=2, label='MPC', alpha=0.8)
-    ax1.plot(time_min, T_pid, 'r-', linewidth=2, label='PID', alpha=0.8)
-    ax1.plot(time_min, T_none, 'gray', linewidth=1.5, label='No Control', alpha=0.6, linestyle=':')
+    ax1.plot(time_min, T_target_p, 'k--', linewidth=2, label='Target Temperature', alpha=0.7, rasterized=True)
+    ax1.plot(time_min, T_mpc_p, 'b-', linewidth=2, label='MPC', alpha=0.8, rasterized=True)
+    ax1.plot(time_min, T_pid_p, 'r-', linewidth=2, label='PID', alpha=0.8, rasterized=True)
+    ax1.plot(time_min, T_none_p, 'gray', linewidth=1.5, label='No Control', alpha=0.6, linestyle=':', rasterized=True)
     ax1.axhline(y=T_ambient, color='cyan', linestyle=':', alpha=0.5, label=f'Ambient ({T_ambient}°C)')
-    ax1.fill_between(time_min, T_target - 0.5, T_target + 0.5, alpha=0.2, color='green', label='±0.5°C Band')
+    ax1.fill_between(time_min, T_target_p - 0.5, T_target_p + 0.5, alpha=0.2, color='green', label='±0.5°C Band')
     ax1.set_xlabel('Time (minutes)', fontsize=12)
     ax1.set_ylabel('Temperature (°C)', fontsize=12)
     ax1.set_title('Temperature Response: MPC vs PID', fontsize=14, fontweight='bold')
@@ -444,8 +787,8 @@ def run_temperature_control_experiment():
     
     # 子图2: 控制输入
     ax2 = fig.add_subplot(gs[1, :])
-    ax2.plot(time_min, u_mpc, 'b-', linewidth=1.5, label='MPC', alpha=0.8)
-    ax2.plot(time_min, u_pid, 'r-', linewidth=1.5, label='PID', alpha=0.8)
+    ax2.plot(time_min, u_mpc_p, 'b-', linewidth=1.5, label='MPC', alpha=0.8, rasterized=True)
+    ax2.plot(time_min, u_pid_p, 'r-', linewidth=1.5, label='PID', alpha=0.8, rasterized=True)
     ax2.axhline(y=2000, color='red', linestyle='--', alpha=0.5, label='Max Power (2000W)')
     ax2.axhline(y=0, color='black', linestyle='--', alpha=0.3)
     ax2.fill_between(time_min, 0, 2000, alpha=0.1, color='red')
@@ -459,8 +802,8 @@ def run_temperature_control_experiment():
     
     # 子图3: 温度误差
     ax3 = fig.add_subplot(gs[2, 0])
-    ax3.plot(time_min, error_mpc, 'b-', linewidth=1.5, label='MPC', alpha=0.8)
-    ax3.plot(time_min, error_pid, 'r-', linewidth=1.5, label='PID', alpha=0.8)
+    ax3.plot(time_min, error_mpc_p, 'b-', linewidth=1.5, label='MPC', alpha=0.8, rasterized=True)
+    ax3.plot(time_min, error_pid_p, 'r-', linewidth=1.5, label='PID', alpha=0.8, rasterized=True)
     ax3.axhline(y=0, color='k', linestyle='--', alpha=0.5)
     ax3.axhline(y=0.5, color='green', linestyle=':', alpha=0.5)
     ax3.axhline(y=-0.5, color='green', linestyle=':', alpha=0.5)
@@ -505,13 +848,15 @@ def run_temperature_control_experiment():
     plt.suptitle('Room Temperature Control: MPC vs PID\n'
                  'Model Predictive Control with Prediction Horizon',
                  fontsize=15, fontweight='bold', y=0.995)
+    # 显式设置边距，省去 bbox_inches='tight' 的额外渲染
+    fig.subplots_adjust(left=0.06, right=0.98, bottom=0.07, top=0.89)
     
     # 保存图表
     script_dir = os.path.dirname(os.path.abspath(__file__))
     output_dir = os.path.join(os.path.dirname(script_dir), 'output')
     os.makedirs(output_dir, exist_ok=True)
     output_path = os.path.join(output_dir, 'mpc_temperature_control.png')
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
+    plt.savefig(output_path, dpi=300)
     print(f"\n✓ Figure saved: {output_path}")
     plt.close()
     
@@ -602,7 +947,7 @@ def demonstrate_mpc_prediction():
     print(f"\n📈 Predicted Temperature Trajectory:")
     T_predicted = room.T
     for i in range(min(10, mpc.N)):
-        T_predicted = temperature_dynamics_for_mpc(T_predicted, u_opt, dt, T_ambient)
+        T_predicted = _dyn_scalar(T_predicted, u_opt, dt, T_ambient)
         print(f"  Step {i+1} (t={dt*(i+1)/60:.1f}min): T = {T_predicted:.2f}°C, "
               f"Error = {T_predicted - T_target:+.2f}°C")
     
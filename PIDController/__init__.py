@@ -5,16 +5,20 @@ PID控制器包
 包含完整的PID控制器实现和实验代码。
 """
 
-from .pid_controller import PIDController
-from .simulated_system import FirstOrderSystem, SecondOrderSystem, SystemWithNoise
+from .pid_controller import PIDController, BatchedPIDController
+from .simulated_system import (FirstOrderSystem, SecondOrderSystem, SystemWithNoise,
+                               FirstOrderSystemBank, SecondOrderSystemBank)
 
 __version__ = "1.1.0"
 __author__ = "Control Engineering Lab"
 
 __all__ = [
     'PIDController',
+    'BatchedPIDController',
     'FirstOrderSystem',
     'SecondOrderSystem',
     'SystemWithNoise',
+    'FirstOrderSystemBank',
+    'SecondOrderSystemBank',
 ]
 
@@ -0,0 +1,51 @@
+"""
+Numba JIT 兼容层
+
+安装了 numba 时导出真正的 njit/prange；
+未安装时退化为不做任何事的装饰器，代码照常以纯Python运行。
+
+磁盘缓存（cache=True）只在模块以裸模块名导入时启用：numba 按源文件名
+定位缓存，同一文件若既以包名（如 PIDController.cartpole_pid）又以
+裸模块名（start.py 的导入方式）或 __main__ 导入，会读到另一种导入方式
+写入的缓存，并因其记录的模块名不可导入而失败。
+"""
+
+import inspect
+import os
+
+try:
+    from numba import njit as _numba_njit, prange
+    HAS_NUMBA = True
+except ImportError:  # numba为可选依赖
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        """无numba时的占位装饰器，直接返回原函数"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def decorator(func):
+            return func
+        return decorator
+
+    prange = range
+else:
+    def _cache_safe(func):
+        """函数所在模块是否以源文件同名的裸模块名导入"""
+        stem = os.path.splitext(os.path.basename(inspect.getfile(func)))[0]
+        return func.__module__ == stem
+
+    def njit(*args, **kwargs):
+        """numba.njit，cache=True 仅在缓存可安全复用时生效"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return _numba_njit(args[0])
+
+        def decorator(func):
+            options = dict(kwargs)
+            if options.get('cache') and not _cache_safe(func):
+                options['cache'] = False
+            return _numba_njit(*args, **options)(func)
+        return decorator
+
+
+__all__ = ['njit', 'prange', 'HAS_NUMBA']
@@ -0,0 +1,79 @@
+"""
+PID实验绘图的公共设置
+
+统一选择非交互式后端、设置字体和路径化简参数，并提供图表输出目录、
+保存参数以及新建、保存图形的函数，供 pid_experiments 与 quick_demo 共用
+"""
+import os
+
+import matplotlib
+matplotlib.use('Agg')  # 使用非交互式后端
+import matplotlib.pyplot as plt
+
+# 设置中文字体支持
+plt.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans']
+plt.rcParams['axes.unicode_minus'] = False
+
+# 2000点的曲线由Agg按像素精度化简路径后再绘制，长路径分块渲染
+plt.rcParams['path.simplify'] = True
+plt.rcParams['path.simplify_threshold'] = 1.0
+plt.rcParams['agg.path.chunksize'] = 10000
+
+# 扫描曲线共用的线型参数
+LINE_KW = dict(linewidth=2)
+
+# 图表输出目录（仓库根目录下的 output），按本文件位置解析，与当前工作目录无关
+OUTPUT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'output'))
+os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+# PNG保存参数：150 dpi 对屏幕查看已足够；不用 bbox_inches='tight'，省去求边界框的额外渲染
+SAVE_KW = dict(dpi=150, bbox_inches=None)
+
+
+def new_figure(figsize):
+    """
+    新建一个 figsize 大小的图形，各实验各用一个，保存后由 save_figure 关闭
+
+    参数:
+        figsize: (宽, 高)，单位英寸
+
+    返回:
+        matplotlib Figure
+    """
+    return plt.figure(figsize=figsize)
+
+
+def save_figure(fig, filename):
+    """
+    按 SAVE_KW 把图形保存到 OUTPUT_DIR 并关闭，释放pyplot持有的引用
+
+    参数:
+        fig: 要保存的图形
+        filename: 输出文件名
+
+    返回:
+        保存路径
+    """
+    output_path = os.path.join(OUTPUT_DIR, filename)
+    fig.savefig(output_path, **SAVE_KW)
+    plt.close(fig)
+    return output_path
+
+
+def decimate(ax, *arrays):
+    """
+    按坐标轴在保存分辨率下的像素宽度等步长抽取曲线点
+
+    每个像素列至少保留一个点，图上看不出差别，但Agg要处理的顶点数随之减少；
+    性能指标仍用完整分辨率的数组计算
+
+    参数:
+        ax: 要绘制到的坐标轴
+        arrays: 等长的横、纵坐标数组
+
+    返回:
+        抽取后的数组列表
+    """
+    width_px = ax.get_position().width * ax.figure.get_figwidth() * SAVE_KW['dpi']
+    stride = max(1, int(len(arrays[0]) // width_px))
+    return [array[::stride] for array in arrays]
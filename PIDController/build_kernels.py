@@ -0,0 +1,54 @@
+"""
+把PID参数实验的仿真内核预编译为扩展模块 pid_kernels
+
+安装了 numba 时运行一次:
+    python build_kernels.py
+
+在本目录生成 pid_kernels 扩展模块（.so/.pyd，与平台相关，不纳入版本管理）。
+pid_experiments 优先导入它，整段仿真不再有首次调用时的JIT编译等待；
+未生成或与当前平台不匹配时照常使用 pid_controller_jit 中的JIT内核。
+"""
+import os
+import sys
+
+from numba.pycc import CC
+
+try:
+    from . import pid_controller_jit
+except ImportError:
+    import pid_controller_jit
+
+# 参数类型与 pid_experiments._run_compiled 的调用一致
+_RESULT = 'Tuple((f8[:], f8[:], f8[:, :]))'
+_PID_ARGS = 'f8, f8, f8, f8, f8, f8'
+_RUN_ARGS = 'f8, f8[:], i8, f8, b1'
+
+SIGNATURES = {
+    'simulate_first_order':
+        f'{_RESULT}({_PID_ARGS}, f8, f8, {_RUN_ARGS})',
+    'simulate_second_order':
+        f'{_RESULT}({_PID_ARGS}, f8, f8, f8, f8, f8, {_RUN_ARGS})',
+}
+
+
+def build(output_dir=None):
+    """
+    编译 pid_kernels 扩展模块
+
+    参数:
+        output_dir: 输出目录，默认为本文件所在目录
+
+    返回:
+        生成的扩展模块路径
+    """
+    cc = CC('pid_kernels')
+    cc.output_dir = output_dir or os.path.dirname(os.path.abspath(__file__))
+    cc.verbose = True
+    for name, signature in SIGNATURES.items():
+        cc.export(name, signature)(getattr(pid_controller_jit, name).py_func)
+    cc.compile()
+    return os.path.join(cc.output_dir, cc.output_file)
+
+
+if __name__ == "__main__":
+    print(f"已生成: {build(*sys.argv[1:])}")
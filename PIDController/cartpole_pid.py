@@ -28,9 +28,11 @@ plt.rcParams['font.serif'] = ['Times New Roman']
 plt.rcParams['font.size'] = 10
 
 try:
-    from .pid_controller import PIDController
+    from .pid_controller import PIDController, BatchedPIDController, _HistoryArray
+    from .pid_controller_jit import _rk4_step, run_episode, run_episodes, sweep_episodes
 except ImportError:
-    from pid_controller import PIDController
+    from pid_controller import PIDController, BatchedPIDController, _HistoryArray
+    from pid_controller_jit import _rk4_step, run_episode, run_episodes, sweep_episodes
 
 
 class CartPole:
@@ -62,27 +64,36 @@ class CartPole:
         self.theta = 0.0       # 杆子角度 (弧度)
         self.theta_dot = 0.0   # 杆子角速度
         
-        # 历史记录
-        self.history = {
-            'x': [self.x],
-            'x_dot': [self.x_dot],
-            'theta': [self.theta],
-            'theta_dot': [self.theta_dot]
+        # 历史记录：预分配的 (T+1, 4) 数组，每行为 [x, x_dot, theta, theta_dot]
+        self._history = _HistoryArray(4)
+        self._history.append((self.x, self.x_dot, self.theta, self.theta_dot))
+    
+    @property
+    def history(self):
+        """历史记录字典，每项为 (T+1,) 数组视图"""
+        data = self._history.values
+        return {
+            'x': data[:, 0],
+            'x_dot': data[:, 1],
+            'theta': data[:, 2],
+            'theta_dot': data[:, 3]
         }
     
-    def reset(self, x=0.0, x_dot=0.0, theta=0.1, theta_dot=0.0):
-        """重置系统状态"""
+    def reset(self, x=0.0, x_dot=0.0, theta=0.1, theta_dot=0.0, n_steps=None):
+        """
+        重置系统状态
+        
+        参数:
+            x, x_dot, theta, theta_dot: 初始状态
+            n_steps: 可选，预计的仿真步数，用于预分配历史记录
+        """
         self.x = x
         self.x_dot = x_dot
         self.theta = theta  # 初始偏离一点
         self.theta_dot = theta_dot
         
-        self.history = {
-            'x': [self.x],
-            'x_dot': [self.x_dot],
-            'theta': [self.theta],
-            'theta_dot': [self.theta_dot]
-        }
+        self._history.clear(None if n_steps is None else n_steps + 1)
+        self._history.append((self.x, self.x_dot, self.theta, self.theta_dot))
     
     def step(self, force, dt):
         """
@@ -95,39 +106,13 @@ class CartPole:
         返回:
             (x, x_dot, theta, theta_dot)
         """
-        # 使用Runge-Kutta 4阶方法求解
-        def derivatives(state, u):
-            """计算状态导数"""
-            x, x_dot, theta, theta_dot = state
-            
-            sin_theta = np.sin(theta)
-            cos_theta = np.cos(theta)
-            
-            # 系统动力学方程
-            temp = (u + self.m * self.l * theta_dot**2 * sin_theta) / (self.M + self.m)
-            theta_acc = (self.g * sin_theta - cos_theta * temp) / \
-                       (self.l * (4.0/3.0 - self.m * cos_theta**2 / (self.M + self.m)))
-            x_acc = temp - self.m * self.l * theta_acc * cos_theta / (self.M + self.m)
-            
-            return np.array([x_dot, x_acc, theta_dot, theta_acc])
-        
-        # RK4积分
-        state = np.array([self.x, self.x_dot, self.theta, self.theta_dot])
-        k1 = derivatives(state, force)
-        k2 = derivatives(state + dt/2 * k1, force)
-        k3 = derivatives(state + dt/2 * k2, force)
-        k4 = derivatives(state + dt * k3, force)
-        
-        state_new = state + dt/6 * (k1 + 2*k2 + 2*k3 + k4)
-        
-        # 更新状态
-        self.x, self.x_dot, self.theta, self.theta_dot = state_new
+        # RK4积分（编译内核）
+        self.x, self.x_dot, self.theta, self.theta_dot = _rk4_step(
+            self.x, self.x_dot, self.theta, self.theta_dot, float(force),
+            self.M, self.m, self.l, self.g, dt)
         
         # 记录历史
-        self.history['x'].append(self.x)
-        self.history['x_dot'].append(self.x_dot)
-        self.history['theta'].append(self.theta)
-        self.history['theta_dot'].append(self.theta_dot)
+        self._history.append((self.x, self.x_dot, self.theta, self.theta_dot))
         
         return self.x, self.x_dot, self.theta, self.theta_dot
     
@@ -138,8 +123,126 @@ class CartPole:
         失败条件:
         - 小车超出范围 (|x| > x_threshold)
         - 杆子倾斜过大 (|theta| > theta_threshold ≈ 12度)
+        
+        以平方比较代替取绝对值
         """
-        return abs(self.x) > x_threshold or abs(self.theta) > theta_threshold
+        x, theta = self.x, self.theta
+        return (x * x > x_threshold * x_threshold
+                or theta * theta > theta_threshold * theta_threshold)
+
+
+class BatchedCartPole:
+    """
+    批量CartPole系统：B 个相同参数的倒立摆同步推进
+    
+    状态按分量分别存储（结构数组SoA）：x、x_dot、theta、theta_dot
+    各为长度 B 的连续数组（同一 (4, B) 数组的行视图），
+    RK4 积分对各分量做连续内存的向量运算，与 CartPole.step 逐个计算的结果一致
+    
+    参数:
+        batch_size: 倒立摆数量 B
+        M, m, l, g: 系统参数（同 CartPole）
+    """
+    
+    def __init__(self, batch_size, M=1.0, m=0.1, l=0.5, g=9.8):
+        self.M = M
+        self.m = m
+        self.l = l
+        self.g = g
+        # 动力学中与状态无关的常数
+        self._inv_Mm = 1.0 / (M + m)
+        self._ml = m * l
+        
+        self._data = np.zeros((4, batch_size))
+        self.x, self.x_dot, self.theta, self.theta_dot = self._data
+        self._next = np.empty_like(self._data)  # RK4结果缓冲区，每步复用
+        # 每行为一个时间步展平后的 (4, B) 状态
+        self._history = _HistoryArray(4 * batch_size)
+        self._history.append(self._data.ravel())
+    
+    def reset(self, x=0.0, x_dot=0.0, theta=0.1, theta_dot=0.0, n_steps=None):
+        """
+        重置系统状态，各参数可为标量或长度为 B 的数组
+        
+        n_steps: 可选，预计的仿真步数，用于预分配历史记录
+        """
+        self.x[:] = x
+        self.x_dot[:] = x_dot
+        self.theta[:] = theta
+        self.theta_dot[:] = theta_dot
+        self._history.clear(None if n_steps is None else n_steps + 1)
+        self._history.append(self._data.ravel())
+    
+    def current_state(self):
+        """(B, 4) 状态视图，每行为 [x, x_dot, theta, theta_dot]（不复制）"""
+        return self._data.T
+    
+    @property
+    def history(self):
+        """历史记录字典，每项为 (T+1, B) 数组视图"""
+        data = self._history.values.reshape(-1, 4, self._data.shape[1])
+        return {
+            'x': data[:, 0],
+            'x_dot': data[:, 1],
+            'theta': data[:, 2],
+            'theta_dot': data[:, 3]
+        }
+    
+    def _accelerations(self, theta, theta_dot, u):
+        """计算整批的 (x_acc, theta_acc)"""
+        sin_theta = np.sin(theta)
+        cos_theta = np.cos(theta)
+        
+        temp = (u + self._ml * theta_dot**2 * sin_theta) * self._inv_Mm
+        theta_acc = (self.g * sin_theta - cos_theta * temp) / \
+                   (self.l * (4.0/3.0 - self.m * self._inv_Mm * cos_theta**2))
+        x_acc = temp - self._ml * self._inv_Mm * theta_acc * cos_theta
+        
+        return x_acc, theta_acc
+    
+    def step(self, forces, dt, active=None):
+        """
+        整批推进一步（RK4）
+        
+        参数:
+            forces: 长度为 B 的控制力数组
+            dt: 时间步长
+            active: 可选布尔掩码，仅推进为 True 的倒立摆（其余保持不变）
+        
+        返回:
+            (B, 4) 状态视图
+        """
+        u = np.asarray(forces, dtype=np.float64)
+        x_dot, theta, theta_dot = self.x_dot, self.theta, self.theta_dot
+        
+        # RK4：位置导数即速度，只需在各中间点计算加速度
+        a1, b1 = self._accelerations(theta, theta_dot, u)
+        xd2, th2, thd2 = x_dot + dt/2 * a1, theta + dt/2 * theta_dot, theta_dot + dt/2 * b1
+        a2, b2 = self._accelerations(th2, thd2, u)
+        xd3, th3, thd3 = x_dot + dt/2 * a2, theta + dt/2 * thd2, theta_dot + dt/2 * b2
+        a3, b3 = self._accelerations(th3, thd3, u)
+        xd4, th4, thd4 = x_dot + dt * a3, theta + dt * thd3, theta_dot + dt * b3
+        a4, b4 = self._accelerations(th4, thd4, u)
+        
+        new = self._next
+        new[0] = self.x + dt/6 * (x_dot + 2*xd2 + 2*xd3 + xd4)
+        new[1] = x_dot + dt/6 * (a1 + 2*a2 + 2*a3 + a4)
+        new[2] = theta + dt/6 * (theta_dot + 2*thd2 + 2*thd3 + thd4)
+        new[3] = theta_dot + dt/6 * (b1 + 2*b2 + 2*b3 + b4)
+        
+        if active is None:
+            self._data[:] = new
+        else:
+            self._data[:, active] = new[:, active]
+        
+        self._history.append(self._data.ravel())
+        return self._data.T
+    
+    def is_failed(self, x_threshold=2.4, theta_threshold=0.21):
+        """逐个检查是否失败，返回长度为 B 的布尔数组"""
+        x, theta = self.x, self.theta
+        return ((x * x > x_threshold * x_threshold)
+                | (theta * theta > theta_threshold * theta_threshold))
 
 
 class CartPolePIDController:
@@ -171,12 +274,14 @@ class CartPolePIDController:
         self.angle_pid.set_output_limits(-100, 100)
         self.position_pid.set_output_limits(-0.3, 0.3)
     
-    def control_angle_only(self, theta, theta_dot, dt):
+    def control_angle_only(self, theta, dt):
         """
         策略1: 仅控制角度
         
         这是最简单的策略，只关注保持杆子竖直
         缺点: 小车可能会漂移
+        
+        微分项由 PIDController 对误差差分得到，因此不需要传入角速度
         """
         force = self.angle_pid.update(theta, dt)
         return force
@@ -205,8 +310,386 @@ class CartPolePIDController:
         self.position_pid.reset()
 
 
-def run_cartpole_experiment():
-    """运行CartPole PID控制实验"""
+class BatchedCartPolePIDController:
+    """
+    批量CartPole PID控制器，与 BatchedCartPole 配合使用
+    
+    每个倒立摆可选用不同策略（'angle_only' 或 'cascade'），增益与
+    CartPolePIDController 相同；一次 step_batch 计算整批控制力
+    
+    参数:
+        strategies: 长度为 n 的策略名列表
+    """
+    
+    def __init__(self, strategies):
+        n = len(strategies)
+        self.cascade = np.array([s == 'cascade' for s in strategies])
+        
+        self.angle_pid = BatchedPIDController(n, Kp=150.0, Ki=0.5, Kd=40.0, setpoint=0.0)
+        self.position_pid = BatchedPIDController(n, Kp=1.0, Ki=0.01, Kd=8.0, setpoint=0.0)
+        
+        self.angle_pid.set_output_limits(-100, 100)
+        self.position_pid.set_output_limits(-0.3, 0.3)
+    
+    def step_batch(self, state, dt, active=None):
+        """
+        计算整批控制力
+        
+        参数:
+            state: (n, 4) 状态数组，每行为 [x, x_dot, theta, theta_dot]
+            dt: 时间步长
+            active: 可选布尔掩码，仅更新为 True 的倒立摆的控制器状态
+        
+        返回:
+            长度为 n 的控制力数组
+        """
+        x = state[:, 0]
+        theta = state[:, 2]
+        
+        # 级联策略：外环位置控制器输出期望角度；仅角度策略的目标角度保持为0
+        cascade_active = self.cascade if active is None else self.cascade & active
+        desired_angle = self.position_pid.update(x, dt, cascade_active)
+        self.angle_pid.set_setpoint(np.where(self.cascade, desired_angle, 0.0))
+        
+        return self.angle_pid.update(theta, dt, active)
+    
+    def reset(self):
+        """重置所有PID控制器"""
+        self.angle_pid.reset()
+        self.position_pid.reset()
+        self.angle_pid.set_setpoint(0.0)
+
+
+def simulate_cartpole_pid_batch(initial_thetas, strategies, sim_time=10.0, dt=0.02):
+    """
+    用 BatchedCartPole 与 BatchedCartPolePIDController 批量仿真PID闭环
+    
+    纯NumPy实现（不依赖numba），每步顺序与 run_episode 相同。各倒立摆用
+    alive 掩码独立结束：已失败的倒立摆状态和控制器状态冻结不再推进，
+    其余继续仿真，全部失败时才提前退出循环
+    
+    参数:
+        initial_thetas: 长度为 B 的初始角度 (rad)
+        strategies: 长度为 B 的策略名列表（'angle_only' 或 'cascade'）
+        sim_time: 仿真时长 (s)
+        dt: 时间步长
+    
+    返回:
+        (history, forces, fail_steps)
+        history: 同 BatchedCartPole.history，失败后的状态保持为失败时的值
+        forces: (time_steps, B) 控制力，失败后为0
+        fail_steps: (B,) 各倒立摆失败的步序号，未失败为 -1
+    """
+    B = len(strategies)
+    time_steps = int(sim_time / dt)
+    
+    cartpoles = BatchedCartPole(B)
+    cartpoles.reset(theta=initial_thetas, n_steps=time_steps)
+    controller = BatchedCartPolePIDController(strategies)
+    
+    forces = np.zeros((time_steps, B))
+    fail_steps = np.full(B, -1)
+    alive = np.ones(B, dtype=bool)
+    
+    for i in range(time_steps):
+        force = controller.step_batch(cartpoles.current_state(), dt, alive)
+        forces[i, alive] = force[alive]
+        
+        # 本步新失败的倒立摆记录失败步并冻结
+        newly_failed = alive & cartpoles.is_failed()
+        fail_steps[newly_failed] = i
+        alive &= ~newly_failed
+        if not alive.any():
+            break
+        
+        cartpoles.step(force, dt, active=alive)
+    
+    return cartpoles.history, forces, fail_steps
+
+
+def simulate_cartpole_pid_continuous(initial_theta=0.1, strategy='angle_only',
+                                     sim_time=10.0, dt=0.02,
+                                     M=1.0, m=0.1, l=0.5, g=9.8):
+    """
+    把PID闭环写成增广ODE，用 solve_ivp 一次积分整条轨迹
+    
+    与逐步仿真（每 dt 离散更新一次PID）不同，这里PID按连续时间处理：
+    积分项作为额外状态（积分器导数为误差），微分项取误差的解析导数
+    -theta_dot（级联时忽略期望角度自身的变化率），输出限幅与
+    CartPolePIDController 相同。适合快速分析闭环在小扰动下的行为，
+    整个积分循环在SciPy内完成，不逐步回到Python控制器代码
+    
+    增广状态:
+        angle_only: [x, x_dot, theta, theta_dot, 角度积分]
+        cascade:    [x, x_dot, theta, theta_dot, 角度积分, 位置积分]
+    
+    参数:
+        initial_theta: 初始角度 (rad)
+        strategy: 'angle_only' 或 'cascade'
+        sim_time: 仿真时长 (s)
+        dt: 输出采样间隔，同时作为积分最大步长
+        M, m, l, g: 系统参数（同 CartPole）
+    
+    返回:
+        结果字典: 'time'、'history'（同 CartPole.history 的键）、'forces'、
+        'failed'、'fail_time'
+    """
+    from scipy.integrate import solve_ivp
+    
+    cascade = strategy == 'cascade'
+    # 增益与 CartPolePIDController 一致
+    Kp, Ki, Kd = 150.0, 0.5, 40.0
+    Kp_x, Ki_x, Kd_x = 1.0, 0.01, 8.0
+    
+    # rhs 以 vectorized=True 调用，y 的各分量可能是数组，因此用 np.clip 限幅
+    def control(y):
+        x, x_dot, theta, theta_dot = y[0], y[1], y[2], y[3]
+        if cascade:
+            desired = np.clip(-Kp_x * x + Ki_x * y[5] - Kd_x * x_dot, -0.3, 0.3)
+        else:
+            desired = 0.0
+        error = desired - theta
+        force = np.clip(Kp * error + Ki * y[4] - Kd * theta_dot, -100, 100)
+        return force, error
+    
+    def rhs(t, y):
+        x_dot, theta, theta_dot = y[1], y[2], y[3]
+        u, error = control(y)
+        
+        sin_theta = np.sin(theta)
+        cos_theta = np.cos(theta)
+        temp = (u + m * l * theta_dot**2 * sin_theta) / (M + m)
+        theta_acc = (g * sin_theta - cos_theta * temp) / \
+                   (l * (4.0/3.0 - m * cos_theta**2 / (M + m)))
+        x_acc = temp - m * l * theta_acc * cos_theta / (M + m)
+        
+        derivs = [x_dot, x_acc, theta_dot, theta_acc, error]
+        if cascade:
+            derivs.append(-y[0])
+        return np.array(derivs)
+    
+    def failure(t, y):
+        # 与 CartPole.is_failed 的阈值一致，越界时过零
+        return min(2.4 - abs(y[0]), 0.21 - abs(y[2]))
+    failure.terminal = True
+    failure.direction = -1
+    
+    y0 = np.zeros(6 if cascade else 5)
+    y0[2] = initial_theta
+    t_eval = np.arange(0.0, sim_time, dt)
+    
+    sol = solve_ivp(rhs, (0.0, sim_time), y0, method='RK45', t_eval=t_eval,
+                    max_step=dt, events=failure, vectorized=True)
+    
+    failed = sol.status == 1
+    forces, _ = control(sol.y)
+    return {
+        'time': sol.t,
+        'history': {
+            'x': sol.y[0],
+            'x_dot': sol.y[1],
+            'theta': sol.y[2],
+            'theta_dot': sol.y[3]
+        },
+        'forces': forces,
+        'failed': failed,
+        'fail_time': sol.t_events[0][0] if failed else None
+    }
+
+
+def search_pid_gains(Kp_values, Kd_values, initial_theta=0.2, strategy='angle_only',
+                     Ki=0.5, position_gains=(1.0, 0.01, 8.0),
+                     sim_time=10.0, dt=0.02):
+    """
+    角度PID增益网格搜索
+    
+    对 Kp_values × Kd_values 的每组增益各跑一段闭环仿真，全部组合由
+    sweep_episodes 在编译内核中并行评估（不保存轨迹），再只对最优组合
+    重跑一次 run_episode 取完整轨迹用于绘图。
+    评价顺序：存活步数越多越好，存活步数相同时角度ISE越小越好
+    
+    参数:
+        Kp_values, Kd_values: 待搜索的比例、微分增益
+        initial_theta: 初始角度 (rad)
+        strategy: 'angle_only' 或 'cascade'
+        Ki: 角度积分增益（固定）
+        position_gains: 位置PID增益 (Kp, Ki, Kd)，仅级联控制使用
+        sim_time: 仿真时长 (s)
+        dt: 时间步长
+    
+    返回:
+        结果字典: 'Kp'、'Kd'（最优增益）、'survived'、'ise'（形状为
+        (len(Kp_values), len(Kd_values)) 的网格）、'states'、'forces'
+        （最优增益的轨迹）
+    """
+    Kp_values = np.asarray(Kp_values, dtype=np.float64)
+    Kd_values = np.asarray(Kd_values, dtype=np.float64)
+    time_steps = int(sim_time / dt)
+    cascade = strategy == 'cascade'
+    
+    Kp_grid, Kd_grid = np.meshgrid(Kp_values, Kd_values, indexing='ij')
+    n = Kp_grid.size
+    gains = np.empty((n, 6))
+    gains[:, 0] = Kp_grid.ravel()
+    gains[:, 1] = Ki
+    gains[:, 2] = Kd_grid.ravel()
+    gains[:, 3:] = position_gains
+    initial_states = np.zeros((n, 4))
+    initial_states[:, 2] = initial_theta
+    
+    fail_steps, ise = sweep_episodes(initial_states, gains, np.full(n, cascade),
+                                     time_steps, dt)
+    survived = np.where(fail_steps < 0, time_steps, fail_steps)
+    
+    # 先按存活步数（降序）、再按ISE（升序）排序
+    best = np.lexsort((ise, -survived))[0]
+    states, forces, _ = run_episode(initial_states[best], *gains[best], time_steps, dt,
+                                    cascade)
+    
+    return {
+        'Kp': gains[best, 0],
+        'Kd': gains[best, 2],
+        'survived': survived.reshape(Kp_grid.shape),
+        'ise': ise.reshape(Kp_grid.shape),
+        'states': states,
+        'forces': forces
+    }
+
+
+class _ExperimentFigure:
+    """
+    CartPole PID实验图表
+    
+    坐标轴、图例和每个实验的曲线只创建一次；之后每次 update 只用
+    set_data 替换曲线数据并更新柱状图，参数扫描中反复绘图时不必重建图表
+    
+    参数:
+        experiments: 实验配置列表（含 'name'、'color'）
+    """
+    
+    def __init__(self, experiments):
+        self.fig = plt.figure(figsize=(16, 12))
+        gs = GridSpec(4, 2, figure=self.fig, hspace=0.35, wspace=0.3)
+        
+        # 创建子图
+        ax1 = self.fig.add_subplot(gs[0, :])  # 角度
+        ax2 = self.fig.add_subplot(gs[1, :])  # 位置
+        ax3 = self.fig.add_subplot(gs[2, 0])  # 控制力
+        ax4 = self.fig.add_subplot(gs[2, 1])  # 相图
+        ax5 = self.fig.add_subplot(gs[3, :])  # 性能对比
+        self._line_axes = (ax1, ax2, ax3, ax4)
+        
+        # 每个实验在前四个子图中各一条曲线，先以空数据创建
+        self._lines = []
+        for exp in experiments:
+            color = exp['color']
+            self._lines.append((
+                ax1.plot([], [], label=exp['name'], linewidth=2, color=color, alpha=0.8)[0],
+                ax2.plot([], [], linewidth=2, color=color, alpha=0.8)[0],
+                ax3.plot([], [], linewidth=1.5, color=color, alpha=0.8)[0],
+                ax4.plot([], [], linewidth=1.5, color=color, alpha=0.6)[0],
+            ))
+        
+        # 设置图表
+        ax1.axhline(y=0, color='k', linestyle='--', alpha=0.3)
+        ax1.set_xlabel('Time (s)', fontsize=12)
+        ax1.set_ylabel('Pole Angle (degrees)', fontsize=12)
+        ax1.set_title('Pole Angle Response (Target: 0 degrees)', fontsize=14, fontweight='bold')
+        ax1.legend(fontsize=9, loc='best')
+        ax1.grid(True, alpha=0.3)
+        ax1.set_ylim([-15, 15])
+        
+        ax2.axhline(y=0, color='k', linestyle='--', alpha=0.3)
+        ax2.axhline(y=2.4, color='r', linestyle=':', alpha=0.5, label='Boundary')
+        ax2.axhline(y=-2.4, color='r', linestyle=':', alpha=0.5)
+        ax2.set_xlabel('Time (s)', fontsize=12)
+        ax2.set_ylabel('Cart Position (m)', fontsize=12)
+        ax2.set_title('Cart Position Response', fontsize=14, fontweight='bold')
+        ax2.grid(True, alpha=0.3)
+        ax2.set_ylim([-3, 3])
+        
+        ax3.axhline(y=0, color='k', linestyle='--', alpha=0.3)
+        ax3.set_xlabel('Time (s)', fontsize=12)
+        ax3.set_ylabel('Control Force (N)', fontsize=12)
+        ax3.set_title('Control Signal', fontsize=14, fontweight='bold')
+        ax3.grid(True, alpha=0.3)
+        
+        ax4.axhline(y=0, color='k', linestyle='--', alpha=0.3)
+        ax4.axvline(x=0, color='k', linestyle='--', alpha=0.3)
+        ax4.set_xlabel('Angle (degrees)', fontsize=12)
+        ax4.set_ylabel('Angular Velocity (deg/s)', fontsize=12)
+        ax4.set_title('Phase Portrait: Angle vs Angular Velocity', fontsize=14, fontweight='bold')
+        ax4.grid(True, alpha=0.3)
+        
+        # 性能对比
+        categories = ['Strategy 1\nSmall Dist.', 'Strategy 1\nLarge Dist.', 
+                      'Strategy 2\nSmall Dist.', 'Strategy 2\nLarge Dist.']
+        self._bars = ax5.bar(categories, [0] * len(experiments),
+                             color=[exp['color'] for exp in experiments],
+                             alpha=0.7, edgecolor='black')
+        self._bar_labels = [ax5.text(i, 0, '', ha='center', va='bottom', fontweight='bold')
+                            for i in range(len(experiments))]
+        ax5.set_ylabel('Success/Failure', fontsize=12)
+        ax5.set_title('Control Strategy Performance Comparison', fontsize=14, fontweight='bold')
+        ax5.set_ylim([0, 1.2])
+        ax5.set_yticks([0, 1])
+        ax5.set_yticklabels(['Failed', 'Success'])
+        ax5.grid(True, alpha=0.3, axis='y')
+        
+        self.fig.suptitle('CartPole Inverted Pendulum - PID Control Experiment\nPID vs Reinforcement Learning', 
+                          fontsize=16, fontweight='bold', y=0.995)
+    
+    def update(self, results):
+        """用一组实验结果替换曲线数据和柱状图"""
+        for lines, result in zip(self._lines, results):
+            history = result['history']
+            result_time = result['time']
+            n = len(result_time)
+            theta = np.degrees(history['theta'][:n])
+            lines[0].set_data(result_time, theta)
+            lines[1].set_data(result_time, history['x'][:n])
+            lines[2].set_data(result_time, result['forces'])
+            lines[3].set_data(theta, np.degrees(history['theta_dot'][:n]))
+        
+        for ax in self._line_axes:
+            ax.relim()
+            ax.autoscale_view()
+        
+        # 在柱状图上添加文字
+        for bar, label, result in zip(self._bars, self._bar_labels, results):
+            if result['failed']:
+                bar.set_height(0)
+                label.set_position((label.get_position()[0], 0.05))
+                label.set_text(f"Failed\n{result['fail_time']:.2f}s")
+                label.set_fontsize(10)
+            else:
+                bar.set_height(1)
+                label.set_position((label.get_position()[0], 1.05))
+                label.set_text("Success")
+                label.set_fontsize(12)
+    
+    def save(self, path, dpi=300):
+        """保存图表（扫描中的中间结果可用较低 dpi）"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.fig.savefig(path, dpi=dpi, bbox_inches='tight')
+    
+    def close(self):
+        """从 pyplot 中注销图表；之后仍可 update 和 save"""
+        plt.close(self.fig)
+
+
+def run_cartpole_experiment(dpi=300, figure=None):
+    """
+    运行CartPole PID控制实验
+    
+    参数:
+        dpi: 保存图片的分辨率（调试迭代时可用150，发表用300）
+        figure: 上一次调用返回的图表，参数扫描中反复调用时传回，
+                只更新曲线数据而不重建图表
+    
+    返回:
+        本次使用的图表
+    """
     print("=" * 70)
     print("CartPole倒立摆 - PID控制实验")
     print("=" * 70)
@@ -215,11 +698,6 @@ def run_cartpole_experiment():
     dt = 0.02  # 20ms控制周期 (50Hz)
     sim_time = 10.0  # 10秒仿真
     time_steps = int(sim_time / dt)
-    time = np.linspace(0, sim_time, time_steps)
-    
-    # 创建图表
-    fig = plt.figure(figsize=(16, 12))
-    gs = GridSpec(4, 2, figure=fig, hspace=0.35, wspace=0.3)
     
     # 测试不同的策略和初始条件
     experiments = [
@@ -249,152 +727,70 @@ def run_cartpole_experiment():
         }
     ]
     
-    # 创建子图
-    ax1 = fig.add_subplot(gs[0, :])  # 角度
-    ax2 = fig.add_subplot(gs[1, :])  # 位置
-    ax3 = fig.add_subplot(gs[2, 0])  # 控制力
-    ax4 = fig.add_subplot(gs[2, 1])  # 相图
-    ax5 = fig.add_subplot(gs[3, :])  # 性能对比
+    # 各实验互不相关，整段仿真在编译内核中并行完成（增益同 CartPolePIDController）
+    n_exp = len(experiments)
+    initial_states = np.zeros((n_exp, 4))
+    initial_states[:, 2] = [exp['initial_theta'] for exp in experiments]
+    gains = np.tile([150.0, 0.5, 40.0, 1.0, 0.01, 8.0], (n_exp, 1))
+    cascade = np.array([exp['strategy'] == 'cascade' for exp in experiments])
+    all_states, all_forces, fail_steps = run_episodes(initial_states, gains, cascade,
+                                                      time_steps, dt)
     
     results = []
     
-    for exp in experiments:
+    for j, exp in enumerate(experiments):
         print(f"\n运行实验: {exp['name']}")
         print(f"  初始角度: {exp['initial_theta']:.3f} rad ({np.degrees(exp['initial_theta']):.1f}°)")
         
-        # 创建系统和控制器
-        cartpole = CartPole()
-        controller = CartPolePIDController()
-        
-        # 重置状态
-        cartpole.reset(theta=exp['initial_theta'])
-        controller.reset()
-        
-        # 运行仿真
-        forces = []
-        failed = False
-        fail_time = None
-        
-        for i, t in enumerate(time):
-            # 获取当前状态
-            x, x_dot, theta, theta_dot = cartpole.x, cartpole.x_dot, cartpole.theta, cartpole.theta_dot
-            
-            # 计算控制力
-            if exp['strategy'] == 'angle_only':
-                force = controller.control_angle_only(theta, theta_dot, dt)
-            else:  # cascade
-                force = controller.control_cascade(x, theta, dt)
-            
-            forces.append(force)
-            
-            # 检查是否失败
-            if not failed and cartpole.is_failed():
-                failed = True
-                fail_time = t
-                print(f"  ❌ 失败时间: {t:.2f}s")
-                break
-            
-            # 更新系统
-            cartpole.step(force, dt)
-        
-        if not failed:
+        failed = fail_steps[j] >= 0
+        # 失败时停在失败步（不再推进），否则含末状态共 time_steps+1 个状态
+        n = fail_steps[j] + 1 if failed else time_steps
+        states = all_states[j, :n if failed else n + 1]
+        forces = all_forces[j, :n]
+        fail_time = fail_steps[j] * dt if failed else None
+        
+        history = {
+            'x': states[:, 0],
+            'x_dot': states[:, 1],
+            'theta': states[:, 2],
+            'theta_dot': states[:, 3]
+        }
+        
+        if failed:
+            print(f"  ❌ 失败时间: {fail_time:.2f}s")
+        else:
             print(f"  ✅ 成功保持平衡 {sim_time}秒")
-            final_angle_error = np.mean(np.abs(cartpole.history['theta'][-50:]))
-            final_position_error = np.mean(np.abs(cartpole.history['x'][-50:]))
+            final_angle_error = np.mean(np.abs(history['theta'][-50:]))
+            final_position_error = np.mean(np.abs(history['x'][-50:]))
             print(f"  最终角度误差: {np.degrees(final_angle_error):.3f}°")
             print(f"  最终位置误差: {final_position_error:.3f}m")
         
-        # 记录结果
+        # 记录结果（时间轴只在绘图和记录结果时构造）
         results.append({
             'name': exp['name'],
-            'history': cartpole.history,
+            'history': history,
             'forces': forces,
-            'time': time[:len(forces)],
+            'time': np.arange(n) * dt,
             'failed': failed,
             'fail_time': fail_time,
             'color': exp['color']
         })
-        
-        # 绘制结果
-        result_time = time[:len(forces)]
-        ax1.plot(result_time, np.degrees(cartpole.history['theta'][:len(forces)]), 
-                label=exp['name'], linewidth=2, color=exp['color'], alpha=0.8)
-        ax2.plot(result_time, cartpole.history['x'][:len(forces)], 
-                linewidth=2, color=exp['color'], alpha=0.8)
-        ax3.plot(result_time, forces, linewidth=1.5, color=exp['color'], alpha=0.8)
-        
-        # 相图 (角度 vs 角速度)
-        ax4.plot(np.degrees(cartpole.history['theta'][:len(forces)]), 
-                np.degrees(cartpole.history['theta_dot'][:len(forces)]),
-                linewidth=1.5, color=exp['color'], alpha=0.6)
-    
-    # 设置图表
-    ax1.axhline(y=0, color='k', linestyle='--', alpha=0.3)
-    ax1.set_xlabel('Time (s)', fontsize=12)
-    ax1.set_ylabel('Pole Angle (degrees)', fontsize=12)
-    ax1.set_title('Pole Angle Response (Target: 0 degrees)', fontsize=14, fontweight='bold')
-    ax1.legend(fontsize=9, loc='best')
-    ax1.grid(True, alpha=0.3)
-    ax1.set_ylim([-15, 15])
-    
-    ax2.axhline(y=0, color='k', linestyle='--', alpha=0.3)
-    ax2.axhline(y=2.4, color='r', linestyle=':', alpha=0.5, label='Boundary')
-    ax2.axhline(y=-2.4, color='r', linestyle=':', alpha=0.5)
-    ax2.set_xlabel('Time (s)', fontsize=12)
-    ax2.set_ylabel('Cart Position (m)', fontsize=12)
-    ax2.set_title('Cart Position Response', fontsize=14, fontweight='bold')
-    ax2.grid(True, alpha=0.3)
-    ax2.set_ylim([-3, 3])
-    
-    ax3.axhline(y=0, color='k', linestyle='--', alpha=0.3)
-    ax3.set_xlabel('Time (s)', fontsize=12)
-    ax3.set_ylabel('Control Force (N)', fontsize=12)
-    ax3.set_title('Control Signal', fontsize=14, fontweight='bold')
-    ax3.grid(True, alpha=0.3)
-    
-    ax4.axhline(y=0, color='k', linestyle='--', alpha=0.3)
-    ax4.axvline(x=0, color='k', linestyle='--', alpha=0.3)
-    ax4.set_xlabel('Angle (degrees)', fontsize=12)
-    ax4.set_ylabel('Angular Velocity (deg/s)', fontsize=12)
-    ax4.set_title('Phase Portrait: Angle vs Angular Velocity', fontsize=14, fontweight='bold')
-    ax4.grid(True, alpha=0.3)
-    
-    # 性能对比
-    categories = ['Strategy 1\nSmall Dist.', 'Strategy 1\nLarge Dist.', 
-                  'Strategy 2\nSmall Dist.', 'Strategy 2\nLarge Dist.']
-    success = [not r['failed'] for r in results]
-    colors_bar = [r['color'] for r in results]
-    
-    bars = ax5.bar(categories, [1 if s else 0 for s in success], 
-                   color=colors_bar, alpha=0.7, edgecolor='black')
-    ax5.set_ylabel('Success/Failure', fontsize=12)
-    ax5.set_title('Control Strategy Performance Comparison', fontsize=14, fontweight='bold')
-    ax5.set_ylim([0, 1.2])
-    ax5.set_yticks([0, 1])
-    ax5.set_yticklabels(['Failed', 'Success'])
-    ax5.grid(True, alpha=0.3, axis='y')
-    
-    # 在柱状图上添加文字
-    for i, (bar, result) in enumerate(zip(bars, results)):
-        if result['failed']:
-            label = f"Failed\n{result['fail_time']:.2f}s"
-            ax5.text(i, 0.05, label, ha='center', va='bottom', fontsize=10, fontweight='bold')
-        else:
-            label = "Success"
-            ax5.text(i, 1.05, label, ha='center', va='bottom', fontsize=12, fontweight='bold')
     
-    plt.suptitle('CartPole Inverted Pendulum - PID Control Experiment\nPID vs Reinforcement Learning', 
-                 fontsize=16, fontweight='bold', y=0.995)
+    # 绘图：图表与曲线只创建一次，之后只替换数据
+    if figure is None:
+        figure = _ExperimentFigure(experiments)
+    figure.update(results)
     
     output_path = os.path.join('..', 'output', 'cartpole_pid_control.png')
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
+    figure.save(output_path, dpi=dpi)
     print(f"\n图表已保存: {output_path}")
-    plt.close()
+    figure.close()
     
     print("\n" + "=" * 70)
     print("实验完成!")
     print("=" * 70)
+    
+    return figure
 
 
 def compare_pid_vs_rl():
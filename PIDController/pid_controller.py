@@ -5,6 +5,51 @@ PID控制器实现
 import numpy as np
 
 
+class _HistoryArray:
+    """
+    按行追加的预分配二维历史记录，写满时容量翻倍
+    
+    每行一个时间步、每列一个变量；读取时直接得到 NumPy 视图，
+    避免 list.append 的逐元素装箱和绘图前的 list→ndarray 复制。
+    dtype 为存储精度，写入时按该精度舍入
+    """
+    
+    __slots__ = ('_data', '_n')
+    
+    def __init__(self, width, capacity=1000, dtype=np.float64):
+        self._data = np.empty((max(int(capacity), 1), width), dtype=dtype)
+        self._n = 0
+    
+    def clear(self, capacity=None):
+        """清空记录；给出 capacity 且大于当前容量时重新分配"""
+        if capacity is not None and capacity > len(self._data):
+            self._data = np.empty((int(capacity), self._data.shape[1]), dtype=self._data.dtype)
+        self._n = 0
+    
+    def append(self, row):
+        if self._n == len(self._data):
+            self._data = np.concatenate([self._data, np.empty_like(self._data)])
+        self._data[self._n] = row
+        self._n += 1
+    
+    def extend(self, rows):
+        """一次追加多行（rows 可为 (k, width) 数组；width 为1时也可为长度 k 的一维数组）"""
+        rows = np.asarray(rows).reshape(-1, self._data.shape[1])
+        end = self._n + len(rows)
+        if end > len(self._data):
+            data = np.empty((max(end, 2 * len(self._data)), self._data.shape[1]),
+                            dtype=self._data.dtype)
+            data[:self._n] = self._data[:self._n]
+            self._data = data
+        self._data[self._n:end] = rows
+        self._n = end
+    
+    @property
+    def values(self):
+        """已记录部分的 (n, width) 视图"""
+        return self._data[:self._n]
+
+
 class PIDController:
     """
     PID控制器类
@@ -14,39 +59,104 @@ class PIDController:
         Ki: 积分增益 (Integral gain)
         Kd: 微分增益 (Derivative gain)
         setpoint: 目标值
+        record: 是否记录逐步历史（误差、输出及P/I/D各项），
+                默认不记录，仅在需要分析或绘图时开启
+        anti_windup: 是否启用抗积分饱和（条件积分），默认关闭
     """
     
-    def __init__(self, Kp=1.0, Ki=0.0, Kd=0.0, setpoint=0.0):
+    def __init__(self, Kp=1.0, Ki=0.0, Kd=0.0, setpoint=0.0, record=False,
+                 anti_windup=False):
         self.Kp = Kp
-        self.Ki = Ki
-        self.Kd = Kd
+        self._Ki = Ki
+        self._Kd = Kd
+        self._select_update()
         self.setpoint = setpoint
+        self.anti_windup = anti_windup
         
         # 内部状态变量
         self.integral = 0.0
         self.previous_error = 0.0
-        self.output_limits = (-np.inf, np.inf)
+        # 输出上下限存为两个Python浮点数，update 中直接比较
+        self._lo, self._hi = -float('inf'), float('inf')
         
-        # 记录历史数据用于分析
-        self.error_history = []
-        self.output_history = []
-        self.p_term_history = []
-        self.i_term_history = []
-        self.d_term_history = []
+        # 记录历史数据用于分析（列: 误差、输出、P项、I项、D项）
+        self._record = record
+        self._history = _HistoryArray(5, capacity=1000 if record else 1)
+    
+    @property
+    def error_history(self):
+        return self._history.values[:, 0]
+    
+    @property
+    def output_history(self):
+        return self._history.values[:, 1]
+    
+    @property
+    def p_term_history(self):
+        return self._history.values[:, 2]
+    
+    @property
+    def i_term_history(self):
+        return self._history.values[:, 3]
+    
+    @property
+    def d_term_history(self):
+        return self._history.values[:, 4]
+    
+    @property
+    def output_limits(self):
+        return (self._lo, self._hi)
+    
+    @property
+    def recording(self):
+        """是否正在记录逐步历史"""
+        return self._record
+    
+    def enable_recording(self, enabled=True):
+        """开启（或关闭）逐步历史记录，调试时使用"""
+        self._record = enabled
     
     def set_output_limits(self, min_output, max_output):
         """设置输出限制"""
-        self.output_limits = (min_output, max_output)
+        self._lo, self._hi = float(min_output), float(max_output)
     
-    def reset(self):
-        """重置控制器内部状态"""
+    def reset(self, n_steps=None):
+        """
+        重置控制器内部状态
+        
+        参数:
+            n_steps: 可选，预计的更新步数，用于预分配历史记录
+        """
         self.integral = 0.0
         self.previous_error = 0.0
-        self.error_history = []
-        self.output_history = []
-        self.p_term_history = []
-        self.i_term_history = []
-        self.d_term_history = []
+        self._history.clear(n_steps if self._record else None)
+    
+    @property
+    def Ki(self):
+        return self._Ki
+    
+    @Ki.setter
+    def Ki(self, value):
+        self._Ki = value
+        self._select_update()
+    
+    @property
+    def Kd(self):
+        return self._Kd
+    
+    @Kd.setter
+    def Kd(self, value):
+        self._Kd = value
+        self._select_update()
+    
+    def _select_update(self):
+        """按 Ki、Kd 是否为0选择专门化的更新函数（增益改变时自动重新选择）"""
+        if self._Kd != 0:
+            self._update = _update_pid
+        elif self._Ki != 0:
+            self._update = _update_pi
+        else:
+            self._update = _update_p
     
     def update(self, measured_value, dt):
         """
@@ -59,40 +169,7 @@ class PIDController:
         返回:
             控制输出值
         """
-        # 计算误差
-        error = self.setpoint - measured_value
-        
-        # 比例项 (P)
-        p_term = self.Kp * error
-        
-        # 积分项 (I)
-        self.integral += error * dt
-        i_term = self.Ki * self.integral
-        
-        # 微分项 (D)
-        if dt > 0:
-            derivative = (error - self.previous_error) / dt
-        else:
-            derivative = 0.0
-        d_term = self.Kd * derivative
-        
-        # 计算总输出
-        output = p_term + i_term + d_term
-        
-        # 应用输出限制
-        output = np.clip(output, self.output_limits[0], self.output_limits[1])
-        
-        # 更新历史记录
-        self.error_history.append(error)
-        self.output_history.append(output)
-        self.p_term_history.append(p_term)
-        self.i_term_history.append(i_term)
-        self.d_term_history.append(d_term)
-        
-        # 更新状态
-        self.previous_error = error
-        
-        return output
+        return self._update(self, measured_value, dt)
     
     def set_setpoint(self, setpoint):
         """设置新的目标值"""
@@ -107,3 +184,185 @@ class PIDController:
             'setpoint': self.setpoint
         }
 
+
+def _update_pid(pid, measured_value, dt):
+    """完整PID更新（Kd 非0）"""
+    # 计算误差
+    error = pid.setpoint - measured_value
+    
+    # 比例项 (P)
+    p_term = pid.Kp * error
+    
+    # 积分项 (I)
+    integral = pid.integral + error * dt
+    i_term = pid._Ki * integral
+    
+    # 微分项 (D)
+    if dt > 0:
+        derivative = (error - pid.previous_error) / dt
+    else:
+        derivative = 0.0
+    d_term = pid._Kd * derivative
+    
+    # 计算总输出
+    output = p_term + i_term + d_term
+    
+    # 应用输出限制（标量比较，避免 np.clip 的ufunc开销）
+    raw = output
+    if output < pid._lo:
+        output = pid._lo
+    elif output > pid._hi:
+        output = pid._hi
+    
+    # 抗积分饱和（条件积分，可选）：输出饱和且本步误差会使其更加饱和时不积分，
+    # 并按保持的积分重新计算输出，使历史记录与实际施加的输出一致；
+    # 误差把输出拉回限幅范围内时照常积分，积分器不承担P、D项造成的超出部分
+    if pid.anti_windup and ((raw > output and pid._Ki * error > 0)
+                            or (raw < output and pid._Ki * error < 0)):
+        integral = pid.integral
+        i_term = pid._Ki * integral
+        output = min(max(p_term + i_term + d_term, pid._lo), pid._hi)
+    pid.integral = integral
+    
+    # 更新历史记录
+    if pid._record:
+        pid._history.append((error, output, p_term, i_term, d_term))
+    
+    # 更新状态
+    pid.previous_error = error
+    
+    return output
+
+
+def _update_pi(pid, measured_value, dt):
+    """PI更新（Kd 为0，省去微分项）"""
+    error = pid.setpoint - measured_value
+    p_term = pid.Kp * error
+    integral = pid.integral + error * dt
+    i_term = pid._Ki * integral
+    
+    output = p_term + i_term
+    raw = output
+    if output < pid._lo:
+        output = pid._lo
+    elif output > pid._hi:
+        output = pid._hi
+    
+    # 抗积分饱和（条件积分，可选）
+    if pid.anti_windup and ((raw > output and pid._Ki * error > 0)
+                            or (raw < output and pid._Ki * error < 0)):
+        integral = pid.integral
+        i_term = pid._Ki * integral
+        output = min(max(p_term + i_term, pid._lo), pid._hi)
+    pid.integral = integral
+    
+    if pid._record:
+        pid._history.append((error, output, p_term, i_term, 0.0))
+    # 仍保存误差，之后若设置了 Kd，微分项从正确的上一步误差开始
+    pid.previous_error = error
+    
+    return output
+
+
+def _update_p(pid, measured_value, dt):
+    """纯比例更新（Ki、Kd 均为0）"""
+    error = pid.setpoint - measured_value
+    p_term = pid.Kp * error
+    
+    output = p_term
+    if output < pid._lo:
+        output = pid._lo
+    elif output > pid._hi:
+        output = pid._hi
+    
+    # 积分和上一步误差照常更新，之后改为非0的 Ki、Kd 时状态与完整PID一致
+    pid.integral += error * dt
+    
+    if pid._record:
+        pid._history.append((error, output, p_term, 0.0, 0.0))
+    pid.previous_error = error
+    
+    return output
+
+
+class BatchedPIDController:
+    """
+    批量PID控制器：n 个PID回路同步更新
+    
+    按结构数组（SoA）存放各回路状态：积分、上一步误差和目标值都是长度为 n
+    的数组，增益可为标量（各回路相同）或长度为 n 的数组（如增益扫描），
+    一次 update 用数组运算完成整批计算，结果与 n 个 PIDController 逐个更新一致。
+    不记录逐步历史（批量仿真时由调用方保存需要的量）
+    
+    参数:
+        n: 回路数量
+        Kp, Ki, Kd: PID增益（标量或长度为 n 的数组）
+        setpoint: 目标值（标量或长度为 n 的数组）
+        anti_windup: 是否启用抗积分饱和（标量或长度为 n 的布尔数组），默认关闭
+    """
+    
+    def __init__(self, n, Kp=1.0, Ki=0.0, Kd=0.0, setpoint=0.0, anti_windup=False):
+        self.n = n
+        self.Kp = np.asarray(Kp, dtype=np.float64) if np.ndim(Kp) else Kp
+        self.Ki = np.asarray(Ki, dtype=np.float64) if np.ndim(Ki) else Ki
+        self.Kd = np.asarray(Kd, dtype=np.float64) if np.ndim(Kd) else Kd
+        self.setpoint = np.full(n, setpoint, dtype=np.float64)
+        self.anti_windup = np.asarray(anti_windup, dtype=bool) if np.ndim(anti_windup) else anti_windup
+        
+        self.integral = np.zeros(n)
+        self.previous_error = np.zeros(n)
+        self.output_limits = (-np.inf, np.inf)
+    
+    def set_output_limits(self, min_output, max_output):
+        """设置输出限制（标量或长度为 n 的数组）"""
+        self.output_limits = (min_output, max_output)
+    
+    def reset(self):
+        """重置控制器内部状态"""
+        self.integral[:] = 0.0
+        self.previous_error[:] = 0.0
+    
+    def set_setpoint(self, setpoint):
+        """设置新的目标值（标量或长度为 n 的数组）"""
+        self.setpoint[:] = setpoint
+    
+    def update(self, measured_value, dt, active=None):
+        """
+        整批更新PID控制器
+        
+        参数:
+            measured_value: 长度为 n 的测量值数组
+            dt: 时间步长
+            active: 可选布尔掩码，仅更新为 True 的回路的内部状态
+        
+        返回:
+            长度为 n 的控制输出数组
+        """
+        error = self.setpoint - measured_value
+        
+        integral = self.integral + error * dt
+        if dt > 0:
+            derivative = (error - self.previous_error) / dt
+        else:
+            derivative = np.zeros(self.n)
+        
+        raw = self.Kp * error + self.Ki * integral + self.Kd * derivative
+        output = np.clip(raw, self.output_limits[0], self.output_limits[1])
+        
+        # 抗积分饱和（条件积分，可选），与 PIDController.update 相同
+        if np.any(self.anti_windup):
+            drive = self.Ki * error
+            hold = (((raw > output) & (drive > 0)) | ((raw < output) & (drive < 0))) & self.anti_windup
+            if hold.any():
+                integral = np.where(hold, self.integral, integral)
+                raw = self.Kp * error + self.Ki * integral + self.Kd * derivative
+                output = np.clip(raw, self.output_limits[0], self.output_limits[1])
+        
+        if active is None:
+            self.integral[:] = integral
+            self.previous_error[:] = error
+        else:
+            self.integral[active] = integral[active]
+            self.previous_error[active] = error[active]
+        
+        return output
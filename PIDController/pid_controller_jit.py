@@ -0,0 +1,403 @@
+"""
+PID闭环仿真的编译内核
+
+CartPole 的RK4积分、PID更新以及把二者融合起来的整段仿真 run_episode，
+多组互不相关的整段仿真由 run_episodes 并行运行；调参用的大规模增益扫描
+由 sweep_episodes 并行运行，只返回每组的存活步数和代价，不保存轨迹。
+PID参数实验中一阶、二阶系统的整段闭环仿真由 simulate_first_order、
+simulate_second_order 完成。
+安装了 numba 时编译执行，整段仿真不再逐步回到Python；
+未安装时以纯Python运行，结果相同。
+"""
+
+import math
+import numpy as np
+
+try:
+    from ._jit import njit, prange
+except ImportError:
+    from _jit import njit, prange
+
+
+@njit(cache=True, fastmath=True)
+def _rk4_step(x, x_dot, theta, theta_dot, u, M, m, l, g, dt):
+    """
+    CartPole单步RK4积分（纯标量运算，可被numba编译）
+    
+    参数:
+        x, x_dot, theta, theta_dot: 当前状态
+        u: 施加在小车上的力
+        M, m, l, g: 系统参数
+        dt: 时间步长
+    
+    返回:
+        (x, x_dot, theta, theta_dot) 新状态
+    """
+    # 与状态无关的常数只算一次，中间点内的除以总质量改为乘倒数
+    inv_mt = 1.0 / (M + m)
+    ml = m * l
+    ml_inv_mt = ml * inv_mt
+    m_inv_mt = m * inv_mt
+    four_thirds = 4.0 / 3.0
+    
+    # 位置导数即速度，只需在四个中间点计算加速度
+    sin_t = math.sin(theta)
+    cos_t = math.cos(theta)
+    temp = (u + ml * theta_dot * theta_dot * sin_t) * inv_mt
+    b1 = (g * sin_t - cos_t * temp) / (l * (four_thirds - m_inv_mt * cos_t * cos_t))
+    a1 = temp - ml_inv_mt * b1 * cos_t
+    
+    xd2 = x_dot + dt/2 * a1
+    th2 = theta + dt/2 * theta_dot
+    thd2 = theta_dot + dt/2 * b1
+    sin_t = math.sin(th2)
+    cos_t = math.cos(th2)
+    temp = (u + ml * thd2 * thd2 * sin_t) * inv_mt
+    b2 = (g * sin_t - cos_t * temp) / (l * (four_thirds - m_inv_mt * cos_t * cos_t))
+    a2 = temp - ml_inv_mt * b2 * cos_t
+    
+    xd3 = x_dot + dt/2 * a2
+    th3 = theta + dt/2 * thd2
+    thd3 = theta_dot + dt/2 * b2
+    sin_t = math.sin(th3)
+    cos_t = math.cos(th3)
+    temp = (u + ml * thd3 * thd3 * sin_t) * inv_mt
+    b3 = (g * sin_t - cos_t * temp) / (l * (four_thirds - m_inv_mt * cos_t * cos_t))
+    a3 = temp - ml_inv_mt * b3 * cos_t
+    
+    xd4 = x_dot + dt * a3
+    th4 = theta + dt * thd3
+    thd4 = theta_dot + dt * b3
+    sin_t = math.sin(th4)
+    cos_t = math.cos(th4)
+    temp = (u + ml * thd4 * thd4 * sin_t) * inv_mt
+    b4 = (g * sin_t - cos_t * temp) / (l * (four_thirds - m_inv_mt * cos_t * cos_t))
+    a4 = temp - ml_inv_mt * b4 * cos_t
+    
+    return (x + dt/6 * (x_dot + 2*xd2 + 2*xd3 + xd4),
+            x_dot + dt/6 * (a1 + 2*a2 + 2*a3 + a4),
+            theta + dt/6 * (theta_dot + 2*thd2 + 2*thd3 + thd4),
+            theta_dot + dt/6 * (b1 + 2*b2 + 2*b3 + b4))
+
+
+@njit(cache=True)
+def _pid_step(error, integral, previous_error, Kp, Ki, Kd, out_min, out_max, dt,
+              anti_windup=False):
+    """
+    PID单步更新（与 PIDController.update 的计算一致），
+    anti_windup 为 True 时启用抗积分饱和（条件积分）
+    
+    返回:
+        (output, integral) 限幅后的输出和更新后的积分
+    """
+    updated = integral + error * dt
+    if dt > 0:
+        derivative = (error - previous_error) / dt
+    else:
+        derivative = 0.0
+    raw = Kp * error + Ki * updated + Kd * derivative
+    output = min(max(raw, out_min), out_max)
+    # 抗积分饱和（条件积分）：输出饱和且误差会使其更加饱和时不积分，
+    # 输出按保持的积分重新计算
+    if anti_windup and ((raw > output and Ki * error > 0) or (raw < output and Ki * error < 0)):
+        output = min(max(Kp * error + Ki * integral + Kd * derivative, out_min), out_max)
+        return output, integral
+    return output, updated
+
+
+@njit(cache=True)
+def run_episode(initial_state, Kp, Ki, Kd, Kp2, Ki2, Kd2, n_steps, dt, cascade,
+                force_limit=100.0, angle_limit=0.3,
+                M=1.0, m=0.1, l=0.5, g=9.8,
+                x_threshold=2.4, theta_threshold=0.21, anti_windup=False):
+    """
+    CartPole PID闭环整段仿真（PID更新与RK4积分融合在一个循环内）
+    
+    每步顺序与 run_cartpole_experiment 相同：由当前状态计算控制力并记录，
+    若当前状态已失败则停止，否则推进一步
+    
+    参数:
+        initial_state: 初始状态 [x, x_dot, theta, theta_dot]
+        Kp, Ki, Kd: 角度PID增益
+        Kp2, Ki2, Kd2: 位置PID增益（仅级联控制使用）
+        n_steps: 最大仿真步数
+        dt: 时间步长
+        cascade: True 为级联控制，False 为仅控制角度
+        force_limit: 角度PID输出（控制力）限幅
+        angle_limit: 位置PID输出（期望角度）限幅
+        M, m, l, g: 系统参数
+        x_threshold, theta_threshold: 失败阈值（同 CartPole.is_failed）
+        anti_windup: 两个PID是否启用抗积分饱和（条件积分）
+    
+    返回:
+        (states, forces, fail_step)
+        states: (n+1, 4) 状态轨迹，n 为实际推进的步数
+        forces: 各步控制力
+        fail_step: 失败时的步序号，未失败为 -1
+    """
+    states = np.empty((n_steps + 1, 4))
+    forces = np.empty(n_steps)
+    
+    x = initial_state[0]
+    x_dot = initial_state[1]
+    theta = initial_state[2]
+    theta_dot = initial_state[3]
+    states[0, 0] = x
+    states[0, 1] = x_dot
+    states[0, 2] = theta
+    states[0, 3] = theta_dot
+    
+    integral = 0.0
+    previous_error = 0.0
+    integral_x = 0.0
+    previous_error_x = 0.0
+    
+    for i in range(n_steps):
+        # 外环（级联）: 位置控制器输出期望角度
+        setpoint = 0.0
+        if cascade:
+            error_x = -x
+            setpoint, integral_x = _pid_step(error_x, integral_x, previous_error_x,
+                                             Kp2, Ki2, Kd2, -angle_limit, angle_limit, dt,
+                                             anti_windup)
+            previous_error_x = error_x
+        
+        # 内环: 角度控制器
+        error = setpoint - theta
+        force, integral = _pid_step(error, integral, previous_error,
+                                    Kp, Ki, Kd, -force_limit, force_limit, dt, anti_windup)
+        previous_error = error
+        forces[i] = force
+        
+        # 检查是否失败
+        if abs(x) > x_threshold or abs(theta) > theta_threshold:
+            return states[:i + 1], forces[:i + 1], i
+        
+        x, x_dot, theta, theta_dot = _rk4_step(x, x_dot, theta, theta_dot, force,
+                                               M, m, l, g, dt)
+        states[i + 1, 0] = x
+        states[i + 1, 1] = x_dot
+        states[i + 1, 2] = theta
+        states[i + 1, 3] = theta_dot
+    
+    return states, forces, -1
+
+
+@njit(cache=True, parallel=True)
+def run_episodes(initial_states, gains, cascade, n_steps, dt):
+    """
+    并行运行多组互不相关的 run_episode（numba 下以 prange 分配到多核）
+    
+    参数:
+        initial_states: (n, 4) 各组初始状态
+        gains: (n, 6) 各组增益 [Kp, Ki, Kd, Kp2, Ki2, Kd2]
+        cascade: (n,) 各组是否为级联控制
+        n_steps: 最大仿真步数
+        dt: 时间步长
+    
+    返回:
+        (states, forces, fail_steps)
+        states: (n, n_steps+1, 4)，forces: (n, n_steps)，
+        各组只有前 lengths 行有效：失败组为 fail_step+1 步，未失败组为全部步数
+        fail_steps: (n,) 各组失败步序号，未失败为 -1
+    """
+    n = initial_states.shape[0]
+    states = np.zeros((n, n_steps + 1, 4))
+    forces = np.zeros((n, n_steps))
+    fail_steps = np.empty(n, dtype=np.int64)
+    
+    for j in prange(n):
+        s, f, fail_step = run_episode(initial_states[j],
+                                      gains[j, 0], gains[j, 1], gains[j, 2],
+                                      gains[j, 3], gains[j, 4], gains[j, 5],
+                                      n_steps, dt, cascade[j])
+        states[j, :s.shape[0]] = s
+        forces[j, :f.shape[0]] = f
+        fail_steps[j] = fail_step
+    
+    return states, forces, fail_steps
+
+
+
+@njit(cache=True)
+def _episode_cost(initial_state, Kp, Ki, Kd, Kp2, Ki2, Kd2, n_steps, dt, cascade,
+                  force_limit=100.0, angle_limit=0.3,
+                  M=1.0, m=0.1, l=0.5, g=9.8,
+                  x_threshold=2.4, theta_threshold=0.21, anti_windup=False):
+    """
+    与 run_episode 相同的闭环仿真，但不记录轨迹
+    
+    返回:
+        (fail_step, ise)
+        fail_step: 失败时的步序号，未失败为 -1
+        ise: 角度误差平方积分 sum(theta^2)*dt（到失败步为止）
+    """
+    x = initial_state[0]
+    x_dot = initial_state[1]
+    theta = initial_state[2]
+    theta_dot = initial_state[3]
+    
+    integral = 0.0
+    previous_error = 0.0
+    integral_x = 0.0
+    previous_error_x = 0.0
+    ise = 0.0
+    
+    for i in range(n_steps):
+        setpoint = 0.0
+        if cascade:
+            error_x = -x
+            setpoint, integral_x = _pid_step(error_x, integral_x, previous_error_x,
+                                             Kp2, Ki2, Kd2, -angle_limit, angle_limit, dt,
+                                             anti_windup)
+            previous_error_x = error_x
+        
+        error = setpoint - theta
+        force, integral = _pid_step(error, integral, previous_error,
+                                    Kp, Ki, Kd, -force_limit, force_limit, dt, anti_windup)
+        previous_error = error
+        ise += theta * theta * dt
+        
+        if abs(x) > x_threshold or abs(theta) > theta_threshold:
+            return i, ise
+        
+        x, x_dot, theta, theta_dot = _rk4_step(x, x_dot, theta, theta_dot, force,
+                                               M, m, l, g, dt)
+    
+    return -1, ise
+
+
+@njit(cache=True, parallel=True)
+def sweep_episodes(initial_states, gains, cascade, n_steps, dt):
+    """
+    并行评估多组增益/初始条件（用于增益网格搜索）
+    
+    参数同 run_episodes；每组只保留两个标量，内存占用与组数成正比，
+    可一次评估上万组
+    
+    返回:
+        (fail_steps, ise): 均为 (n,) 数组，含义见 _episode_cost
+    """
+    n = initial_states.shape[0]
+    fail_steps = np.empty(n, dtype=np.int64)
+    ise = np.empty(n)
+    
+    for j in prange(n):
+        fail_steps[j], ise[j] = _episode_cost(initial_states[j],
+                                              gains[j, 0], gains[j, 1], gains[j, 2],
+                                              gains[j, 3], gains[j, 4], gains[j, 5],
+                                              n_steps, dt, cascade[j])
+    
+    return fail_steps, ise
+
+
+@njit(cache=True)
+def _record_pid_terms(history, i, error, output, integral, previous_error,
+                      Kp, Ki, Kd, dt):
+    """按 PIDController 历史记录的列（误差、输出、P项、I项、D项）写入第 i 行"""
+    if dt > 0:
+        derivative = (error - previous_error) / dt
+    else:
+        derivative = 0.0
+    history[i, 0] = error
+    history[i, 1] = output
+    history[i, 2] = Kp * error
+    history[i, 3] = Ki * integral
+    history[i, 4] = Kd * derivative
+
+
+@njit(cache=True)
+def simulate_first_order(Kp, Ki, Kd, setpoint, out_min, out_max,
+                         tau, initial_value, dt, noise,
+                         disturbance_step, disturbance_value,
+                         record=True, anti_windup=False):
+    """
+    PID + 一阶系统（τ·dy/dt + y = u，欧拉法）整段闭环仿真
+    
+    每步顺序与 PIDExperiments.run_single_experiment 相同：PID测量无噪声的
+    系统状态，扰动叠加在PID输出之后，记录的系统输出叠加测量噪声
+    
+    参数:
+        Kp, Ki, Kd, setpoint: PID增益和目标值
+        out_min, out_max: PID输出限幅
+        tau: 时间常数
+        initial_value: 初始状态
+        dt: 时间步长
+        noise: 每步输出噪声，长度即仿真步数（无噪声时传全0数组）
+        disturbance_step: 从该步起叠加扰动（无扰动时传仿真步数）
+        disturbance_value: 扰动大小
+        record: 是否记录PID历史
+        anti_windup: PID是否启用抗积分饱和（条件积分）
+    
+    返回:
+        (outputs, controls, history)
+        outputs, controls: 各步系统输出和（含扰动的）控制信号
+        history: (n, 5) PID历史，列同 PIDController 的历史记录；
+                 record 为 False 时为 (0, 5) 空数组
+    """
+    n = noise.shape[0]
+    outputs = np.empty(n)
+    controls = np.empty(n)
+    history = np.empty((n if record else 0, 5))
+    
+    y = initial_value
+    integral = 0.0
+    previous_error = 0.0
+    
+    for i in range(n):
+        error = setpoint - y
+        u, integral = _pid_step(error, integral, previous_error,
+                                Kp, Ki, Kd, out_min, out_max, dt, anti_windup)
+        if record:
+            _record_pid_terms(history, i, error, u, integral, previous_error, Kp, Ki, Kd, dt)
+        previous_error = error
+        
+        if i >= disturbance_step:
+            u += disturbance_value
+        
+        y += (u - y) / tau * dt
+        outputs[i] = y + noise[i]
+        controls[i] = u
+    
+    return outputs, controls, history
+
+
+@njit(cache=True)
+def simulate_second_order(Kp, Ki, Kd, setpoint, out_min, out_max,
+                          mass, damping, stiffness, initial_position, initial_velocity,
+                          dt, noise, disturbance_step, disturbance_value,
+                          record=True, anti_windup=False):
+    """
+    PID + 二阶系统（m·y'' + c·y' + k·y = u，欧拉法）整段闭环仿真
+    
+    参数与返回值同 simulate_first_order，系统参数换为质量、阻尼、刚度
+    以及初始位置和速度
+    """
+    n = noise.shape[0]
+    outputs = np.empty(n)
+    controls = np.empty(n)
+    history = np.empty((n if record else 0, 5))
+    
+    position = initial_position
+    velocity = initial_velocity
+    integral = 0.0
+    previous_error = 0.0
+    
+    for i in range(n):
+        error = setpoint - position
+        u, integral = _pid_step(error, integral, previous_error,
+                                Kp, Ki, Kd, out_min, out_max, dt, anti_windup)
+        if record:
+            _record_pid_terms(history, i, error, u, integral, previous_error, Kp, Ki, Kd, dt)
+        previous_error = error
+        
+        if i >= disturbance_step:
+            u += disturbance_value
+        
+        acceleration = (u - damping * velocity - stiffness * position) / mass
+        velocity += acceleration * dt
+        position += velocity * dt
+        outputs[i] = position + noise[i]
+        controls[i] = u
+    
+    return outputs, controls, history
@@ -3,33 +3,126 @@ PID控制器实验
 详细展示Kp, Ki, Kd三个参数对系统控制效果的影响
 """
 import numpy as np
-import matplotlib
-matplotlib.use('Agg')  # 使用非交互式后端
-import matplotlib.pyplot as plt
 from matplotlib.gridspec import GridSpec
 import os
+import io
+import contextlib
+import multiprocessing
+from functools import lru_cache, partial
 
 # 导入本地模块
 try:
-    from .pid_controller import PIDController
-    from .simulated_system import FirstOrderSystem, SecondOrderSystem, SystemWithNoise
+    from ._jit import HAS_NUMBA
+    from ._plotting import LINE_KW, decimate, new_figure, save_figure
+    from .pid_controller import PIDController, BatchedPIDController
+    from .pid_controller_jit import simulate_first_order, simulate_second_order
+    from .simulated_system import (FirstOrderSystem, SecondOrderSystem, SystemWithNoise,
+                                   FirstOrderSystemBank, SecondOrderSystemBank)
 except ImportError:
-    from pid_controller import PIDController
-    from simulated_system import FirstOrderSystem, SecondOrderSystem, SystemWithNoise
+    from _jit import HAS_NUMBA
+    from _plotting import LINE_KW, decimate, new_figure, save_figure
+    from pid_controller import PIDController, BatchedPIDController
+    from pid_controller_jit import simulate_first_order, simulate_second_order
+    from simulated_system import (FirstOrderSystem, SecondOrderSystem, SystemWithNoise,
+                                  FirstOrderSystemBank, SecondOrderSystemBank)
+
+# build_kernels.py 预编译的扩展模块存在时优先使用，省去首次调用的JIT编译；
+# 它不依赖 numba，未安装 numba 时同样是编译执行
+try:
+    try:
+        from .pid_kernels import simulate_first_order, simulate_second_order
+    except ImportError:
+        from pid_kernels import simulate_first_order, simulate_second_order
+    HAS_COMPILED_KERNELS = True
+except ImportError:
+    HAS_COMPILED_KERNELS = HAS_NUMBA
+
+
+class _PIDRecord:
+    """编译内核返回的PID历史，提供与 PIDController 相同的 *_history 属性"""
+    
+    def __init__(self, history):
+        self._history = history
+    
+    @property
+    def error_history(self):
+        return self._history[:, 0]
+    
+    @property
+    def output_history(self):
+        return self._history[:, 1]
+    
+    @property
+    def p_term_history(self):
+        return self._history[:, 2]
+    
+    @property
+    def i_term_history(self):
+        return self._history[:, 3]
+    
+    @property
+    def d_term_history(self):
+        return self._history[:, 4]
+
+
+@lru_cache(maxsize=None)
+def _time_base(simulation_time, time_steps):
+    """
+    仿真时间轴（同一进程中相同参数的实例共用一个只读数组）
+    
+    参数:
+        simulation_time: 仿真时间(秒)
+        time_steps: 步数
+    """
+    time = np.linspace(0, simulation_time, time_steps)
+    time.flags.writeable = False
+    return time
 
-# 设置中文字体支持
-plt.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans']
-plt.rcParams['axes.unicode_minus'] = False
+
+def _simulate_one(experiments, job):
+    """
+    运行扫描中的一次实验（模块级函数，可被 pickle 到工作进程）
+    
+    参数:
+        experiments: PIDExperiments 实例
+        job: (pid_kwargs, system, run_kwargs)，分别为 PIDController 的构造参数、
+             被控系统对象和 run_single_experiment 的其余关键字参数。
+             每次运行前都会 reset 系统，同一扫描中的各 job 可共用一个系统对象
+    """
+    pid_kwargs, system, run_kwargs = job
+    pid = PIDController(**pid_kwargs)
+    return experiments.run_single_experiment(pid, system, **run_kwargs)
+
+
+def _run_experiment(experiments, name):
+    """
+    在工作进程中运行一个实验方法（模块级函数，可被 pickle）
+    
+    返回其打印输出，由主进程按实验顺序打印，避免多进程输出交错
+    """
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        getattr(experiments, name)()
+    return buffer.getvalue()
 
 
 class PIDExperiments:
-    """PID控制实验类"""
+    """
+    PID控制实验类
+    
+    参数:
+        processes: 参数扫描使用的进程数。默认1在当前进程中顺序运行：
+                   一阶、二阶系统的闭环在编译内核中只需微秒级，进程池的
+                   启动开销远大于计算；被控系统较慢（如逐步仿真）时可设为
+                   CPU 核数
+    """
     
-    def __init__(self):
+    def __init__(self, processes=1):
+        self.processes = processes
         self.simulation_time = 20.0  # 仿真时间(秒)
         self.dt = 0.01  # 时间步长
         self.time_steps = int(self.simulation_time / self.dt)
-        self.time = np.linspace(0, self.simulation_time, self.time_steps)
+        self.time = _time_base(self.simulation_time, self.time_steps)
     
     def run_single_experiment(self, pid_controller, system, setpoint=1.0, 
                              disturbance_time=None, disturbance_value=0.0):
@@ -44,30 +137,36 @@ class PIDExperiments:
             disturbance_value: 扰动大小
         
         返回:
-            time, output, control_signal
+            time, output, control_signal, pid
+            一阶、二阶系统（可带噪声包装）整段在编译内核中仿真，pid 为提供
+            *_history 属性的记录对象；其他系统逐步仿真，pid 即传入的控制器
         """
-        # 重置控制器和系统
-        pid_controller.reset()
+        # 重置控制器和系统（按步数预分配控制器的历史记录）
+        pid_controller.reset(n_steps=self.time_steps)
         pid_controller.set_setpoint(setpoint)
         system.reset()
         
-        outputs = []
-        control_signals = []
+        fast = self._run_compiled(pid_controller, system, setpoint,
+                                  disturbance_time, disturbance_value)
+        if fast is not None:
+            return fast
+        
+        outputs = np.empty(self.time_steps)
+        control_signals = np.empty(self.time_steps)
+        
+        # 噪声包装的系统一次生成整段噪声
+        if isinstance(system, SystemWithNoise):
+            system.prebake_noise(self.time_steps)
+        
+        # 读取系统输出的方式在循环外解析一次
+        get_output = self._output_getter(system)
         
         for i, t in enumerate(self.time):
             # 获取当前系统输出(从系统对象获取)
-            if hasattr(system, 'state'):
-                current_output = system.state
-            elif hasattr(system, 'position'):
-                current_output = system.position
-            elif hasattr(system, 'base_system'):
-                # 处理SystemWithNoise包装器
-                if hasattr(system.base_system, 'state'):
-                    current_output = system.base_system.state
-                elif hasattr(system.base_system, 'position'):
-                    current_output = system.base_system.position
+            if get_output is not None:
+                current_output = get_output()
             else:
-                current_output = 0.0 if i == 0 else outputs[-1]
+                current_output = 0.0 if i == 0 else outputs[i - 1]
             
             # 计算控制信号
             control_signal = pid_controller.update(current_output, self.dt)
@@ -79,10 +178,180 @@ class PIDExperiments:
             # 更新系统
             new_output = system.update(control_signal, self.dt)
             
-            outputs.append(new_output)
-            control_signals.append(control_signal)
+            outputs[i] = new_output
+            control_signals[i] = control_signal
+        
+        return self.time, outputs, control_signals, pid_controller
+    
+    @staticmethod
+    def _output_getter(system):
+        """
+        返回读取系统当前输出的无参函数
+        
+        优先使用 output 属性；否则依次查找系统自身或其 base_system 的
+        state、position 属性。都没有时返回 None（以上一步输出代替）
+        """
+        if hasattr(system, 'output'):
+            return lambda: system.output
+        for obj in (system, getattr(system, 'base_system', None)):
+            for name in ('state', 'position'):
+                if hasattr(obj, name):
+                    return lambda obj=obj, name=name: getattr(obj, name)
+        return None
+    
+    def run_sweep(self, jobs):
+        """
+        运行一组互不相关的实验（参数扫描），processes > 1 时分发到进程池
+        
+        参数:
+            jobs: [(pid_kwargs, system, run_kwargs), ...]，含义见 _simulate_one
+        
+        返回:
+            与 jobs 顺序一致的 run_single_experiment 结果列表
+        """
+        run = partial(_simulate_one, self)
+        processes = min(self.processes or os.cpu_count() or 1, len(jobs))
+        if multiprocessing.current_process().daemon:
+            # 已在 run_all_experiments 的工作进程中，不能再创建子进程
+            processes = 1
+        if not HAS_COMPILED_KERNELS and processes <= 1:
+            # 无numba时内核以纯Python逐步运行，改为沿参数轴向量化的一次推演
+            results = self._run_batched(jobs)
+            if results is not None:
+                return results
+        if processes > 1:
+            with multiprocessing.Pool(processes=processes) as pool:
+                return pool.map(run, jobs)
+        return [run(job) for job in jobs]
+    
+    def _run_batched(self, jobs):
+        """
+        把一组实验沿参数轴合成一次NumPy推演（结果与逐个运行相同）
+        
+        各实验的增益、目标值、系统参数、噪声和扰动都成为长度为 n 的数组，
+        时间循环只有一层，每步对整批做逐元素运算。
+        被控系统类型不全相同或不是一阶、二阶系统时返回 None
+        
+        参数:
+            jobs: 同 run_sweep
+        
+        返回:
+            与 jobs 顺序一致的 run_single_experiment 结果列表
+        """
+        pids, systems, settings = [], [], []
+        for pid_kwargs, system, run_kwargs in jobs:
+            system.reset()
+            base_system, noise_std = self._unwrap_system(system)
+            pids.append(PIDController(**pid_kwargs))
+            systems.append(base_system)
+            settings.append((noise_std, run_kwargs))
+        
+        kind = type(systems[0])
+        if kind not in (FirstOrderSystem, SecondOrderSystem) or \
+                any(type(system) is not kind for system in systems):
+            return None
+        
+        N = len(self.time)
+        dt = self.dt
+        noise = np.empty((len(jobs), N))
+        setpoint = np.empty(len(jobs))
+        disturbance = np.zeros((len(jobs), N))
+        for j, (noise_std, run_kwargs) in enumerate(settings):
+            noise[j], disturbance_step = self._noise_and_disturbance(
+                noise_std, run_kwargs.get('disturbance_time'))
+            disturbance[j, disturbance_step:] = run_kwargs.get('disturbance_value', 0.0)
+            setpoint[j] = run_kwargs.get('setpoint', 1.0)
+        
+        Kp = np.array([pid.Kp for pid in pids], dtype=np.float64)
+        Ki = np.array([pid.Ki for pid in pids], dtype=np.float64)
+        Kd = np.array([pid.Kd for pid in pids], dtype=np.float64)
+        pid = BatchedPIDController(len(jobs), Kp, Ki, Kd, setpoint,
+                                   np.array([p.anti_windup for p in pids]))
+        pid.set_output_limits(np.array([p.output_limits[0] for p in pids]),
+                              np.array([p.output_limits[1] for p in pids]))
+        
+        if kind is FirstOrderSystem:
+            bank = FirstOrderSystemBank.from_systems(systems)
+        else:
+            bank = SecondOrderSystemBank.from_systems(systems)
+        y = bank.output
+        
+        outputs = np.empty((len(jobs), N))
+        controls = np.empty((len(jobs), N))
+        history = np.empty((len(jobs), N, 5))
+        
+        for i in range(N):
+            previous_error = pid.previous_error.copy()
+            u = pid.update(y, dt)
+            
+            # 与 PIDController 相同的历史记录列
+            error = pid.previous_error
+            history[:, i, 0] = error
+            history[:, i, 1] = u
+            history[:, i, 2] = Kp * error
+            history[:, i, 3] = Ki * pid.integral
+            history[:, i, 4] = Kd * ((error - previous_error) / dt)
+            
+            u = u + disturbance[:, i]
+            y = bank.step(u, dt)
+            outputs[:, i] = y + noise[:, i]
+            controls[:, i] = u
+        
+        # 与逐个运行相同，未开启记录的控制器返回空历史
+        return [(self.time, outputs[j], controls[j],
+                 _PIDRecord(history[j] if pids[j].recording else history[j, :0]))
+                for j in range(len(jobs))]
+    
+    @staticmethod
+    def _unwrap_system(system):
+        """拆出噪声包装，返回 (基础系统, 噪声标准差)"""
+        if isinstance(system, SystemWithNoise):
+            return system.base_system, system.noise_std
+        return system, 0.0
+    
+    def _noise_and_disturbance(self, noise_std, disturbance_time):
+        """
+        生成整段输出噪声，并求扰动开始的步序号
         
-        return self.time, np.array(outputs), np.array(control_signals), pid_controller
+        与 SystemWithNoise 相同，噪声取自全局随机数生成器；
+        无扰动时步序号为总步数
+        """
+        n = len(self.time)
+        noise = np.random.normal(0, noise_std, n) if noise_std else np.zeros(n)
+        if disturbance_time is None:
+            return noise, n
+        return noise, int(np.searchsorted(self.time, disturbance_time))
+    
+    def _run_compiled(self, pid_controller, system, setpoint,
+                      disturbance_time, disturbance_value):
+        """
+        用编译内核整段仿真 run_single_experiment 的闭环
+        
+        系统不是一阶、二阶系统（或其噪声包装）时返回 None，由调用方逐步仿真
+        """
+        base_system, noise_std = self._unwrap_system(system)
+        if type(base_system) not in (FirstOrderSystem, SecondOrderSystem):
+            return None
+        noise, disturbance_step = self._noise_and_disturbance(noise_std, disturbance_time)
+        
+        lo, hi = pid_controller.output_limits
+        pid_args = (float(pid_controller.Kp), float(pid_controller.Ki),
+                    float(pid_controller.Kd), float(setpoint), float(lo), float(hi))
+        
+        if type(base_system) is FirstOrderSystem:
+            outputs, controls, history = simulate_first_order(
+                *pid_args, float(base_system.tau), float(base_system.state),
+                self.dt, noise, disturbance_step, float(disturbance_value),
+                pid_controller.recording, pid_controller.anti_windup)
+        else:
+            outputs, controls, history = simulate_second_order(
+                *pid_args, float(base_system.mass), float(base_system.damping),
+                float(base_system.stiffness), float(base_system.position),
+                float(base_system.velocity),
+                self.dt, noise, disturbance_step, float(disturbance_value),
+                pid_controller.recording, pid_controller.anti_windup)
+        
+        return self.time, outputs, controls, _PIDRecord(history)
     
     def experiment_kp_effect(self):
         """
@@ -98,7 +367,7 @@ class PIDExperiments:
         
         kp_values = [0.5, 1.0, 2.0, 5.0, 10.0]
         
-        fig = plt.figure(figsize=(16, 10))
+        fig = new_figure((16, 10))
         gs = GridSpec(3, 2, figure=fig, hspace=0.3, wspace=0.3)
         
         # 主响应曲线
@@ -114,18 +383,20 @@ class PIDExperiments:
         overshoots = []
         steady_state_errors = []
         
-        for kp in kp_values:
-            # 使用一阶系统
-            system = FirstOrderSystem(tau=1.0)
-            pid = PIDController(Kp=kp, Ki=0.0, Kd=0.0, setpoint=1.0)
-            
-            time, output, control, _ = self.run_single_experiment(pid, system, setpoint=1.0)
-            
+        # 使用一阶系统（各次实验共用一个系统对象，运行前都会 reset）
+        system = FirstOrderSystem(tau=1.0)
+        results = self.run_sweep([
+            (dict(Kp=kp, Ki=0.0, Kd=0.0, setpoint=1.0), system,
+             dict(setpoint=1.0))
+            for kp in kp_values
+        ])
+        
+        for kp, (time, output, control, _) in zip(kp_values, results):
             # 绘制输出响应
-            ax1.plot(time, output, label=f'Kp={kp}', linewidth=2)
+            ax1.plot(*decimate(ax1, time, output), label=f'Kp={kp}', **LINE_KW)
             
             # 绘制控制信号
-            ax2.plot(time, control, label=f'Kp={kp}', linewidth=2)
+            ax2.plot(*decimate(ax2, time, control), label=f'Kp={kp}', **LINE_KW)
             
             # 计算性能指标
             rise_time = self._calculate_rise_time(time, output, 1.0)
@@ -176,14 +447,11 @@ class PIDExperiments:
         ax4.set_xticklabels([f'{kp}' for kp in kp_values])
         ax4.grid(True, alpha=0.3, axis='y')
         
-        plt.suptitle('实验1: 比例增益Kp的影响\n增大Kp加快响应但可能引起振荡', 
+        fig.suptitle('实验1: 比例增益Kp的影响\n增大Kp加快响应但可能引起振荡', 
                      fontsize=16, fontweight='bold', y=0.995)
         
-        output_path = os.path.join('..', 'output', 'experiment_1_kp_effect.png')
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
+        output_path = save_figure(fig, 'experiment_1_kp_effect.png')
         print(f"\n图表已保存: {output_path}")
-        plt.close()
         
         return fig
     
@@ -202,7 +470,7 @@ class PIDExperiments:
         kp = 2.0
         ki_values = [0.0, 0.5, 1.0, 2.0, 5.0]
         
-        fig = plt.figure(figsize=(16, 12))
+        fig = new_figure((16, 12))
         gs = GridSpec(3, 2, figure=fig, hspace=0.35, wspace=0.3)
         
         # 主响应曲线
@@ -214,30 +482,29 @@ class PIDExperiments:
         ax4 = fig.add_subplot(gs[2, 0])
         ax5 = fig.add_subplot(gs[2, 1])
         
-        for ki in ki_values:
-            # 使用带有小扰动的系统来体现积分作用
-            base_system = FirstOrderSystem(tau=1.0)
-            system = SystemWithNoise(base_system, noise_std=0.01)
-            
-            pid = PIDController(Kp=kp, Ki=ki, Kd=0.0, setpoint=1.0)
-            
-            time, output, control, pid_obj = self.run_single_experiment(
-                pid, system, setpoint=1.0
-            )
-            
+        # 使用带有小扰动的系统来体现积分作用
+        system = SystemWithNoise(FirstOrderSystem(tau=1.0), noise_std=0.01)
+        results = self.run_sweep([
+            (dict(Kp=kp, Ki=ki, Kd=0.0, setpoint=1.0, record=True),
+             system,
+             dict(setpoint=1.0))
+            for ki in ki_values
+        ])
+        
+        for ki, (time, output, control, pid_obj) in zip(ki_values, results):
             # 绘制输出响应
-            ax1.plot(time, output, label=f'Ki={ki}', linewidth=2)
+            ax1.plot(*decimate(ax1, time, output), label=f'Ki={ki}', **LINE_KW)
             
             # 绘制控制信号
-            ax2.plot(time, control, label=f'Ki={ki}', linewidth=2)
+            ax2.plot(*decimate(ax2, time, control), label=f'Ki={ki}', **LINE_KW)
             
             # 绘制误差
-            errors = np.array(pid_obj.error_history)
-            ax4.plot(time, errors, label=f'Ki={ki}', linewidth=2)
+            errors = pid_obj.error_history
+            ax4.plot(*decimate(ax4, time, errors), label=f'Ki={ki}', **LINE_KW)
             
             # 绘制积分项
-            i_terms = np.array(pid_obj.i_term_history)
-            ax5.plot(time, i_terms, label=f'Ki={ki}', linewidth=2)
+            i_terms = pid_obj.i_term_history
+            ax5.plot(*decimate(ax5, time, i_terms), label=f'Ki={ki}', **LINE_KW)
             
             # 计算稳态误差
             sse = abs(1.0 - np.mean(output[-100:]))
@@ -261,13 +528,11 @@ class PIDExperiments:
         ax2.grid(True, alpha=0.3)
         
         # 绘制放大的稳态区域
-        zoom_time = time > 10
-        for ki in ki_values:
-            base_system = FirstOrderSystem(tau=1.0)
-            system = SystemWithNoise(base_system, noise_std=0.01)
-            pid = PIDController(Kp=kp, Ki=ki, Kd=0.0, setpoint=1.0)
-            time_z, output_z, _, _ = self.run_single_experiment(pid, system, setpoint=1.0)
-            ax3.plot(time_z[zoom_time], output_z[zoom_time], label=f'Ki={ki}', linewidth=2)
+        # 直接复用上面的仿真结果，不再重新仿真
+        # 时间轴单调递增，t > 10 的部分是一段连续切片（视图，不复制）
+        zoom_time = slice(int(np.searchsorted(self.time, 10, side='right')), None)
+        for ki, (time_z, output_z, _, _) in zip(ki_values, results):
+            ax3.plot(time_z[zoom_time], output_z[zoom_time], label=f'Ki={ki}', **LINE_KW)
         
         ax3.axhline(y=1.0, color='r', linestyle='--', linewidth=2, label='目标值')
         ax3.set_xlabel('时间 (s)', fontsize=12)
@@ -290,13 +555,11 @@ class PIDExperiments:
         ax5.legend(fontsize=10)
         ax5.grid(True, alpha=0.3)
         
-        plt.suptitle('实验2: 积分增益Ki的影响\nKi消除稳态误差，但过大会导致超调和振荡', 
+        fig.suptitle('实验2: 积分增益Ki的影响\nKi消除稳态误差，但过大会导致超调和振荡', 
                      fontsize=16, fontweight='bold', y=0.998)
         
-        output_path = os.path.join('..', 'output', 'experiment_2_ki_effect.png')
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
+        output_path = save_figure(fig, 'experiment_2_ki_effect.png')
         print(f"\n图表已保存: {output_path}")
-        plt.close()
         
         return fig
     
@@ -317,7 +580,7 @@ class PIDExperiments:
         ki = 1.0
         kd_values = [0.0, 0.5, 1.0, 2.0, 5.0]
         
-        fig = plt.figure(figsize=(16, 12))
+        fig = new_figure((16, 12))
         gs = GridSpec(3, 2, figure=fig, hspace=0.35, wspace=0.3)
         
         # 主响应曲线
@@ -331,29 +594,29 @@ class PIDExperiments:
         
         overshoots = []
         
-        for kd in kd_values:
-            # 使用二阶系统，更容易看出阻尼效果
-            system = SecondOrderSystem(mass=1.0, damping=0.3, stiffness=1.0)
-            
-            pid = PIDController(Kp=kp, Ki=ki, Kd=kd, setpoint=1.0)
-            
-            time, output, control, pid_obj = self.run_single_experiment(
-                pid, system, setpoint=1.0
-            )
-            
+        # 使用二阶系统，更容易看出阻尼效果
+        system = SecondOrderSystem(mass=1.0, damping=0.3, stiffness=1.0)
+        results = self.run_sweep([
+            (dict(Kp=kp, Ki=ki, Kd=kd, setpoint=1.0, record=True),
+             system,
+             dict(setpoint=1.0))
+            for kd in kd_values
+        ])
+        
+        for kd, (time, output, control, pid_obj) in zip(kd_values, results):
             # 绘制输出响应
-            ax1.plot(time, output, label=f'Kd={kd}', linewidth=2)
+            ax1.plot(*decimate(ax1, time, output), label=f'Kd={kd}', **LINE_KW)
             
             # 绘制控制信号
-            ax2.plot(time, control, label=f'Kd={kd}', linewidth=2)
+            ax2.plot(*decimate(ax2, time, control), label=f'Kd={kd}', **LINE_KW)
             
             # 计算超调量
             overshoot = self._calculate_overshoot(output, 1.0)
             overshoots.append(overshoot)
             
             # 绘制微分项
-            d_terms = np.array(pid_obj.d_term_history)
-            ax4.plot(time, d_terms, label=f'Kd={kd}', linewidth=2)
+            d_terms = pid_obj.d_term_history
+            ax4.plot(*decimate(ax4, time, d_terms), label=f'Kd={kd}', **LINE_KW)
             
             print(f"\nKd = {kd} (Kp = {kp}, Ki = {ki}):")
             print(f"  超调量: {overshoot:.2f} %")
@@ -371,14 +634,16 @@ class PIDExperiments:
         
         # 测试Kd对噪声的敏感性
         print("\n测试Kd对噪声的敏感性...")
-        for kd in [0.0, 2.0]:
-            base_system = SecondOrderSystem(mass=1.0, damping=0.3, stiffness=1.0)
-            system = SystemWithNoise(base_system, noise_std=0.05)
-            
-            pid = PIDController(Kp=kp, Ki=ki, Kd=kd, setpoint=1.0)
-            time, output, _, _ = self.run_single_experiment(pid, system, setpoint=1.0)
-            
-            ax5.plot(time, output, label=f'Kd={kd} (有噪声)', linewidth=2, alpha=0.7)
+        noise_kd_values = [0.0, 2.0]
+        noisy_system = SystemWithNoise(system, noise_std=0.05)
+        results = self.run_sweep([
+            (dict(Kp=kp, Ki=ki, Kd=kd, setpoint=1.0),
+             noisy_system,
+             dict(setpoint=1.0))
+            for kd in noise_kd_values
+        ])
+        for kd, (time, output, _, _) in zip(noise_kd_values, results):
+            ax5.plot(*decimate(ax5, time, output), label=f'Kd={kd} (有噪声)', **LINE_KW, alpha=0.7)
         
         # 设置图表
         ax1.axhline(y=1.0, color='r', linestyle='--', linewidth=2, label='目标值')
@@ -408,13 +673,11 @@ class PIDExperiments:
         ax5.legend(fontsize=10)
         ax5.grid(True, alpha=0.3)
         
-        plt.suptitle('实验3: 微分增益Kd的影响\nKd减小超调和振荡，但对噪声敏感', 
+        fig.suptitle('实验3: 微分增益Kd的影响\nKd减小超调和振荡，但对噪声敏感', 
                      fontsize=16, fontweight='bold', y=0.998)
         
-        output_path = os.path.join('..', 'output', 'experiment_3_kd_effect.png')
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
+        output_path = save_figure(fig, 'experiment_3_kd_effect.png')
         print(f"\n图表已保存: {output_path}")
-        plt.close()
         
         return fig
     
@@ -436,7 +699,7 @@ class PIDExperiments:
             {'name': '优化PID', 'Kp': 3.5, 'Ki': 1.8, 'Kd': 1.2},
         ]
         
-        fig = plt.figure(figsize=(16, 10))
+        fig = new_figure((16, 10))
         gs = GridSpec(3, 2, figure=fig, hspace=0.35, wspace=0.3)
         
         ax1 = fig.add_subplot(gs[0, :])
@@ -446,37 +709,33 @@ class PIDExperiments:
         
         performance_metrics = []
         
-        for config in configs:
-            system = SecondOrderSystem(mass=1.0, damping=0.5, stiffness=1.0)
-            pid = PIDController(
-                Kp=config['Kp'], 
-                Ki=config['Ki'], 
-                Kd=config['Kd'], 
-                setpoint=1.0
-            )
-            
-            # 添加阶跃扰动
-            time, output, control, pid_obj = self.run_single_experiment(
-                pid, system, setpoint=1.0, 
-                disturbance_time=10.0, disturbance_value=-0.5
-            )
-            
+        # 添加阶跃扰动；只有"优化PID"的P/I/D各项会被绘出，仅它记录历史
+        system = SecondOrderSystem(mass=1.0, damping=0.5, stiffness=1.0)
+        results = self.run_sweep([
+            (dict(Kp=config['Kp'], Ki=config['Ki'], Kd=config['Kd'],
+                  setpoint=1.0, record=config['name'] == '优化PID'),
+             system,
+             dict(setpoint=1.0, disturbance_time=10.0, disturbance_value=-0.5))
+            for config in configs
+        ])
+        
+        for config, (time, output, control, pid_obj) in zip(configs, results):
             # 绘制响应
-            ax1.plot(time, output, label=config['name'], linewidth=2.5)
+            ax1.plot(*decimate(ax1, time, output), label=config['name'], linewidth=2.5)
             
             # 绘制控制信号
-            ax2.plot(time, control, label=config['name'], linewidth=2)
+            ax2.plot(*decimate(ax2, time, control), label=config['name'], **LINE_KW)
             
             # 绘制P, I, D各项贡献
             if config['name'] == '优化PID':
-                p_terms = np.array(pid_obj.p_term_history)
-                i_terms = np.array(pid_obj.i_term_history)
-                d_terms = np.array(pid_obj.d_term_history)
+                p_terms = pid_obj.p_term_history
+                i_terms = pid_obj.i_term_history
+                d_terms = pid_obj.d_term_history
                 
-                ax4.plot(time, p_terms, label='P项', linewidth=2, linestyle='-')
-                ax4.plot(time, i_terms, label='I项', linewidth=2, linestyle='--')
-                ax4.plot(time, d_terms, label='D项', linewidth=2, linestyle='-.')
-                ax4.plot(time, control, label='总控制信号', linewidth=2.5, 
+                ax4.plot(*decimate(ax4, time, p_terms), label='P项', **LINE_KW, linestyle='-')
+                ax4.plot(*decimate(ax4, time, i_terms), label='I项', **LINE_KW, linestyle='--')
+                ax4.plot(*decimate(ax4, time, d_terms), label='D项', **LINE_KW, linestyle='-.')
+                ax4.plot(*decimate(ax4, time, control), label='总控制信号', linewidth=2.5, 
                         linestyle='-', color='black', alpha=0.7)
             
             # 计算性能指标
@@ -551,18 +810,23 @@ class PIDExperiments:
         ax4.legend(fontsize=11, ncol=4)
         ax4.grid(True, alpha=0.3)
         
-        plt.suptitle('实验4: PID参数综合调节\n协调Kp, Ki, Kd以达到最佳控制性能', 
+        fig.suptitle('实验4: PID参数综合调节\n协调Kp, Ki, Kd以达到最佳控制性能', 
                      fontsize=16, fontweight='bold', y=0.998)
         
-        output_path = os.path.join('..', 'output', 'experiment_4_combined_tuning.png')
-        plt.savefig(output_path, dpi=300, bbox_inches='tight')
+        output_path = save_figure(fig, 'experiment_4_combined_tuning.png')
         print(f"\n图表已保存: {output_path}")
-        plt.close()
         
         return fig
     
-    def run_all_experiments(self):
-        """运行所有实验"""
+    def run_all_experiments(self, processes=None):
+        """
+        运行所有实验
+        
+        参数:
+            processes: 并行运行四个实验的进程数，默认取 CPU 核数与实验数的
+                       较小值；设为1时在当前进程中顺序运行。各实验互不依赖，
+                       分别保存自己的图片（Agg 后端无需显示器）
+        """
         print("\n" + "=" * 60)
         print("PID控制器完整实验")
         print("=" * 60)
@@ -572,10 +836,17 @@ class PIDExperiments:
         print("3. 微分增益 Kd 的影响")
         print("4. PID参数综合调节\n")
         
-        self.experiment_kp_effect()
-        self.experiment_ki_effect()
-        self.experiment_kd_effect()
-        self.experiment_combined_tuning()
+        names = ['experiment_kp_effect', 'experiment_ki_effect',
+                 'experiment_kd_effect', 'experiment_combined_tuning']
+        if processes is None:
+            processes = min(os.cpu_count() or 1, len(names))
+        if processes > 1:
+            with multiprocessing.Pool(processes=processes) as pool:
+                for log in pool.map(partial(_run_experiment, self), names):
+                    print(log, end='')
+        else:
+            for name in names:
+                getattr(self, name)()
         
         print("\n" + "=" * 60)
         print("所有实验完成!")
@@ -584,24 +855,23 @@ class PIDExperiments:
     # 辅助函数
     def _calculate_rise_time(self, time, output, setpoint, threshold=0.9):
         """计算上升时间 (达到目标值90%的时间)"""
-        try:
-            idx = np.where(output >= setpoint * threshold)[0][0]
-            return time[idx]
-        except:
+        reached = output >= setpoint * threshold
+        idx = np.argmax(reached)
+        if not reached[idx]:
             return time[-1]
+        return time[idx]
     
     def _calculate_settling_time(self, time, output, setpoint, tolerance=0.02):
         """计算调节时间 (进入±2%误差带的时间)"""
         upper = setpoint * (1 + tolerance)
         lower = setpoint * (1 - tolerance)
         
-        for i in range(len(output)-100, -1, -1):
-            if output[i] > upper or output[i] < lower:
-                if i + 100 < len(time):
-                    return time[i + 100]
-                else:
-                    return time[-1]
-        return time[0]
+        # 最后一次超出误差带的位置（只检查到倒数第100个点），向后100点即调节时间
+        head = output[:len(output) - 99]
+        outside = np.flatnonzero((head > upper) | (head < lower))
+        if outside.size == 0:
+            return time[0]
+        return time[min(outside[-1] + 100, len(time) - 1)]
     
     def _calculate_overshoot(self, output, setpoint):
         """计算超调量 (%)"""
@@ -1,24 +1,18 @@
 """
 快速演示脚本 - 简单的PID控制示例
 """
-import matplotlib
-matplotlib.use('Agg')  # 使用非交互式后端
-import matplotlib.pyplot as plt
 import numpy as np
-import os
 
 # 导入本地模块
 try:
+    from ._plotting import new_figure, save_figure
     from .pid_controller import PIDController
     from .simulated_system import FirstOrderSystem
 except ImportError:
+    from _plotting import new_figure, save_figure
     from pid_controller import PIDController
     from simulated_system import FirstOrderSystem
 
-# 设置中文字体
-plt.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans']
-plt.rcParams['axes.unicode_minus'] = False
-
 
 def quick_demo():
     """快速演示PID控制效果"""
@@ -69,7 +63,8 @@ def quick_demo():
         setpoints.append(pid.setpoint)
     
     # 可视化结果
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8))
+    fig = new_figure((12, 8))
+    ax1, ax2 = fig.subplots(2, 1)
     
     # 系统响应
     ax1.plot(time, outputs, 'b-', linewidth=2, label='系统输出')
@@ -92,12 +87,9 @@ def quick_demo():
     ax2.axvline(x=5.0, color='gray', linestyle=':', alpha=0.5)
     ax2.axvline(x=10.0, color='gray', linestyle=':', alpha=0.5)
     
-    plt.tight_layout()
-    output_path = os.path.join('..', 'output', 'quick_demo.png')
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
+    fig.tight_layout()
+    output_path = save_figure(fig, 'quick_demo.png')
     print(f"\n图表已保存: {output_path}")
-    plt.close()
     
     print("\n" + "=" * 60)
     print("演示完成!")
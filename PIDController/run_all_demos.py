@@ -4,32 +4,54 @@ Run all PID demonstrations
 """
 import os
 import sys
+import io
+import contextlib
+import multiprocessing
 
 # 设置UTF-8编码输出
 if sys.platform == 'win32':
-    import io
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
-def main():
+def _run_quick_demo():
+    """
+    运行快速演示并返回其打印输出（在后台进程中与完整实验并行运行）
+    """
+    try:
+        from .quick_demo import quick_demo
+    except ImportError:
+        from quick_demo import quick_demo
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        quick_demo()
+    return buffer.getvalue()
+
+
+def main(processes=None):
+    """
+    运行快速演示和全部PID实验
+    
+    参数:
+        processes: 并行进程数，默认取 CPU 核数（PID实验最多4个进程）；
+                   设为1时快速演示和各实验都在当前进程中顺序运行
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    
     print("=" * 70)
     print("PID控制器完整演示")
     print("PID Controller Complete Demonstration")
     print("=" * 70)
     
-    # 运行快速演示
+    # 运行快速演示；多核时放到后台进程，与完整实验同时运行，结束后再打印其输出
     print("\n[1/2] 运行快速演示...")
     print("[1/2] Running quick demo...")
-    try:
-        try:
-            from .quick_demo import quick_demo
-        except ImportError:
-            from quick_demo import quick_demo
-        quick_demo()
-        print("✓ 快速演示完成")
-        print("✓ Quick demo completed")
-    except Exception as e:
-        print(f"✗ 快速演示失败: {e}")
-        print(f"✗ Quick demo failed: {e}")
+    pool = None
+    if processes > 1:
+        pool = multiprocessing.Pool(processes=1)
+        demo = pool.apply_async(_run_quick_demo)
+        print("  (后台运行，与完整实验并行 / running in background)")
+    else:
+        _report_quick_demo(_run_quick_demo)
     
     # 运行完整实验
     print("\n[2/2] 运行完整实验 (这可能需要几分钟)...")
@@ -40,13 +62,19 @@ def main():
         except ImportError:
             from pid_experiments import PIDExperiments
         experiments = PIDExperiments()
-        experiments.run_all_experiments()
+        experiments.run_all_experiments(processes=min(processes, 4))
         print("✓ 完整实验完成")
         print("✓ Full experiments completed")
     except Exception as e:
         print(f"✗ 实验失败: {e}")
         print(f"✗ Experiments failed: {e}")
     
+    if pool is not None:
+        print("\n[1/2] 快速演示输出 / Quick demo output:")
+        _report_quick_demo(demo.get)
+        pool.close()
+        pool.join()
+    
     # 总结
     print("\n" + "=" * 70)
     print("所有实验已完成! All experiments completed!")
@@ -63,6 +91,17 @@ def main():
     print("For detailed analysis, see: doc/实验报告.md")
     
 
+def _report_quick_demo(run):
+    """调用 run() 取得快速演示的输出并打印结果"""
+    try:
+        print(run(), end='')
+        print("✓ 快速演示完成")
+        print("✓ Quick demo completed")
+    except Exception as e:
+        print(f"✗ 快速演示失败: {e}")
+        print(f"✗ Quick demo failed: {e}")
+
+
 if __name__ == "__main__":
     main()
 
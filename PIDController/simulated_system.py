@@ -4,6 +4,73 @@
 """
 import numpy as np
 
+try:
+    from ._jit import njit
+    from .pid_controller import _HistoryArray
+except ImportError:
+    from _jit import njit
+    from pid_controller import _HistoryArray
+
+
+@njit(cache=True)
+def _simulate_second_order(u, dt, mass, damping, stiffness, position, velocity, outputs):
+    """
+    二阶系统整段开环仿真（欧拉法，与 SecondOrderSystem.update 逐步相同）
+    
+    参数:
+        u: 各步控制输入
+        dt: 时间步长
+        mass, damping, stiffness: 系统参数
+        position, velocity: 初始位置和速度
+        outputs: 预分配的输出数组，写入各步更新后的位置
+    
+    返回:
+        (position, velocity) 最终状态
+    """
+    for i in range(u.shape[0]):
+        acceleration = (u[i] - damping * velocity - stiffness * position) / mass
+        velocity += acceleration * dt
+        position += velocity * dt
+        outputs[i] = position
+    return position, velocity
+
+
+@njit(cache=True)
+def _second_order_rk4_step(position, velocity, u, dt, mass, damping, stiffness):
+    """
+    二阶系统单步RK4积分（控制输入在步内保持不变）
+    
+    状态导数 f(x, v) = (v, (u - c·v - k·x) / m)
+    
+    返回:
+        (position, velocity) 新状态
+    """
+    inv_m = 1.0 / mass
+    half_dt = 0.5 * dt
+    
+    k1_x = velocity
+    k1_v = (u - damping * velocity - stiffness * position) * inv_m
+    
+    x2 = position + half_dt * k1_x
+    v2 = velocity + half_dt * k1_v
+    k2_x = v2
+    k2_v = (u - damping * v2 - stiffness * x2) * inv_m
+    
+    x3 = position + half_dt * k2_x
+    v3 = velocity + half_dt * k2_v
+    k3_x = v3
+    k3_v = (u - damping * v3 - stiffness * x3) * inv_m
+    
+    x4 = position + dt * k3_x
+    v4 = velocity + dt * k3_v
+    k4_x = v4
+    k4_v = (u - damping * v4 - stiffness * x4) * inv_m
+    
+    sixth_dt = dt / 6.0
+    position += sixth_dt * (k1_x + 2.0 * k2_x + 2.0 * k3_x + k4_x)
+    velocity += sixth_dt * (k1_v + 2.0 * k2_v + 2.0 * k3_v + k4_v)
+    return position, velocity
+
 
 class FirstOrderSystem:
     """
@@ -12,12 +79,28 @@ class FirstOrderSystem:
     参数:
         tau: 时间常数
         initial_value: 初始状态
+        history_dtype: 历史记录的存储精度。np.float32 使历史数组占用减半，
+                       绘图和后处理的内存带宽随之减半；状态本身仍按 float64 计算，
+                       但 dt/τ 极小时相邻两步的差异可能低于 float32 的分辨率（约7位有效数字），
+                       需要从历史中求差分时应保留默认的 float64
     """
     
-    def __init__(self, tau=1.0, initial_value=0.0):
+    def __init__(self, tau=1.0, initial_value=0.0, history_dtype=np.float64):
         self.tau = tau
         self.state = initial_value
-        self.history = [initial_value]
+        # 状态历史（含初始值），按行预分配，写满时容量翻倍
+        self._history = _HistoryArray(1, dtype=history_dtype)
+        self._history.append(initial_value)
+    
+    @property
+    def history(self):
+        """状态历史数组（含初始值）"""
+        return self._history.values[:, 0]
+    
+    @property
+    def output(self):
+        """当前系统输出（即状态）"""
+        return self.state
     
     def update(self, control_input, dt):
         """
@@ -33,13 +116,63 @@ class FirstOrderSystem:
         # 使用欧拉法求解微分方程
         dydt = (control_input - self.state) / self.tau
         self.state += dydt * dt
-        self.history.append(self.state)
+        self._history.append(self.state)
+        return self.state
+    
+    def update_rk4(self, control_input, dt):
+        """
+        用四阶龙格-库塔法更新系统状态（控制输入在步内保持不变）
+        
+        局部截断误差 O(dt⁵)，同样精度下可用比 update（欧拉法）大得多的步长
+        
+        参数:
+            control_input: 控制输入
+            dt: 时间步长
+        
+        返回:
+            当前系统输出
+        """
+        # 对线性的 dy/dt = (u - y)/τ，RK4 一步使误差 u - y 乘以
+        # 1 - h + h²/2 - h³/6 + h⁴/24（h = dt/τ），四次函数求值合并为一个多项式
+        h = dt / self.tau
+        decay = h * (1.0 - h / 2.0 * (1.0 - h / 3.0 * (1.0 - h / 4.0)))
+        self.state += (control_input - self.state) * decay
+        self._history.append(self.state)
         return self.state
     
+    def simulate(self, control_inputs, dt):
+        """
+        按给定的整段控制输入序列连续更新系统（开环），结果与逐步调用 update
+        相同（至多相差浮点舍入误差）
+        
+        欧拉法递推 y[n+1] = a·y[n] + (dt/τ)·u[n]（a = 1 - dt/τ）是一阶线性IIR，
+        整段用 scipy.signal.lfilter 在C循环中一次算完，不再逐步回到Python
+        
+        参数:
+            control_inputs: 各步控制输入数组
+            dt: 时间步长
+        
+        返回:
+            各步更新后的系统输出数组
+        """
+        from scipy.signal import lfilter
+        
+        u = np.asarray(control_inputs, dtype=np.float64)
+        if u.size == 0:
+            return np.empty(0)
+        b = dt / self.tau
+        a = 1.0 - b
+        outputs, _ = lfilter([b], [1.0, -a], u, zi=[a * self.state])
+        
+        self.state = float(outputs[-1])
+        self._history.extend(outputs)
+        return outputs
+    
     def reset(self, initial_value=0.0):
         """重置系统状态"""
         self.state = initial_value
-        self.history = [initial_value]
+        self._history.clear()
+        self._history.append(initial_value)
 
 
 class SecondOrderSystem:
@@ -52,17 +185,30 @@ class SecondOrderSystem:
         stiffness: 刚度系数 (k)
         initial_position: 初始位置
         initial_velocity: 初始速度
+        history_dtype: 历史记录的存储精度，见 FirstOrderSystem
     """
     
     def __init__(self, mass=1.0, damping=0.5, stiffness=1.0, 
-                 initial_position=0.0, initial_velocity=0.0):
+                 initial_position=0.0, initial_velocity=0.0, history_dtype=np.float64):
         self.mass = mass
         self.damping = damping
         self.stiffness = stiffness
         
         self.position = initial_position
         self.velocity = initial_velocity
-        self.history = [initial_position]
+        # 位置历史（含初始位置），按行预分配，写满时容量翻倍
+        self._history = _HistoryArray(1, dtype=history_dtype)
+        self._history.append(initial_position)
+    
+    @property
+    def history(self):
+        """位置历史数组（含初始位置）"""
+        return self._history.values[:, 0]
+    
+    @property
+    def output(self):
+        """当前系统输出（位置）"""
+        return self.position
     
     def update(self, control_input, dt):
         """
@@ -83,14 +229,159 @@ class SecondOrderSystem:
         self.velocity += acceleration * dt
         self.position += self.velocity * dt
         
-        self.history.append(self.position)
+        self._history.append(self.position)
         return self.position
     
+    def update_rk4(self, control_input, dt):
+        """
+        用四阶龙格-库塔法更新系统状态（控制输入在步内保持不变）
+        
+        局部截断误差 O(dt⁵)，刚度较大时也能用比 update（欧拉法）大得多的步长保持稳定
+        
+        参数:
+            control_input: 控制输入
+            dt: 时间步长
+        
+        返回:
+            当前系统输出 (位置)
+        """
+        position, velocity = _second_order_rk4_step(
+            float(self.position), float(self.velocity), float(control_input), float(dt),
+            float(self.mass), float(self.damping), float(self.stiffness))
+        self.position, self.velocity = float(position), float(velocity)
+        self._history.append(self.position)
+        return self.position
+    
+    def simulate(self, control_inputs, dt):
+        """
+        按给定的整段控制输入序列连续更新系统（开环），结果与逐步调用 update 相同
+        
+        逐步递推在编译内核中完成，不再逐步回到Python
+        
+        参数:
+            control_inputs: 各步控制输入数组
+            dt: 时间步长
+        
+        返回:
+            各步更新后的系统输出（位置）数组
+        """
+        u = np.ascontiguousarray(control_inputs, dtype=np.float64)
+        outputs = np.empty(u.shape[0])
+        position, velocity = _simulate_second_order(
+            u, float(dt), float(self.mass), float(self.damping), float(self.stiffness),
+            float(self.position), float(self.velocity), outputs)
+        self.position, self.velocity = float(position), float(velocity)
+        self._history.extend(outputs)
+        return outputs
+    
     def reset(self, initial_position=0.0, initial_velocity=0.0):
         """重置系统状态"""
         self.position = initial_position
         self.velocity = initial_velocity
-        self.history = [initial_position]
+        self._history.clear()
+        self._history.append(initial_position)
+
+
+class FirstOrderSystemBank:
+    """
+    一阶系统组：M 个一阶系统同步更新
+    
+    按结构数组（SoA）存放：状态和时间常数都是长度为 M 的数组，
+    一次 step 用数组运算推进整组系统，结果与 M 个 FirstOrderSystem
+    逐个调用 update 相同。不记录历史（由调用方保存需要的量）
+    
+    参数:
+        taus: 各系统的时间常数（标量或长度为 M 的数组）
+        initial_values: 各系统的初始状态（标量或长度为 M 的数组）
+        n: 系统数量，默认由数组参数的长度决定（都是标量时为1）
+    """
+    
+    def __init__(self, taus=1.0, initial_values=0.0, n=None):
+        if n is None:
+            n = np.broadcast(taus, initial_values).size
+        self.taus = np.full(n, taus, dtype=np.float64)
+        self.states = np.full(n, initial_values, dtype=np.float64)
+    
+    @classmethod
+    def from_systems(cls, systems):
+        """由若干 FirstOrderSystem 的参数和当前状态构造系统组"""
+        return cls([system.tau for system in systems],
+                   [system.state for system in systems])
+    
+    @property
+    def output(self):
+        """各系统的当前输出（即状态）"""
+        return self.states
+    
+    def step(self, control_inputs, dt):
+        """
+        用欧拉法推进整组系统一步
+        
+        参数:
+            control_inputs: 长度为 M 的控制输入数组
+            dt: 时间步长
+        
+        返回:
+            各系统更新后的输出数组
+        """
+        self.states += (control_inputs - self.states) / self.taus * dt
+        return self.states
+
+
+class SecondOrderSystemBank:
+    """
+    二阶系统组：M 个二阶系统同步更新
+    
+    位置、速度和 m、c、k 参数都是长度为 M 的数组，一次 step 推进整组系统，
+    结果与 M 个 SecondOrderSystem 逐个调用 update 相同。不记录历史
+    
+    参数:
+        masses, damps, stiffs: 各系统的质量、阻尼系数和刚度系数（标量或长度为 M 的数组）
+        initial_positions, initial_velocities: 各系统的初始位置和速度
+        n: 系统数量，默认由数组参数的长度决定（都是标量时为1）
+    """
+    
+    def __init__(self, masses=1.0, damps=0.5, stiffs=1.0,
+                 initial_positions=0.0, initial_velocities=0.0, n=None):
+        if n is None:
+            n = np.broadcast(masses, damps, stiffs,
+                             initial_positions, initial_velocities).size
+        self.masses = np.full(n, masses, dtype=np.float64)
+        self.damps = np.full(n, damps, dtype=np.float64)
+        self.stiffs = np.full(n, stiffs, dtype=np.float64)
+        self.positions = np.full(n, initial_positions, dtype=np.float64)
+        self.velocities = np.full(n, initial_velocities, dtype=np.float64)
+    
+    @classmethod
+    def from_systems(cls, systems):
+        """由若干 SecondOrderSystem 的参数和当前状态构造系统组"""
+        return cls([system.mass for system in systems],
+                   [system.damping for system in systems],
+                   [system.stiffness for system in systems],
+                   [system.position for system in systems],
+                   [system.velocity for system in systems])
+    
+    @property
+    def output(self):
+        """各系统的当前输出（位置）"""
+        return self.positions
+    
+    def step(self, control_inputs, dt):
+        """
+        用欧拉法推进整组系统一步
+        
+        参数:
+            control_inputs: 长度为 M 的控制输入数组
+            dt: 时间步长
+        
+        返回:
+            各系统更新后的位置数组
+        """
+        acceleration = (control_inputs - self.damps * self.velocities -
+                        self.stiffs * self.positions) / self.masses
+        self.velocities += acceleration * dt
+        self.positions += self.velocities * dt
+        return self.positions
 
 
 class SystemWithNoise:
@@ -100,23 +391,92 @@ class SystemWithNoise:
     参数:
         base_system: 基础系统对象
         noise_std: 噪声标准差
+        history_dtype: 历史记录的存储精度，见 FirstOrderSystem
     """
     
-    def __init__(self, base_system, noise_std=0.0):
+    def __init__(self, base_system, noise_std=0.0, history_dtype=np.float64):
         self.base_system = base_system
         self.noise_std = noise_std
-        self.history = []
+        # 带噪声的输出历史
+        self._history = _HistoryArray(1, dtype=history_dtype)
+        # prebake_noise 预先生成的噪声序列及读取位置
+        self._noise = None
+        self._noise_index = 0
+    
+    @property
+    def history(self):
+        """带噪声的输出历史数组"""
+        return self._history.values[:, 0]
+    
+    @property
+    def output(self):
+        """基础系统的当前输出（不含噪声，噪声只叠加在 update 的返回值上）"""
+        return self.base_system.output
+    
+    def prebake_noise(self, n_steps, rng=None):
+        """
+        一次生成之后 n_steps 步的噪声，update 按顺序取用，省去逐步调用随机数生成器
+        
+        参数:
+            n_steps: 预计的更新步数，用完后 update 恢复逐步采样
+            rng: 可选的 np.random.Generator；默认使用全局随机数生成器，
+                 与逐步采样得到的序列相同（np.random.seed 后结果可复现）
+        """
+        if rng is None:
+            self._noise = np.random.normal(0, self.noise_std, n_steps)
+        else:
+            self._noise = rng.normal(0, self.noise_std, n_steps)
+        self._noise_index = 0
     
     def update(self, control_input, dt):
         """更新系统并添加噪声"""
         clean_output = self.base_system.update(control_input, dt)
-        noise = np.random.normal(0, self.noise_std)
+        if self._noise is not None and self._noise_index < len(self._noise):
+            noise = self._noise[self._noise_index]
+            self._noise_index += 1
+        else:
+            noise = np.random.normal(0, self.noise_std)
         noisy_output = clean_output + noise
-        self.history.append(noisy_output)
+        self._history.append(noisy_output)
         return noisy_output
     
+    def simulate(self, control_inputs, dt, rng=None):
+        """
+        按整段控制输入序列连续更新系统（开环），整段噪声一次生成后逐元素叠加
+        
+        基础系统需提供 simulate 方法。先取用 prebake_noise 剩余的噪声，
+        不足部分再一次生成，与逐步调用 update 得到的噪声序列相同
+        
+        参数:
+            control_inputs: 各步控制输入数组
+            dt: 时间步长
+            rng: 可选的 np.random.Generator，默认使用全局随机数生成器
+        
+        返回:
+            各步带噪声的系统输出数组
+        """
+        clean_outputs = self.base_system.simulate(control_inputs, dt)
+        n = len(clean_outputs)
+        
+        noise = np.empty(n)
+        taken = 0
+        if self._noise is not None:
+            taken = min(n, len(self._noise) - self._noise_index)
+            noise[:taken] = self._noise[self._noise_index:self._noise_index + taken]
+            self._noise_index += taken
+        if taken < n:
+            if rng is None:
+                noise[taken:] = np.random.normal(0, self.noise_std, n - taken)
+            else:
+                noise[taken:] = rng.normal(0, self.noise_std, n - taken)
+        
+        noisy_outputs = clean_outputs + noise
+        self._history.extend(noisy_outputs)
+        return noisy_outputs
+    
     def reset(self, *args, **kwargs):
         """重置系统"""
         self.base_system.reset(*args, **kwargs)
-        self.history = []
+        self._history.clear()
+        self._noise = None
 
@@ -4,19 +4,24 @@ Generate figures for control engineering documentation
 """
 
 import numpy as np
-import matplotlib
-matplotlib.use('Agg')  # 使用非交互式后端，减少警告
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-from matplotlib.patches import FancyArrowPatch
 import os
+import io
 import sys
+import contextlib
+import functools
+import hashlib
+import inspect
+import multiprocessing
 import warnings
 import logging
 
+try:
+    import numexpr as ne  # 可选依赖，用于融合计算阶跃响应解析式
+except ImportError:
+    ne = None
+
 # 设置UTF-8编码输出
 if sys.platform == 'win32' and not hasattr(sys.stdout, '_wrapped'):
-    import io
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     sys.stdout._wrapped = True
 
@@ -25,12 +30,11 @@ warnings.filterwarnings('ignore')
 logging.getLogger('matplotlib').setLevel(logging.ERROR)
 logging.getLogger('matplotlib.font_manager').setLevel(logging.ERROR)
 
-# 设置中文字体 - 多种备选方案
-import matplotlib.font_manager as fm
-
 # 尝试查找可用的中文字体
 def find_chinese_font():
     """查找系统中可用的中文字体"""
+    import matplotlib.font_manager as fm
+    
     chinese_fonts = [
         'SimHei',           # 黑体
         'Microsoft YaHei',  # 微软雅黑
@@ -44,7 +48,8 @@ def find_chinese_font():
         'Heiti SC',         # 黑体-简 (Mac)
     ]
     
-    available_fonts = [f.name for f in fm.fontManager.ttflist]
+    # 字体名集合只构建一次，之后每个候选字体的查找为 O(1)
+    available_fonts = frozenset(f.name for f in fm.fontManager.ttflist)
     
     for font in chinese_fonts:
         if font in available_fonts:
@@ -54,75 +59,174 @@ def find_chinese_font():
     print("警告: 未找到中文字体，将使用默认字体（可能无法正常显示中文）")
     return None
 
-# 配置字体
-chinese_font = find_chinese_font()
-if chinese_font:
-    plt.rcParams['font.sans-serif'] = [chinese_font, 'DejaVu Sans']
-else:
-    plt.rcParams['font.sans-serif'] = ['DejaVu Sans']
-
-plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
-plt.rcParams['font.size'] = 10
-
-# 禁用matplotlib的详细日志输出
-import matplotlib
-matplotlib.set_loglevel("ERROR")
+@functools.lru_cache(maxsize=1)
+def _pyplot():
+    """
+    导入并配置 matplotlib，返回 pyplot
+    
+    matplotlib 的导入和中文字体查找只在第一次生成图表时进行，
+    只导入本模块（如读取 output_dir、计算响应数据）时不付出这部分开销
+    """
+    import matplotlib
+    matplotlib.use('Agg')  # 使用非交互式后端，减少警告
+    import matplotlib.pyplot as plt
+    
+    # 禁用matplotlib的详细日志输出
+    matplotlib.set_loglevel("ERROR")
+    
+    # 配置字体
+    chinese_font = find_chinese_font()
+    if chinese_font:
+        plt.rcParams['font.sans-serif'] = [chinese_font, 'DejaVu Sans']
+    else:
+        plt.rcParams['font.sans-serif'] = ['DejaVu Sans']
+    
+    plt.rcParams['axes.unicode_minus'] = False  # 解决负号显示问题
+    plt.rcParams['font.size'] = 10
+    return plt
 
 # 确保输出目录存在
 output_dir = os.path.join(os.path.dirname(__file__), 'figures')
 os.makedirs(output_dir, exist_ok=True)
 
+# 图片分辨率：默认 150 dpi，文档中在屏幕上查看已足够；需要印刷质量时设置环境变量 FIG_DPI=300
+DPI = int(os.environ.get('FIG_DPI', '150'))
+
 
-def generate_time_domain_response():
+# 阶跃响应的缓存量：曲线数组和图中标注的各项指标
+_TIME_DOMAIN_KEYS = ('t', 'y', 'wn', 'zeta', 'y_final', 'tolerance', 't_peak', 'y_peak',
+                     'overshoot', 't_rise', 't_10', 't_90', 't_settle', 't_delay')
+
+
+def _compute_time_domain_response(n_points):
     """
-    生成时域响应性能指标示意图
-    包含：上升时间、超调量、调节时间、稳态误差等
+    计算典型二阶欠阻尼系统的阶跃响应曲线及其性能指标
+    
+    参数:
+        n_points: 时间轴采样点数
+    
+    返回:
+        以 _TIME_DOMAIN_KEYS 为键的字典
     """
     # 创建典型二阶欠阻尼系统的阶跃响应
-    t = np.linspace(0, 10, 1000)
+    t = np.linspace(0, 10, n_points)
     
     # 系统参数
     wn = 2.0  # 自然频率
     zeta = 0.3  # 阻尼比 (欠阻尼)
     
-    # 二阶系统阶跃响应解析解
+    # 二阶系统阶跃响应解析解 y = 1 - e^(-ζωn·t)·(cos(ωd·t) + k·sin(ωd·t))
     wd = wn * np.sqrt(1 - zeta**2)  # 阻尼自然频率
-    y = 1 - np.exp(-zeta * wn * t) * (np.cos(wd * t) + (zeta / np.sqrt(1 - zeta**2)) * np.sin(wd * t))
+    k = zeta / np.sqrt(1 - zeta**2)
+    if ne is not None:
+        # numexpr 分块融合整条表达式，不产生完整长度的中间数组
+        y = ne.evaluate('1 - exp(-zw * t) * (cos(wd * t) + k * sin(wd * t))',
+                        local_dict={'zw': zeta * wn, 't': t, 'wd': wd, 'k': k})
+    else:
+        # 在两个缓冲区上原地计算，不为每个中间结果分配新数组
+        work = np.multiply(wd, t)
+        y = np.sin(work)
+        y *= k
+        y += np.cos(work, out=work)
+        np.multiply(-zeta * wn, t, out=work)
+        y *= np.exp(work, out=work)
+        np.subtract(1, y, out=y)
     
     # 平滑处理，避免震荡
-    y = np.clip(y, 0, None)
+    np.clip(y, 0, None, out=y)
     
     # 找到关键点
     y_final = 1.0  # 稳态值
     
-    # 上升时间 (10% 到 90%)
-    idx_10 = np.where(y >= 0.1)[0][0]
-    idx_90 = np.where(y >= 0.9)[0][0]
-    t_rise = t[idx_90] - t[idx_10]
-    t_10 = t[idx_10]
-    t_90 = t[idx_90]
-    
     # 峰值时间和超调量
     idx_peak = np.argmax(y)
     t_peak = t[idx_peak]
     y_peak = y[idx_peak]
     overshoot = (y_peak - y_final) / y_final * 100
     
-    # 调节时间 (2% 误差带)
+    # 欠阻尼阶跃响应在第一个峰值之前单调上升，首次越过 10%、50%、90%
+    # 的位置在这段前缀上一次二分查找得到
+    idx_10, idx_50, idx_90 = np.searchsorted(y[:idx_peak + 1], (0.1, 0.5, 0.9))
+    
+    # 上升时间 (10% 到 90%)
+    t_rise = t[idx_90] - t[idx_10]
+    t_10 = t[idx_10]
+    t_90 = t[idx_90]
+    
+    # 调节时间 (2% 误差带)：最后一次超出误差带之后的时刻
     tolerance = 0.02
-    settled = False
-    for i in range(len(y) - 1, 0, -1):
-        if abs(y[i] - y_final) > tolerance * y_final:
-            t_settle = t[i + 1]
-            settled = True
-            break
-    if not settled:
+    outside = np.flatnonzero(np.abs(y[1:] - y_final) > tolerance * y_final)
+    if outside.size:
+        t_settle = t[min(outside[-1] + 2, len(t) - 1)]
+    else:
         t_settle = t[-1]
     
     # 延迟时间 (50%)
-    idx_50 = np.where(y >= 0.5)[0][0]
     t_delay = t[idx_50]
     
+    return dict(t=t, y=y, wn=wn, zeta=zeta, y_final=y_final, tolerance=tolerance,
+                t_peak=t_peak, y_peak=y_peak, overshoot=overshoot,
+                t_rise=t_rise, t_10=t_10, t_90=t_90, t_settle=t_settle, t_delay=t_delay)
+
+
+def _load_time_domain_response(n_points):
+    """
+    读取缓存的阶跃响应数据，缓存缺失或已过期时重新计算并写入
+    
+    缓存文件 figures/.cache/time_domain.npz 中保存计算函数源码、采样点数
+    和计算后端的摘要，三者之一改变即视为过期
+    
+    参数:
+        n_points: 时间轴采样点数
+    
+    返回:
+        以 _TIME_DOMAIN_KEYS 为键的字典，标量指标为 Python 浮点数
+    """
+    source = inspect.getsource(_compute_time_domain_response)
+    stamp = hashlib.sha256(
+        f'{source}|{n_points}|{ne is not None}'.encode('utf-8')).hexdigest()
+    cache_dir = os.path.join(output_dir, '.cache')
+    cache_path = os.path.join(cache_dir, 'time_domain.npz')
+    
+    data = None
+    try:
+        with np.load(cache_path) as cached:
+            if str(cached['stamp']) == stamp:
+                data = {key: cached[key] for key in _TIME_DOMAIN_KEYS}
+    except (OSError, KeyError, ValueError):
+        pass  # 缓存不存在或已损坏，重新计算
+    
+    if data is None:
+        data = _compute_time_domain_response(n_points)
+        os.makedirs(cache_dir, exist_ok=True)
+        # 先写临时文件再替换，中断时不会留下不完整的缓存
+        tmp_path = cache_path + '.tmp.npz'
+        np.savez(tmp_path, stamp=stamp, **data)
+        os.replace(tmp_path, cache_path)
+    
+    for key in _TIME_DOMAIN_KEYS[2:]:
+        data[key] = float(data[key])
+    return data
+
+
+def generate_time_domain_response(n_points=1000):
+    """
+    生成时域响应性能指标示意图
+    包含：上升时间、超调量、调节时间、稳态误差等
+    
+    参数:
+        n_points: 时间轴采样点数。曲线本身几百个点即可画得光滑，
+                  但图中标注的各项指标在该网格上取值，点数越少精度越低
+    """
+    data = _load_time_domain_response(n_points)
+    t, y = data['t'], data['y']
+    (wn, zeta, y_final, tolerance, t_peak, y_peak, overshoot,
+     t_rise, t_10, t_90, t_settle, t_delay) = (data[key] for key in _TIME_DOMAIN_KEYS[2:])
+    
+    plt = _pyplot()
+    from matplotlib.collections import LineCollection
+    from matplotlib.colors import to_rgba
+    
     # 创建图形 - 调整大小和边距
     fig, ax = plt.subplots(figsize=(16, 9))
     
@@ -136,10 +240,15 @@ def generate_time_domain_response():
     # 绘制阶跃输入 (参考)
     ax.axhline(y=0, color='gray', linestyle='-', linewidth=0.8, alpha=0.5)
     
+    # 各指标的辅助虚线和特征点先收集起来，最后分别用一个 LineCollection
+    # 和一次 scatter 绘制，减少艺术家对象的数量
+    guides = []   # (线段, 颜色, 透明度, 线宽)
+    points = []   # (x, y, 颜色, 标记大小)
+    
     # ==================== 1. 延迟时间 ====================
-    ax.plot([0, t_delay], [0.5, 0.5], 'r--', linewidth=1.5, alpha=0.6)
-    ax.plot([t_delay, t_delay], [0, 0.5], 'r--', linewidth=1.5, alpha=0.6)
-    ax.plot(t_delay, 0.5, 'ro', markersize=9, zorder=15)
+    guides.append((((0, 0.5), (t_delay, 0.5)), 'r', 0.6, 1.5))
+    guides.append((((t_delay, 0), (t_delay, 0.5)), 'r', 0.6, 1.5))
+    points.append((t_delay, 0.5, 'r', 9))
     ax.annotate('延迟时间 td\n(到达50%稳态值)', 
                 xy=(t_delay, 0.5), xytext=(t_delay - 0.8, 0.25),
                 fontsize=11, color='red', fontweight='bold',
@@ -147,11 +256,11 @@ def generate_time_domain_response():
                 arrowprops=dict(arrowstyle='->', color='red', lw=2.5))
     
     # ==================== 2. 上升时间 ====================
-    ax.plot([t_10, t_90], [0.1, 0.1], 'g--', linewidth=1.5, alpha=0.6)
-    ax.plot([t_10, t_10], [0, 0.1], 'g--', linewidth=1.5, alpha=0.6)
-    ax.plot([t_90, t_90], [0, 0.9], 'g--', linewidth=1.5, alpha=0.6)
-    ax.plot(t_10, 0.1, 'go', markersize=8, zorder=15)
-    ax.plot(t_90, 0.9, 'go', markersize=8, zorder=15)
+    guides.append((((t_10, 0.1), (t_90, 0.1)), 'g', 0.6, 1.5))
+    guides.append((((t_10, 0), (t_10, 0.1)), 'g', 0.6, 1.5))
+    guides.append((((t_90, 0), (t_90, 0.9)), 'g', 0.6, 1.5))
+    points.append((t_10, 0.1, 'g', 8))
+    points.append((t_90, 0.9, 'g', 8))
     
     # 上升时间标注 - 调整位置避免遮挡
     ax.annotate('', xy=(t_90, 0.05), xytext=(t_10, 0.05),
@@ -165,9 +274,9 @@ def generate_time_domain_response():
     ax.text(t_90 - 0.3, 0.9, '90%', fontsize=9, ha='right', color='green')
     
     # ==================== 3. 峰值时间和超调量 ====================
-    ax.plot([0, t_peak], [y_peak, y_peak], 'm--', linewidth=1.5, alpha=0.6)
-    ax.plot([t_peak, t_peak], [0, y_peak], 'm--', linewidth=1.5, alpha=0.6)
-    ax.plot(t_peak, y_peak, 'mo', markersize=10, zorder=15)
+    guides.append((((0, y_peak), (t_peak, y_peak)), 'm', 0.6, 1.5))
+    guides.append((((t_peak, 0), (t_peak, y_peak)), 'm', 0.6, 1.5))
+    points.append((t_peak, y_peak, 'm', 10))
     
     # 超调量标注 - 右侧标注
     ax.annotate('', xy=(t_peak + 0.3, y_final), xytext=(t_peak + 0.3, y_peak),
@@ -193,8 +302,8 @@ def generate_time_domain_response():
     ax.axhline(y=y_final * (1 - tolerance), color='cyan', linestyle=':', 
                linewidth=1.5, alpha=0.7)
     
-    ax.plot([t_settle, t_settle], [0, y_final], 'c--', linewidth=2, alpha=0.8)
-    ax.plot(t_settle, y_final, 'co', markersize=10, zorder=15)
+    guides.append((((t_settle, 0), (t_settle, y_final)), 'c', 0.8, 2))
+    points.append((t_settle, y_final, 'c', 10))
     
     ax.annotate(f'调节时间 ts = {t_settle:.2f}s\n(进入±2%误差带)', 
                 xy=(t_settle, y_final), xytext=(t_settle - 2.0, y_final + 0.25),
@@ -208,6 +317,13 @@ def generate_time_domain_response():
     ax.text(t[-1] - 0.5, y_final * (1 - tolerance) - 0.02, '-2%', 
             fontsize=9, ha='right', color='cyan')
     
+    segments, colors, alphas, widths = zip(*guides)
+    ax.add_collection(LineCollection(
+        segments, colors=[to_rgba(c, a) for c, a in zip(colors, alphas)],
+        linewidths=widths, linestyles='--'))
+    xs, ys, point_colors, sizes = zip(*points)
+    ax.scatter(xs, ys, c=point_colors, s=np.square(sizes), linewidths=1.0, zorder=15)
+    
     # ==================== 5. 稳态误差 ====================
     y_actual_final = y[-1]
     if abs(y_actual_final - y_final) > 0.001:
@@ -249,15 +365,29 @@ def generate_time_domain_response():
     
     plt.tight_layout()
     output_path = os.path.join(output_dir, '时域响应性能指标.png')
-    plt.savefig(output_path, dpi=300, bbox_inches='tight', facecolor='white')
+    plt.savefig(output_path, dpi=DPI, bbox_inches='tight', facecolor='white')
     print(f"[OK] 已生成: {output_path}")
     plt.close()
 
 
+def _box(ax, x, y, text, facecolor='lightblue', pad=0.3):
+    """在 (x, y) 处绘制框图中的一个圆角方框"""
+    return ax.text(x, y, text, ha='center', va='center', fontsize=11, fontweight='bold',
+                   bbox=dict(boxstyle=f'round,pad={pad}', facecolor=facecolor,
+                             edgecolor='black', linewidth=2))
+
+
+def _arrow(ax, start, end, color='black'):
+    """绘制框图中从 start 指向 end 的信号箭头"""
+    return ax.annotate('', xy=end, xytext=start,
+                       arrowprops=dict(arrowstyle='->', lw=2.5, color=color))
+
+
 def generate_control_system_block_diagram():
     """
     生成控制系统框图
     """
+    plt = _pyplot()
     fig, ax = plt.subplots(figsize=(14, 8))
     ax.set_xlim(0, 10)
     ax.set_ylim(0, 6)
@@ -279,14 +409,8 @@ def generate_control_system_block_diagram():
     y_feedback = 2
     
     # 绘制方框
-    box_style = dict(boxstyle='round,pad=0.3', facecolor='lightblue', 
-                     edgecolor='black', linewidth=2)
-    
     # 设定值
-    ax.text(x_positions['setpoint'], y_main, '设定值\nSetpoint\n$r(t)$', 
-            ha='center', va='center', fontsize=11, fontweight='bold',
-            bbox=dict(boxstyle='round,pad=0.5', facecolor='lightgreen', 
-                     edgecolor='black', linewidth=2))
+    _box(ax, x_positions['setpoint'], y_main, '设定值\nSetpoint\n$r(t)$', 'lightgreen', pad=0.5)
     
     # 比较器
     circle = plt.Circle((x_positions['comparator'], y_main), 0.25, 
@@ -302,79 +426,46 @@ def generate_control_system_block_diagram():
             ha='center', fontsize=9, style='italic')
     
     # 控制器
-    ax.text(x_positions['controller'], y_main, '控制器\nController\nPID/MPC', 
-            ha='center', va='center', fontsize=11, fontweight='bold',
-            bbox=box_style)
+    _box(ax, x_positions['controller'], y_main, '控制器\nController\nPID/MPC')
     
     # 执行器
-    ax.text(x_positions['actuator'], y_main, '执行器\nActuator', 
-            ha='center', va='center', fontsize=11, fontweight='bold',
-            bbox=box_style)
+    _box(ax, x_positions['actuator'], y_main, '执行器\nActuator')
     
     # 被控对象
-    ax.text(x_positions['plant'], y_main, '被控对象\nPlant/Process', 
-            ha='center', va='center', fontsize=11, fontweight='bold',
-            bbox=dict(boxstyle='round,pad=0.3', facecolor='lightyellow', 
-                     edgecolor='black', linewidth=2))
+    _box(ax, x_positions['plant'], y_main, '被控对象\nPlant/Process', 'lightyellow')
     
     # 输出
-    ax.text(x_positions['output'], y_main, '输出\nOutput\n$y(t)$', 
-            ha='center', va='center', fontsize=11, fontweight='bold',
-            bbox=dict(boxstyle='round,pad=0.5', facecolor='lightcoral', 
-                     edgecolor='black', linewidth=2))
+    _box(ax, x_positions['output'], y_main, '输出\nOutput\n$y(t)$', 'lightcoral', pad=0.5)
     
     # 传感器
-    ax.text(x_positions['sensor'], y_feedback, '传感器\nSensor', 
-            ha='center', va='center', fontsize=11, fontweight='bold',
-            bbox=dict(boxstyle='round,pad=0.3', facecolor='lightcyan', 
-                     edgecolor='black', linewidth=2))
+    _box(ax, x_positions['sensor'], y_feedback, '传感器\nSensor', 'lightcyan')
     
     # 绘制箭头
-    arrow_style = dict(arrowstyle='->', lw=2.5, color='black')
-    
     # 前向路径
-    ax.annotate('', xy=(x_positions['comparator'] - 0.3, y_main), 
-                xytext=(x_positions['setpoint'] + 0.4, y_main),
-                arrowprops=arrow_style)
+    _arrow(ax, (x_positions['setpoint'] + 0.4, y_main), (x_positions['comparator'] - 0.3, y_main))
     
-    ax.annotate('', xy=(x_positions['controller'] - 0.5, y_main), 
-                xytext=(x_positions['comparator'] + 0.3, y_main),
-                arrowprops=arrow_style)
+    _arrow(ax, (x_positions['comparator'] + 0.3, y_main), (x_positions['controller'] - 0.5, y_main))
     ax.text((x_positions['comparator'] + x_positions['controller']) / 2, 
             y_main + 0.3, '误差 $e(t)$', ha='center', fontsize=10, 
             color='blue', fontweight='bold')
     
-    ax.annotate('', xy=(x_positions['actuator'] - 0.5, y_main), 
-                xytext=(x_positions['controller'] + 0.5, y_main),
-                arrowprops=arrow_style)
+    _arrow(ax, (x_positions['controller'] + 0.5, y_main), (x_positions['actuator'] - 0.5, y_main))
     ax.text((x_positions['controller'] + x_positions['actuator']) / 2, 
             y_main + 0.3, '控制信号 $u(t)$', ha='center', fontsize=10, 
             color='blue', fontweight='bold')
     
-    ax.annotate('', xy=(x_positions['plant'] - 0.5, y_main), 
-                xytext=(x_positions['actuator'] + 0.5, y_main),
-                arrowprops=arrow_style)
+    _arrow(ax, (x_positions['actuator'] + 0.5, y_main), (x_positions['plant'] - 0.5, y_main))
     
-    ax.annotate('', xy=(x_positions['output'] - 0.4, y_main), 
-                xytext=(x_positions['plant'] + 0.5, y_main),
-                arrowprops=arrow_style)
+    _arrow(ax, (x_positions['plant'] + 0.5, y_main), (x_positions['output'] - 0.4, y_main))
     
     # 反馈路径
-    ax.annotate('', xy=(x_positions['sensor'], y_main - 0.5), 
-                xytext=(x_positions['output'] - 0.2, y_main - 0.3),
-                arrowprops=dict(arrowstyle='->', lw=2.5, color='red'))
+    _arrow(ax, (x_positions['output'] - 0.2, y_main - 0.3), (x_positions['sensor'], y_main - 0.5), color='red')
     
-    ax.annotate('', xy=(x_positions['sensor'], y_feedback + 0.5), 
-                xytext=(x_positions['sensor'], y_main - 0.5),
-                arrowprops=dict(arrowstyle='->', lw=2.5, color='red'))
+    _arrow(ax, (x_positions['sensor'], y_main - 0.5), (x_positions['sensor'], y_feedback + 0.5), color='red')
     
-    ax.annotate('', xy=(x_positions['comparator'], y_feedback), 
-                xytext=(x_positions['sensor'] - 0.5, y_feedback),
-                arrowprops=dict(arrowstyle='->', lw=2.5, color='red'))
+    _arrow(ax, (x_positions['sensor'] - 0.5, y_feedback), (x_positions['comparator'], y_feedback), color='red')
     
-    ax.annotate('', xy=(x_positions['comparator'], y_main - 0.3), 
-                xytext=(x_positions['comparator'], y_feedback + 0.3),
-                arrowprops=dict(arrowstyle='->', lw=2.5, color='red'))
+    _arrow(ax, (x_positions['comparator'], y_feedback + 0.3), (x_positions['comparator'], y_main - 0.3), color='red')
     ax.text(x_positions['comparator'] - 0.6, (y_main + y_feedback) / 2, 
             '反馈信号\n$y_m(t)$', ha='center', fontsize=10, 
             color='red', fontweight='bold')
@@ -400,7 +491,7 @@ def generate_control_system_block_diagram():
     
     plt.tight_layout()
     output_path = os.path.join(output_dir, '控制系统框图.png')
-    plt.savefig(output_path, dpi=300, bbox_inches='tight', facecolor='white')
+    plt.savefig(output_path, dpi=DPI, bbox_inches='tight', facecolor='white')
     print(f"[OK] 已生成: {output_path}")
     plt.close()
 
@@ -409,6 +500,8 @@ def generate_open_vs_closed_loop():
     """
     生成开环vs闭环对比示意图
     """
+    plt = _pyplot()
+    
     # 调整图形大小，让两个子图更紧凑
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(15, 9))
     
@@ -417,36 +510,20 @@ def generate_open_vs_closed_loop():
     ax1.set_ylim(0.5, 3.2)  # 缩小Y轴范围，避免太空
     ax1.axis('off')
     
-    box_style = dict(boxstyle='round,pad=0.3', facecolor='lightblue', 
-                     edgecolor='black', linewidth=2)
-    
     # 开环系统方框
-    ax1.text(1.5, 1.5, '输入\nInput', ha='center', va='center', 
-            fontsize=11, fontweight='bold',
-            bbox=dict(boxstyle='round,pad=0.4', facecolor='lightgreen', 
-                     edgecolor='black', linewidth=2))
+    _box(ax1, 1.5, 1.5, '输入\nInput', 'lightgreen', pad=0.4)
     
-    ax1.text(3.5, 1.5, '控制器\nController', ha='center', va='center', 
-            fontsize=11, fontweight='bold', bbox=box_style)
+    _box(ax1, 3.5, 1.5, '控制器\nController')
     
-    ax1.text(5.5, 1.5, '执行器\nActuator', ha='center', va='center', 
-            fontsize=11, fontweight='bold', bbox=box_style)
+    _box(ax1, 5.5, 1.5, '执行器\nActuator')
     
-    ax1.text(7.5, 1.5, '被控对象\nPlant', ha='center', va='center', 
-            fontsize=11, fontweight='bold',
-            bbox=dict(boxstyle='round,pad=0.3', facecolor='lightyellow', 
-                     edgecolor='black', linewidth=2))
+    _box(ax1, 7.5, 1.5, '被控对象\nPlant', 'lightyellow')
     
-    ax1.text(9, 1.5, '输出\nOutput', ha='center', va='center', 
-            fontsize=11, fontweight='bold',
-            bbox=dict(boxstyle='round,pad=0.4', facecolor='lightcoral', 
-                     edgecolor='black', linewidth=2))
+    _box(ax1, 9, 1.5, '输出\nOutput', 'lightcoral', pad=0.4)
     
     # 开环箭头
-    arrow_style = dict(arrowstyle='->', lw=2.5, color='black')
     for x_from, x_to in [(2, 3), (4, 5), (6, 7), (8, 8.7)]:
-        ax1.annotate('', xy=(x_to, 1.5), xytext=(x_from, 1.5),
-                    arrowprops=arrow_style)
+        _arrow(ax1, (x_from, 1.5), (x_to, 1.5))
     
     # 干扰 - 调整位置
     ax1.annotate('干扰\nDisturbance', xy=(7.5, 2.0), xytext=(7.5, 2.5),
@@ -484,10 +561,7 @@ def generate_open_vs_closed_loop():
     y_feedback = 1.2
     
     # 闭环系统方框
-    ax2.text(1.5, y_main, '设定值\nSetpoint', ha='center', va='center', 
-            fontsize=11, fontweight='bold',
-            bbox=dict(boxstyle='round,pad=0.4', facecolor='lightgreen', 
-                     edgecolor='black', linewidth=2))
+    _box(ax2, 1.5, y_main, '设定值\nSetpoint', 'lightgreen', pad=0.4)
     
     # 比较器
     circle = plt.Circle((2.5, y_main), 0.2, facecolor='white', 
@@ -497,41 +571,25 @@ def generate_open_vs_closed_loop():
             fontsize=14, fontweight='bold')
     ax2.text(2.5, y_main - 0.45, '比较器', ha='center', fontsize=8)
     
-    ax2.text(4, y_main, '控制器\nController', ha='center', va='center', 
-            fontsize=11, fontweight='bold', bbox=box_style)
+    _box(ax2, 4, y_main, '控制器\nController')
     
-    ax2.text(5.5, y_main, '执行器\nActuator', ha='center', va='center', 
-            fontsize=11, fontweight='bold', bbox=box_style)
+    _box(ax2, 5.5, y_main, '执行器\nActuator')
     
-    ax2.text(7, y_main, '被控对象\nPlant', ha='center', va='center', 
-            fontsize=11, fontweight='bold',
-            bbox=dict(boxstyle='round,pad=0.3', facecolor='lightyellow', 
-                     edgecolor='black', linewidth=2))
+    _box(ax2, 7, y_main, '被控对象\nPlant', 'lightyellow')
     
-    ax2.text(8.5, y_main, '输出\nOutput', ha='center', va='center', 
-            fontsize=11, fontweight='bold',
-            bbox=dict(boxstyle='round,pad=0.4', facecolor='lightcoral', 
-                     edgecolor='black', linewidth=2))
+    _box(ax2, 8.5, y_main, '输出\nOutput', 'lightcoral', pad=0.4)
     
-    ax2.text(7, y_feedback, '传感器\nSensor', ha='center', va='center', 
-            fontsize=11, fontweight='bold',
-            bbox=dict(boxstyle='round,pad=0.3', facecolor='lightcyan', 
-                     edgecolor='black', linewidth=2))
+    _box(ax2, 7, y_feedback, '传感器\nSensor', 'lightcyan')
     
     # 前向箭头
     for x_from, x_to in [(1.8, 2.3), (2.7, 3.5), (4.5, 5), (6, 6.5), (7.5, 8.2)]:
-        ax2.annotate('', xy=(x_to, y_main), xytext=(x_from, y_main),
-                    arrowprops=arrow_style)
+        _arrow(ax2, (x_from, y_main), (x_to, y_main))
     
     # 反馈箭头
-    ax2.annotate('', xy=(7, y_main - 0.4), xytext=(8.3, y_main - 0.3),
-                arrowprops=dict(arrowstyle='->', lw=2.5, color='red'))
-    ax2.annotate('', xy=(7, y_feedback + 0.4), xytext=(7, y_main - 0.4),
-                arrowprops=dict(arrowstyle='->', lw=2.5, color='red'))
-    ax2.annotate('', xy=(2.5, y_feedback), xytext=(6.5, y_feedback),
-                arrowprops=dict(arrowstyle='->', lw=2.5, color='red'))
-    ax2.annotate('', xy=(2.5, y_main - 0.25), xytext=(2.5, y_feedback + 0.25),
-                arrowprops=dict(arrowstyle='->', lw=2.5, color='red'))
+    _arrow(ax2, (8.3, y_main - 0.3), (7, y_main - 0.4), color='red')
+    _arrow(ax2, (7, y_main - 0.4), (7, y_feedback + 0.4), color='red')
+    _arrow(ax2, (6.5, y_feedback), (2.5, y_feedback), color='red')
+    _arrow(ax2, (2.5, y_feedback + 0.25), (2.5, y_main - 0.25), color='red')
     
     ax2.text(5, y_feedback - 0.3, '反馈路径 (Feedback Path)', 
             ha='center', fontsize=10, color='red', fontweight='bold',
@@ -568,20 +626,54 @@ def generate_open_vs_closed_loop():
     
     plt.tight_layout()
     output_path = os.path.join(output_dir, '开环vs闭环控制.png')
-    plt.savefig(output_path, dpi=300, bbox_inches='tight', facecolor='white')
+    plt.savefig(output_path, dpi=DPI, bbox_inches='tight', facecolor='white')
     print(f"[OK] 已生成: {output_path}")
     plt.close()
 
 
+def _generate(name):
+    """
+    在工作进程中生成一张图（模块级函数，可被 pickle）
+    
+    返回其打印输出，由主进程按顺序打印，避免多进程输出交错
+    """
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        globals()[name]()
+    return buffer.getvalue()
+
+
+def generate_all(processes=None):
+    """
+    生成全部示意图
+    
+    参数:
+        processes: 并行绘图的进程数，默认取 CPU 核数与图数的较小值；
+                   设为1时在当前进程中顺序生成。各图互不依赖，分别保存
+    """
+    names = ['generate_time_domain_response',
+             'generate_control_system_block_diagram',
+             'generate_open_vs_closed_loop']
+    if processes is None:
+        processes = min(os.cpu_count() or 1, len(names))
+    if processes > 1:
+        # 先在主进程中完成 matplotlib 的导入和字体配置，工作进程直接继承
+        _pyplot()
+        with multiprocessing.Pool(processes=processes) as pool:
+            for log in pool.map(_generate, names):
+                print(log, end='')
+    else:
+        for name in names:
+            globals()[name]()
+
+
 if __name__ == "__main__":
     print("=" * 60)
     print("生成控制工程文档示意图")
     print("=" * 60)
     
     print("\n正在生成图表...")
-    generate_time_domain_response()
-    generate_control_system_block_diagram()
-    generate_open_vs_closed_loop()
+    generate_all()
     
     print("\n" + "=" * 60)
     print("所有图表已生成完成！")
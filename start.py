@@ -8,129 +8,193 @@ Quick Start Script
   python start.py              # 显示菜单
   python start.py demo         # 运行快速演示
   python start.py all          # 运行所有实验
+  python start.py all -j 2     # 用2个进程并行运行所有实验
   python start.py exp1         # 运行实验1
   python start.py exp2         # 运行实验2
   python start.py exp3         # 运行实验3
   python start.py exp4         # 运行实验4
+  python start.py warmup       # 预编译各实验模块，加快之后的启动
 """
 
 import sys
 import os
+import traceback
 
-# 设置UTF-8编码输出
-if sys.platform == 'win32':
-    import io
-    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+_PID_PATH = os.path.join(_ROOT, 'PIDController')
+_MPC_PATH = os.path.join(_ROOT, 'MPCController')
 
-# 添加PIDController到路径
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'PIDController'))
+# 常见数值库线程池的线程数环境变量
+_THREAD_VARS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS')
+
+
+def _utf8_stdout():
+    """
+    设置UTF-8编码输出（Windows 控制台默认编码无法输出中文和表情符号）
+    
+    只在运行实验的命令中调用；菜单直接写出预先编码的UTF-8字节，不经过它
+    """
+    if sys.platform == 'win32':
+        import io
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+
+def _ensure_env(mpc=False):
+    """
+    把实验代码目录加入模块搜索路径（重复调用不会重复插入）
+    
+    只在真正运行实验的命令中调用，显示菜单时不做任何路径设置
+    
+    参数:
+        mpc: 是否同时加入 MPCController 目录
+    """
+    for path in (_PID_PATH, _MPC_PATH) if mpc else (_PID_PATH,):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+
+_BAR = "=" * 70
+
+# 菜单文本在导入时拼好，show_menu 一次写出
+_MENU = "\n".join([
+    _BAR,
+    "🎯 PID控制器实验 - 快速启动",
+    "🎯 PID Controller Experiments - Quick Start",
+    _BAR,
+    "\n可用命令 Available Commands:",
+    "  python start.py demo     # 运行快速演示 (Quick Demo)",
+    "  python start.py all      # 运行所有实验 (All Experiments)",
+    "  python start.py all -j N # 用N个进程并行运行 (N parallel processes)",
+    "  python start.py exp1     # 实验1: Kp参数影响",
+    "  python start.py exp2     # 实验2: Ki参数影响",
+    "  python start.py exp3     # 实验3: Kd参数影响",
+    "  python start.py exp4     # 实验4: PID综合调节",
+    "  python start.py cartpole # 实验5: CartPole倒立摆 (PID vs RL)",
+    "  python start.py mpc      # 实验6: MPC模型预测控制 (CartPole)",
+    "  python start.py mpc-temp # 实验7: MPC温度控制 (直观示例)",
+    "  python start.py warmup   # 预编译实验模块 (Precompile modules)",
+    "\n快捷方式 Shortcuts:",
+    "  python start.py          # 显示此菜单",
+    "  python start.py help     # 显示帮助信息",
+    "\n" + _BAR,
+    "\n💡 提示: 实验结果将保存在 output/ 目录",
+    "💡 Tip: Results will be saved in output/ folder",
+    "\n📖 更多信息请查看 README.md 和 doc/ 目录",
+    "📖 For more info, check README.md and doc/ folder\n",
+]) + "\n"
+_MENU_BYTES = _MENU.encode('utf-8')
+
+
+def _report(*lines):
+    """把若干行消息拼成一个字符串一次写出（与逐行 print 的输出相同）"""
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
 
 
 def show_menu():
     """显示菜单"""
-    print("=" * 70)
-    print("🎯 PID控制器实验 - 快速启动")
-    print("🎯 PID Controller Experiments - Quick Start")
-    print("=" * 70)
-    print("\n可用命令 Available Commands:")
-    print("  python start.py demo     # 运行快速演示 (Quick Demo)")
-    print("  python start.py all      # 运行所有实验 (All Experiments)")
-    print("  python start.py exp1     # 实验1: Kp参数影响")
-    print("  python start.py exp2     # 实验2: Ki参数影响")
-    print("  python start.py exp3     # 实验3: Kd参数影响")
-    print("  python start.py exp4     # 实验4: PID综合调节")
-    print("  python start.py cartpole # 实验5: CartPole倒立摆 (PID vs RL)")
-    print("  python start.py mpc      # 实验6: MPC模型预测控制 (CartPole)")
-    print("  python start.py mpc-temp # 实验7: MPC温度控制 (直观示例)")
-    print("\n快捷方式 Shortcuts:")
-    print("  python start.py          # 显示此菜单")
-    print("  python start.py help     # 显示帮助信息")
-    print("\n" + "=" * 70)
-    print("\n💡 提示: 实验结果将保存在 output/ 目录")
-    print("💡 Tip: Results will be saved in output/ folder")
-    print("\n📖 更多信息请查看 README.md 和 doc/ 目录")
-    print("📖 For more info, check README.md and doc/ folder\n")
+    buffer = getattr(sys.stdout, 'buffer', None)
+    if buffer is None:  # stdout 被替换为没有字节缓冲的对象（如 StringIO）
+        sys.stdout.write(_MENU)
+        sys.stdout.flush()
+        return
+    # 导入时已编码好的字节直接写入底层缓冲，不再逐次经过文本层编码
+    sys.stdout.flush()
+    buffer.write(_MENU_BYTES)
+    buffer.flush()
 
 
-def run_demo():
-    """运行快速演示"""
-    print("\n🚀 运行快速演示...")
-    print("🚀 Running quick demo...\n")
+def _run_safely(banner, body, done, mpc=False):
+    """
+    打印开始提示并运行一条命令；出错时打印错误和回溯，不向外抛出
+    
+    参数:
+        banner: 开始提示的各行
+        body: 无参数的可调用对象，在其中导入并运行实验
+        done: 成功后的完成提示各行
+        mpc: 是否同时需要 MPCController 目录
+    """
+    _report(*banner)
     try:
-        from quick_demo import quick_demo
-        quick_demo()
-        print("\n✅ 快速演示完成！查看 output/quick_demo.png")
-        print("✅ Quick demo completed! Check output/quick_demo.png\n")
+        _ensure_env(mpc)
+        body()
+        _report(*done)
     except Exception as e:
         print(f"\n❌ 错误: {e}\n")
-        import traceback
         traceback.print_exc()
 
 
-def run_all():
-    """运行所有实验"""
-    print("\n🚀 运行所有实验...")
-    print("🚀 Running all experiments...\n")
-    try:
+def run_demo():
+    """运行快速演示"""
+    def body():
+        from quick_demo import quick_demo
+        quick_demo()
+    
+    _run_safely(("\n🚀 运行快速演示...",
+                 "🚀 Running quick demo...\n"),
+                body,
+                ("\n✅ 快速演示完成！查看 output/quick_demo.png",
+                 "✅ Quick demo completed! Check output/quick_demo.png\n"))
+
+
+def run_all(processes=None):
+    """
+    运行所有实验
+    
+    参数:
+        processes: 并行进程数，默认取 CPU 核数；设为1时顺序运行
+    """
+    if processes != 1:
+        # 各进程本身已在并行，numpy 的底层线程库只用单线程，避免进程数×线程数的超额订阅；
+        # 须在首次导入 numpy 之前设置，已由用户设置的值保持不变
+        for var in _THREAD_VARS:
+            os.environ.setdefault(var, '1')
+    
+    def body():
         from run_all_demos import main
-        main()
-        print("\n✅ 所有实验完成！查看 output/ 目录")
-        print("✅ All experiments completed! Check output/ folder\n")
-    except Exception as e:
-        print(f"\n❌ 错误: {e}\n")
-        import traceback
-        traceback.print_exc()
+        main(processes)
+    
+    _run_safely(("\n🚀 运行所有实验...",
+                 "🚀 Running all experiments...\n"),
+                body,
+                ("\n✅ 所有实验完成！查看 output/ 目录",
+                 "✅ All experiments completed! Check output/ folder\n"))
 
 
 def run_cartpole():
     """运行CartPole实验"""
-    print("\n🚀 运行CartPole倒立摆实验...")
-    print("🚀 Running CartPole experiment...\n")
-    try:
+    def body():
         from cartpole_pid import run_cartpole_experiment, compare_pid_vs_rl
         run_cartpole_experiment()
         compare_pid_vs_rl()
-        print("\n✅ CartPole实验完成！查看 output/cartpole_pid_control.png")
-        print("✅ CartPole experiment completed! Check output/cartpole_pid_control.png")
-        print("📖 详细对比分析请查看: doc/PID_vs_RL_对比.md\n")
-    except Exception as e:
-        print(f"\n❌ 错误: {e}\n")
-        import traceback
-        traceback.print_exc()
+    
+    _run_safely(("\n🚀 运行CartPole倒立摆实验...",
+                 "🚀 Running CartPole experiment...\n"),
+                body,
+                ("\n✅ CartPole实验完成！查看 output/cartpole_pid_control.png",
+                 "✅ CartPole experiment completed! Check output/cartpole_pid_control.png",
+                 "📖 详细对比分析请查看: doc/PID_vs_RL_对比.md\n"))
 
 
 def run_mpc():
     """运行MPC实验 (CartPole)"""
-    print("\n🚀 运行MPC模型预测控制实验 (CartPole)...")
-    print("🚀 Running MPC experiment (CartPole)...\n")
-    try:
-        # Add MPCController to path
-        import sys
-        import os
-        sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'MPCController'))
-        
+    def body():
         from mpc_cartpole_experiment import run_mpc_cartpole_experiment, print_mpc_comparison
         run_mpc_cartpole_experiment()
         print_mpc_comparison()
-        print("\n✅ MPC实验完成！查看 output/mpc_cartpole_comparison.png")
-        print("✅ MPC experiment completed! Check output/mpc_cartpole_comparison.png")
-        print("📖 详细说明请查看: doc/MPC控制器说明.md\n")
-    except Exception as e:
-        print(f"\n❌ 错误: {e}\n")
-        import traceback
-        traceback.print_exc()
+    
+    _run_safely(("\n🚀 运行MPC模型预测控制实验 (CartPole)...",
+                 "🚀 Running MPC experiment (CartPole)...\n"),
+                body,
+                ("\n✅ MPC实验完成！查看 output/mpc_cartpole_comparison.png",
+                 "✅ MPC experiment completed! Check output/mpc_cartpole_comparison.png",
+                 "📖 详细说明请查看: doc/MPC控制器说明.md\n"),
+                mpc=True)
 
 
 def run_mpc_temperature():
     """运行MPC温度控制实验"""
-    print("\n🚀 运行MPC温度控制实验 (更直观的示例)...")
-    print("🚀 Running MPC Temperature Control (Intuitive Example)...\n")
-    try:
-        # Add MPCController to path
-        import sys
-        import os
-        sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'MPCController'))
-        
+    def body():
         from mpc_temperature_control import (
             run_temperature_control_experiment,
             demonstrate_mpc_prediction,
@@ -140,84 +204,113 @@ def run_mpc_temperature():
         print_temperature_mpc_tutorial()
         demonstrate_mpc_prediction()
         run_temperature_control_experiment()
-        
-        print("\n✅ MPC温度控制实验完成！查看 output/mpc_temperature_control.png")
-        print("✅ MPC Temperature Control completed! Check output/mpc_temperature_control.png")
-        print("📖 这是一个更直观的MPC示例，适合初学者理解MPC原理")
-        print("📖 This is a more intuitive MPC example for beginners\n")
-    except Exception as e:
-        print(f"\n❌ 错误: {e}\n")
-        import traceback
-        traceback.print_exc()
+    
+    _run_safely(("\n🚀 运行MPC温度控制实验 (更直观的示例)...",
+                 "🚀 Running MPC Temperature Control (Intuitive Example)...\n"),
+                body,
+                ("\n✅ MPC温度控制实验完成！查看 output/mpc_temperature_control.png",
+                 "✅ MPC Temperature Control completed! Check output/mpc_temperature_control.png",
+                 "📖 这是一个更直观的MPC示例，适合初学者理解MPC原理",
+                 "📖 This is a more intuitive MPC example for beginners\n"),
+                mpc=True)
+
+
+def run_warmup():
+    """预先编译并导入各实验模块，之后的命令直接使用 __pycache__ 中的字节码"""
+    def body():
+        import compileall
+        import importlib
+        for path in (_PID_PATH, _MPC_PATH):
+            compileall.compile_dir(path, quiet=1)
+        for name in ('quick_demo', 'run_all_demos', 'pid_experiments', 'cartpole_pid',
+                     'mpc_cartpole_experiment', 'mpc_temperature_control'):
+            importlib.import_module(name)
+    
+    _run_safely(("\n🚀 预编译实验模块...",
+                 "🚀 Precompiling experiment modules...\n"),
+                body,
+                ("\n✅ 预编译完成，之后启动实验不再编译源码",
+                 "✅ Warmup completed! Later runs load cached bytecode\n"),
+                mpc=True)
+
+
+# 实验编号 -> (名称, PIDExperiments 中的方法名)
+_EXPERIMENTS = {
+    1: ("Kp参数影响 (Kp Parameter Effect)", "experiment_kp_effect"),
+    2: ("Ki参数影响 (Ki Parameter Effect)", "experiment_ki_effect"),
+    3: ("Kd参数影响 (Kd Parameter Effect)", "experiment_kd_effect"),
+    4: ("PID综合调节 (Combined PID Tuning)", "experiment_combined_tuning"),
+}
 
 
 def run_single_experiment(exp_num):
     """运行单个实验"""
-    exp_names = {
-        1: "Kp参数影响 (Kp Parameter Effect)",
-        2: "Ki参数影响 (Ki Parameter Effect)",
-        3: "Kd参数影响 (Kd Parameter Effect)",
-        4: "PID综合调节 (Combined PID Tuning)"
-    }
-    
-    print(f"\n🚀 运行实验{exp_num}: {exp_names.get(exp_num, '未知实验')}")
-    print(f"🚀 Running Experiment {exp_num}...\n")
-    
     try:
+        label, method = _EXPERIMENTS[exp_num]
+    except KeyError:
+        _report(f"\n🚀 运行实验{exp_num}: 未知实验",
+                f"🚀 Running Experiment {exp_num}...\n")
+        print(f"❌ 无效的实验编号: {exp_num}")
+        return
+    
+    def body():
         from pid_experiments import PIDExperiments
-        experiments = PIDExperiments()
-        
-        if exp_num == 1:
-            experiments.experiment_kp_effect()
-        elif exp_num == 2:
-            experiments.experiment_ki_effect()
-        elif exp_num == 3:
-            experiments.experiment_kd_effect()
-        elif exp_num == 4:
-            experiments.experiment_combined_tuning()
-        else:
-            print(f"❌ 无效的实验编号: {exp_num}")
-            return
-        
-        print(f"\n✅ 实验{exp_num}完成！查看 output/experiment_{exp_num}_*.png")
-        print(f"✅ Experiment {exp_num} completed! Check output/experiment_{exp_num}_*.png\n")
-    except Exception as e:
-        print(f"\n❌ 错误: {e}\n")
-        import traceback
-        traceback.print_exc()
+        getattr(PIDExperiments(), method)()
+    
+    _run_safely((f"\n🚀 运行实验{exp_num}: {label}",
+                 f"🚀 Running Experiment {exp_num}...\n"),
+                body,
+                (f"\n✅ 实验{exp_num}完成！查看 output/experiment_{exp_num}_*.png",
+                 f"✅ Experiment {exp_num} completed! Check output/experiment_{exp_num}_*.png\n"))
+
+
+# 命令名 -> 处理函数
+DISPATCH = {
+    'help': show_menu,
+    'demo': run_demo,
+    'all': run_all,
+    'exp1': lambda: run_single_experiment(1),
+    'exp2': lambda: run_single_experiment(2),
+    'exp3': lambda: run_single_experiment(3),
+    'exp4': lambda: run_single_experiment(4),
+    'cartpole': run_cartpole,
+    'mpc': run_mpc,
+    'mpc-temp': run_mpc_temperature,
+    'warmup': run_warmup,
+}
 
 
 def main():
     """主函数"""
-    if len(sys.argv) < 2:
+    # 只显示菜单时直接输出，不必导入 argparse
+    if len(sys.argv) < 2 or sys.argv[1].lower() in ('help', '-h', '--help'):
         show_menu()
         return
     
-    command = sys.argv[1].lower()
+    import argparse
+    # -h/--help 与 help 命令一样显示菜单，故不用 argparse 自带的帮助；
+    # 未知命令由 argparse 报错并列出可用命令
+    parser = argparse.ArgumentParser(prog='start.py', add_help=False,
+                                     description='PID/MPC控制实验快速启动')
+    parser.add_argument('command', nargs='?', type=str.lower, choices=DISPATCH,
+                        help='要运行的命令（不区分大小写）')
+    parser.add_argument('-h', '--help', action='store_true', help='显示菜单')
+    parser.add_argument('-j', '--jobs', type=int, metavar='N',
+                        help='all 命令的并行进程数（默认为 CPU 核数，1 为顺序运行）')
+    args = parser.parse_args()
     
-    if command in ['help', '-h', '--help']:
+    if args.command in (None, 'help') or args.help:
         show_menu()
-    elif command == 'demo':
-        run_demo()
-    elif command == 'all':
-        run_all()
-    elif command == 'exp1':
-        run_single_experiment(1)
-    elif command == 'exp2':
-        run_single_experiment(2)
-    elif command == 'exp3':
-        run_single_experiment(3)
-    elif command == 'exp4':
-        run_single_experiment(4)
-    elif command == 'cartpole':
-        run_cartpole()
-    elif command == 'mpc':
-        run_mpc()
-    elif command == 'mpc-temp':
-        run_mpc_temperature()
-    else:
-        print(f"\n❌ 未知命令: {command}")
-        print("💡 使用 'python start.py' 查看可用命令\n")
+        return
+    _utf8_stdout()
+    if args.jobs is not None:
+        if args.command != 'all':
+            parser.error('--jobs 只适用于 all 命令')
+        if args.jobs < 1:
+            parser.error('--jobs 必须为正整数')
+        run_all(args.jobs)
+        return
+    DISPATCH[args.command]()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,76 @@
+"""
+LinearMPCController 外部QP求解器接口（qp_solver）的测试
+
+运行: python -m pytest tests
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'MPCController'))
+
+from mpc_controller import LinearMPCController  # noqa: E402
+
+
+SYSTEM_PARAMS = [1.0, 0.1, 0.5, 9.8]
+
+# 该状态下无约束最优解超出 ±1 的上下限，update 必须求解QP
+STATE = np.array([0.1, 0.0, 0.2, 0.0])
+
+
+def _make_controller():
+    return LinearMPCController(u_min=-1.0, u_max=1.0)
+
+
+def test_qp_solver_receives_linear_term():
+    controller = _make_controller()
+    calls = []
+
+    def solver(q):
+        calls.append(np.array(q))
+        return np.full(controller.M, 0.5)
+
+    controller.qp_solver = solver
+    u = controller.update(STATE, SYSTEM_PARAMS)
+
+    assert u == 0.5
+    assert len(calls) == 1
+    qp = controller._setup_qp(SYSTEM_PARAMS)
+    z = np.concatenate([STATE, controller.target_state])
+    np.testing.assert_allclose(calls[0], qp['G_z'] @ z)
+
+
+def test_qp_solver_failure_falls_back():
+    controller = _make_controller()
+    controller.qp_solver = lambda q: None
+
+    expected = _make_controller().update(STATE, SYSTEM_PARAMS)
+    assert np.isclose(controller.update(STATE, SYSTEM_PARAMS), expected, atol=1e-6)
+
+
+def test_qp_solver_cleared_when_problem_changes():
+    changes = [
+        lambda c: setattr(c, 'Q', np.diag([1.0, 1.0, 1000.0, 1.0])),
+        lambda c: setattr(c, 'R', np.array([[1.0]])),
+        lambda c: setattr(c, 'u_min', -2.0),
+        lambda c: setattr(c, 'u_max', 2.0),
+        lambda c: c.update(STATE, [2.0, 0.1, 0.5, 9.8]),
+    ]
+    for change in changes:
+        controller = _make_controller()
+        controller.qp_solver = lambda q: np.zeros(controller.M)
+        controller.update(STATE, SYSTEM_PARAMS)
+
+        change(controller)
+        assert controller.qp_solver is None
+
+
+def test_qp_solver_kept_for_unchanged_problem():
+    controller = _make_controller()
+    solver = lambda q: np.zeros(controller.M)  # noqa: E731
+    controller.qp_solver = solver
+
+    controller.update(STATE, SYSTEM_PARAMS)
+    controller.update(STATE, SYSTEM_PARAMS)
+    assert controller.qp_solver is solver